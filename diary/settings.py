@@ -96,6 +96,22 @@ if DATABASE_URL:
         ssl_require=False,
     )
 
+# --------------------------------------------------------------------------------------
+# 캐시: 기본은 프로세스 메모리(locmem). 워커가 여러 개인 운영 환경은 공유 백엔드로 지정
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache  CACHE_LOCATION=redis://localhost:6379/1
+#   CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache  CACHE_LOCATION=/var/tmp/diary-cache
+# --------------------------------------------------------------------------------------
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'diary'),
+    }
+}
+
+# 일기 조회 API 읽기 캐시 (entry.read_cache): 사용자별 버전 키, 일기 저장·삭제 시 무효화
+DIARY_READ_CACHE = os.getenv('DIARY_READ_CACHE', 'True') == 'True'
+DIARY_READ_CACHE_TTL = int(os.getenv('DIARY_READ_CACHE_TTL', '3600'))
+
 # --------------------------------------------------------------------------------------
 # 패스워드 검증
 # --------------------------------------------------------------------------------------
@@ -168,6 +184,46 @@ else:
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
 
+# --------------------------------------------------------------------------------------
+# 이미지 생성 파이프라인
+# --------------------------------------------------------------------------------------
+# 이미지 응답 방식: 'url'(OpenAI 임시 URL) | 'b64'(base64로 받아 CartoonStorage에 바로 저장)
+CARTOON_IMAGE_MODE = os.getenv('CARTOON_IMAGE_MODE', 'url')
+
+# 생성 방식: 'grid'(DALL·E 한 장에 2x2) | 'panels'(4컷을 동시에 따로 생성해 Pillow로 2x2 합성)
+CARTOON_GENERATION_MODE = os.getenv('CARTOON_GENERATION_MODE', 'grid')
+
+# 4컷 아웃라인 캐시 크기 (일기당 / 전체)
+OUTLINE_CACHE_MAX_PER_DIARY = int(os.getenv('OUTLINE_CACHE_MAX_PER_DIARY', '4'))
+OUTLINE_CACHE_MAX_ENTRIES = int(os.getenv('OUTLINE_CACHE_MAX_ENTRIES', '10000'))
+
+# 프롬프트 단위 이미지 캐시: 같은 (최종 프롬프트, 모델, 크기)면 보관된 이미지를 재사용 (LRU 최대 개수)
+CARTOON_IMAGE_CACHE = os.getenv('CARTOON_IMAGE_CACHE', 'False') == 'True'
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', '1000'))
+
+# 생성 변형(재생성 이력) 보관: 사용자당 최대 개수 / 보관 일수 (선택·저장된 이미지는 항상 유지)
+CARTOON_VARIANTS_PER_USER = int(os.getenv('CARTOON_VARIANTS_PER_USER', '30'))
+CARTOON_VARIANT_MAX_AGE_DAYS = float(os.getenv('CARTOON_VARIANT_MAX_AGE_DAYS', '14'))
+# 정리된 변형 이미지를 스토리지에서 지우기 전 유예 시간(초). 진행 중인 저장(내용 해시 중복)이 참조를 기록할 시간
+CARTOON_IMAGE_DELETE_GRACE_SECONDS = float(os.getenv('CARTOON_IMAGE_DELETE_GRACE_SECONDS', '3600'))
+
+# 단계별 타이밍 스팬(outline/render/image/download/upload) 기록 위치
+# 'db'(StageSpan 테이블, /generate-image/traces/ 에서 집계) | 'log'(entry.tracing 로거) | 'off'
+CARTOON_TRACE_SINK = os.getenv('CARTOON_TRACE_SINK', 'db')
+# StageSpan 보관 일수 (run_generation_worker가 주기적으로 정리)
+CARTOON_TRACE_RETENTION_DAYS = float(os.getenv('CARTOON_TRACE_RETENTION_DAYS', '14'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'entry.tracing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # --------------------------------------------------------------------------------------
 # 기본 Primary Key 타입 지정 (Django 3.2+ 권장)
 # --------------------------------------------------------------------------------------
@@ -2,6 +2,13 @@
 AWS S3 Storage 설정
 업로드되는 파일들을 S3의 media 폴더 내에서 용도별로 분류하여 저장
 """
+import hashlib
+import os
+
+from boto3.s3.transfer import TransferConfig
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
 from storages.backends.s3boto3 import S3Boto3Storage
 
 
@@ -18,9 +25,79 @@ class CartoonStorage(S3Boto3Storage):
     """
     일기 만화 이미지 Storage
     location: media/cartoon/ 폴더에 저장
+    객체 이름이 내용의 sha256이므로(save_content_addressed) 같은 이름 = 같은 바이트
+    → 덮어써도 안전하고, 브라우저/CDN이 영구 캐시해도 된다.
     """
     location = 'media/cartoon'
-    file_overwrite = False
+    file_overwrite = True
+    object_parameters = {
+        'CacheControl': 'public, max-age=31536000, immutable',
+    }
+    # 스트리밍 업로드 시 전송당 메모리 상한: 파트 크기(5MB) x 동시 업로드 수(2)
+    transfer_config = TransferConfig(
+        multipart_threshold=5 * 1024 * 1024,
+        multipart_chunksize=5 * 1024 * 1024,
+        max_concurrency=2,
+    )
+
+class LocalCartoonStorage(FileSystemStorage):
+    """
+    USE_S3=False 일 때의 일기 만화 이미지 Storage
+    location: MEDIA_ROOT/cartoon/ 폴더에 저장
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('location', os.path.join(settings.MEDIA_ROOT, 'cartoon'))
+        kwargs.setdefault('base_url', settings.MEDIA_URL.rstrip('/') + '/cartoon/')
+        super().__init__(**kwargs)
+
+
+def get_cartoon_storage():
+    """설정(USE_S3)에 맞는 만화 이미지 Storage"""
+    if getattr(settings, 'USE_S3', False):
+        return CartoonStorage()
+    return LocalCartoonStorage()
+
+
+CONTENT_HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_addressed_name(digest, ext='png'):
+    """내용 해시 → 객체 이름"""
+    return f'{digest}.{ext}'
+
+
+def file_sha256(fileobj):
+    """파일 객체 전체의 sha256 (읽은 뒤 처음 위치로 되돌림)"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(CONTENT_HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def save_content_addressed(storage, fileobj, ext='png', digest=None):
+    """
+    내용 해시를 이름으로 저장한다. 같은 객체가 이미 있으면 업로드하지 않는다 (S3: HEAD 1회).
+    fileobj는 seek 가능해야 한다. 반환: (저장된 이름, 실제 업로드 여부)
+    """
+    name = content_addressed_name(digest or file_sha256(fileobj), ext)
+    if storage.exists(name):
+        return name, False
+    fileobj.seek(0)
+    return storage.save(name, File(fileobj, name=name)), True
+
+
+def is_storage_url(storage, url):
+    """url이 해당 storage에 저장된 파일의 URL인지 여부"""
+    if not url:
+        return False
+    try:
+        base_url = storage.url('')
+    except Exception:
+        return False
+    return bool(base_url) and url.startswith(base_url)
 
 # 추후 작업 사항
 
@@ -13,6 +13,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -20,3 +22,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('entry.urls')),
 ]
+
+# 로컬 개발(USE_S3=False)에서 MEDIA_ROOT에 저장된 만화 이미지 서빙
+if settings.DEBUG and not settings.USE_S3:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,336 @@
+"""
+생성 백엔드: "outline"(일기 → 4패널 JSON) / "image"(프롬프트 → 이미지) 단계.
+
+- OpenAIBackend : 실제 gpt-4o-mini / DALL·E 3 호출 (속도 제한/재시도/서킷 브레이커 적용)
+- FakeBackend   : 결정적(같은 입력 → 같은 출력) 로컬 가짜 백엔드. 고정 패널 + Pillow로 그린 2x2 이미지,
+                  지연시간 설정 가능 → 비용 없이 부하 테스트/벤치마크
+- RecordReplayBackend : 다른 백엔드의 응답을 디스크에 기록(record)하고, 같은 요청에 바이트 단위로 재생(replay)
+
+환경변수:
+    CARTOON_BACKEND            openai | fake | record | replay (기본 openai)
+    CARTOON_OUTLINE_BACKEND    outline 단계만 따로 지정 (기본 CARTOON_BACKEND)
+    CARTOON_IMAGE_BACKEND      image 단계만 따로 지정 (기본 CARTOON_BACKEND)
+    CARTOON_RECORDINGS_DIR     record/replay 저장 경로 (기본 <프로젝트>/recordings)
+    FAKE_OUTLINE_LATENCY       fake outline 지연(초), 기본 0
+    FAKE_IMAGE_LATENCY         fake image 지연(초), 기본 0
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from entry.Image_making.client import ensure_env_loaded, get_client
+from entry.Image_making.resilience import call_openai
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+OUTLINE_MAX_OUTPUT_TOKENS = 400
+
+
+@dataclass
+class ImageResult:
+    """이미지 단계 결과: 임시 URL 또는 PNG 바이트 중 하나"""
+
+    url: Optional[str] = None
+    image_bytes: Optional[bytes] = None
+
+
+def _empty_panels() -> List[Dict[str, Any]]:
+    return [{"scene": "", "caption": "", "emotion": ""} for _ in range(4)]
+
+
+def _normalize_panels(panels: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """정확히 4개, scene/caption/emotion 키만"""
+    panels = list(panels or [])[:4]
+    while len(panels) < 4:
+        panels.append({"scene": "", "caption": "", "emotion": ""})
+    return [{"scene": p.get("scene", ""), "caption": p.get("caption", ""), "emotion": p.get("emotion", "")} for p in panels]
+
+
+class OutlineBackend:
+    name = "base"
+
+    def outline(self, diary_text: str, language: str, model: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class ImageBackend:
+    name = "base"
+
+    def generate(self, prompt: str, size: str, response_format: str, model: str) -> ImageResult:
+        raise NotImplementedError
+
+
+# ───────────────────────────
+# OpenAI
+# ───────────────────────────
+
+class OpenAIBackend(OutlineBackend, ImageBackend):
+    name = "openai"
+
+    def outline(self, diary_text: str, language: str, model: str) -> List[Dict[str, Any]]:
+        ensure_env_loaded()
+        client = get_client()
+        if client is None:
+            # 폴백: 텍스트 4등분
+            lines = [ln.strip() for ln in diary_text.splitlines() if ln.strip()]
+            chunks = [" ".join(lines[i::4]) for i in range(4)] or ["", "", "", ""]
+            return [{"scene": c[:120], "caption": c[:40], "emotion": ""} for c in chunks]
+
+        lang = "English" if language.lower().startswith("en") else "Korean"
+
+        system = (
+            "You are a story editor. Read the diary and compress it into EXACTLY 4 story beats "
+            "(Hook, Complication, HighPoint, Resolution). Output STRICT JSON only."
+        )
+        user = f"""
+Return JSON with schema:
+{{
+  "panels": [
+    {{"role":"Hook|Complication|HighPoint|Resolution", "scene": "<concise scene>", "caption": "<short {lang} caption>", "emotion":"<one word>"}}
+  ]
+}}
+
+Rules:
+- EXACTLY 4 items in "panels".
+- One main action per panel; merge minor events.
+- Keep captions short (<= 12 words). Use {lang}.
+DIARY:
+{diary_text}
+"""
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+        resp = call_openai(
+            lambda: client.chat.completions.create(
+                model=model,
+                temperature=0.3,
+                response_format={"type": "json_object"},
+                messages=messages,
+            ),
+            kind="chat",
+            # TPM 계산용 대략치: 입력 4자당 1토큰 + 응답 여유분
+            tokens=(len(system) + len(user)) // 4 + OUTLINE_MAX_OUTPUT_TOKENS,
+        )
+        try:
+            data = json.loads(resp.choices[0].message.content or "{}")
+            return _normalize_panels(data.get("panels") or [])
+        except Exception:
+            return _empty_panels()
+
+    def generate(self, prompt: str, size: str, response_format: str, model: str) -> ImageResult:
+        ensure_env_loaded()
+        client = get_client()
+        if client is None:
+            return ImageResult()
+
+        resp = call_openai(
+            lambda: client.images.generate(
+                model=model,
+                prompt=prompt,
+                size=size,
+                n=1,
+                response_format=response_format,
+            ),
+            kind="images",
+        )
+
+        data = resp.data[0]
+        url = getattr(data, "url", None)
+        b64 = getattr(data, "b64_json", None)
+        if url:
+            return ImageResult(url=url)
+        if b64:
+            return ImageResult(image_bytes=base64.b64decode(b64))
+        return ImageResult()
+
+
+# ───────────────────────────
+# Fake (오프라인, 결정적)
+# ───────────────────────────
+
+_FAKE_ROLES = ["Hook", "Complication", "HighPoint", "Resolution"]
+_FAKE_EMOTIONS = ["happy", "tired", "surprised", "calm", "proud", "nervous"]
+
+
+class FakeBackend(OutlineBackend, ImageBackend):
+    """같은 입력에 항상 같은 결과를 주는 로컬 백엔드 (네트워크/비용 없음)"""
+
+    name = "fake"
+
+    def __init__(self, outline_latency: float = 0.0, image_latency: float = 0.0) -> None:
+        self.outline_latency = outline_latency
+        self.image_latency = image_latency
+
+    def outline(self, diary_text: str, language: str, model: str) -> List[Dict[str, Any]]:
+        if self.outline_latency:
+            time.sleep(self.outline_latency)
+        digest = hashlib.sha256(diary_text.encode("utf-8")).digest()
+        words = diary_text.split()
+        panels = []
+        for i, role in enumerate(_FAKE_ROLES):
+            chunk = " ".join(words[i::4][:12]) or role
+            panels.append({
+                "scene": f"{role}: {chunk}"[:120],
+                "caption": chunk[:40],
+                "emotion": _FAKE_EMOTIONS[digest[i] % len(_FAKE_EMOTIONS)],
+            })
+        return panels
+
+    def generate(self, prompt: str, size: str, response_format: str, model: str) -> ImageResult:
+        from PIL import Image, ImageDraw
+
+        if self.image_latency:
+            time.sleep(self.image_latency)
+        width, height = (int(v) for v in size.lower().split("x"))
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        gutter = max(4, width // 64)
+        cell_w, cell_h = (width - gutter * 3) // 2, (height - gutter * 3) // 2
+        for i in range(4):
+            x = gutter + (i % 2) * (cell_w + gutter)
+            y = gutter + (i // 2) * (cell_h + gutter)
+            color = tuple(200 + digest[i * 3 + k] % 56 for k in range(3))
+            draw.rectangle([x, y, x + cell_w, y + cell_h], fill=color, outline="black", width=3)
+            draw.text((x + 12, y + 12), f"PANEL {i + 1}", fill="black")
+        draw.text((gutter + 12, height - gutter - 24), digest.hex()[:16], fill="black")
+
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        return ImageResult(image_bytes=buf.getvalue())
+
+
+# ───────────────────────────
+# Record / Replay
+# ───────────────────────────
+
+class ReplayMissError(LookupError):
+    """replay 모드에서 기록되지 않은 요청"""
+
+
+class RecordReplayBackend(OutlineBackend, ImageBackend):
+    """
+    record: inner 백엔드를 호출하고 응답을 directory/<stage>/<hash>.json 에 기록
+    replay: 기록된 응답을 그대로 반환 (없으면 ReplayMissError)
+    이미지는 URL 응답이어도 바이트를 내려받아 기록하므로 재생 시 만료된 URL에 의존하지 않는다.
+    """
+
+    name = "record_replay"
+
+    def __init__(self, directory: Path, mode: str = "replay", inner: Optional[Any] = None) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unknown record/replay mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.inner = inner or OpenAIBackend()
+
+    def _path(self, stage: str, request: Dict[str, Any]) -> Path:
+        key = hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return self.directory / stage / f"{key}.json"
+
+    def _load(self, path: Path) -> Dict[str, Any]:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise ReplayMissError(f"no recording at {path}")
+
+    def _save(self, path: Path, payload: Dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(path)
+
+    def outline(self, diary_text: str, language: str, model: str) -> List[Dict[str, Any]]:
+        request = {"diary_text": diary_text, "language": language, "model": model}
+        path = self._path("outline", request)
+        if self.mode == "replay":
+            return self._load(path)["panels"]
+        panels = self.inner.outline(diary_text, language, model)
+        self._save(path, {"request": request, "panels": panels})
+        return panels
+
+    def generate(self, prompt: str, size: str, response_format: str, model: str) -> ImageResult:
+        request = {"prompt": prompt, "size": size, "model": model}
+        path = self._path("image", request)
+        if self.mode == "replay":
+            return ImageResult(image_bytes=base64.b64decode(self._load(path)["b64"]))
+
+        result = self.inner.generate(prompt, size, response_format, model)
+        image_bytes = result.image_bytes
+        if image_bytes is None and result.url:
+            from entry.Image_making.transfer import DOWNLOAD_TIMEOUT, get_http_session
+
+            response = get_http_session().get(result.url, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            image_bytes = response.content
+        if image_bytes is not None:
+            self._save(path, {"request": request, "b64": base64.b64encode(image_bytes).decode("ascii")})
+        return result
+
+
+# ───────────────────────────
+# 선택 / 주입
+# ───────────────────────────
+
+_lock = threading.Lock()
+_backends: Dict[str, Any] = {}
+
+
+def build_backend(kind: str) -> Any:
+    """이름(openai/fake/record/replay)으로 백엔드 생성"""
+    kind = (kind or "openai").strip().lower()
+    if kind == "openai":
+        return OpenAIBackend()
+    if kind == "fake":
+        return FakeBackend(
+            outline_latency=float(os.getenv("FAKE_OUTLINE_LATENCY", "0")),
+            image_latency=float(os.getenv("FAKE_IMAGE_LATENCY", "0")),
+        )
+    if kind in ("record", "replay"):
+        directory = Path(os.getenv("CARTOON_RECORDINGS_DIR", str(PROJECT_ROOT / "recordings")))
+        return RecordReplayBackend(directory, mode=kind)
+    raise ValueError(f"unknown cartoon backend: {kind}")
+
+
+def _get(stage: str) -> Any:
+    backend = _backends.get(stage)
+    if backend is not None:
+        return backend
+    with _lock:
+        if stage not in _backends:
+            ensure_env_loaded()
+            default = os.getenv("CARTOON_BACKEND", "openai")
+            _backends[stage] = build_backend(os.getenv(f"CARTOON_{stage.upper()}_BACKEND", default))
+        return _backends[stage]
+
+
+def get_outline_backend() -> OutlineBackend:
+    return _get("outline")
+
+
+def get_image_backend() -> ImageBackend:
+    return _get("image")
+
+
+def set_backend(outline: Optional[Any] = None, image: Optional[Any] = None) -> None:
+    """백엔드 주입 (테스트/벤치마크용). 지정한 단계만 교체"""
+    with _lock:
+        if outline is not None:
+            _backends["outline"] = outline
+        if image is not None:
+            _backends["image"] = image
+
+
+def reset_backends() -> None:
+    """주입/캐시된 백엔드를 비워 다음 호출 때 환경변수로 다시 고른다"""
+    with _lock:
+        _backends.clear()
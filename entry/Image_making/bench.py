@@ -0,0 +1,131 @@
+"""
+프롬프트 렌더링 마이크로 벤치마크.
+
+before: 요청마다 템플릿 파일을 읽고, 문자열 조립 후 정규식 후처리 3단계
+        (_ensure_negative_prompt → _normalize_layout_to_2x2 → _clamp_to_four_panels)
+after : StyleRegistry(mtime 캐시) 조회 + 1-pass render_prompt
+
+사용 예시:
+    python -m entry.Image_making.bench
+    python -m entry.Image_making.bench --style ani --number 20000
+"""
+
+from __future__ import annotations
+
+import re
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List
+
+from entry.Image_making.styles import (
+    DOODLE_GLOBAL_STYLE_BLOCK,
+    FORCE_2X2_LAYOUT_BLOCK,
+    MULTI_PANEL_NEGATIVE,
+    STYLE_PROMPT_FILES,
+    get_style,
+    render_prompt,
+)
+
+
+SAMPLE_PANELS: List[Dict[str, Any]] = [
+    {"scene": "Wakes up late and rushes out with toast", "caption": "Late again!", "emotion": "panic"},
+    {"scene": "Misses the bus by a second", "caption": "Nooo...", "emotion": "despair"},
+    {"scene": "A friend offers a ride on a scooter", "caption": "Hop on!", "emotion": "relief"},
+    {"scene": "Arrives just in time, hair a mess", "caption": "Made it.", "emotion": "proud"},
+]
+
+
+# ───────────────────────────
+# 기존(before) 구현 - 비교용으로 그대로 보존
+# ───────────────────────────
+
+def _legacy_ensure_negative_prompt(text: str) -> str:
+    if "[NEGATIVE PROMPT]" not in text:
+        return text.rstrip() + "\n\n[NEGATIVE PROMPT]\n" + MULTI_PANEL_NEGATIVE + "\n"
+    neg_re = re.compile(r"(\[NEGATIVE PROMPT\]\s*)([\s\S]*)\Z")
+    return neg_re.sub(lambda m: m.group(1) + (m.group(2).strip() + ", " if m.group(2).strip() else "") + MULTI_PANEL_NEGATIVE + "\n", text)
+
+
+def _legacy_normalize_layout_to_2x2(prompt_text: str) -> str:
+    layout_re = re.compile(r"\[LAYOUT\][\s\S]*?(?=\n\[PANEL|\n\[NEGATIVE PROMPT|\Z)")
+    if layout_re.search(prompt_text):
+        prompt_text = layout_re.sub(FORCE_2X2_LAYOUT_BLOCK, prompt_text)
+    else:
+        prompt_text = FORCE_2X2_LAYOUT_BLOCK + "\n" + prompt_text
+    return prompt_text
+
+
+def _legacy_clamp_to_four_panels(prompt_text: str) -> str:
+    panel_re = re.compile(r"\n\[PANEL\s*\d+[^\]]*\][\s\S]*?(?=\n\[PANEL|\n\[NEGATIVE PROMPT|\Z)")
+    panels = panel_re.findall("\n" + prompt_text)
+    if not panels:
+        return prompt_text
+    kept = panels[:4]
+    prompt_wo_panels = panel_re.sub("", "\n" + prompt_text)
+    neg_re = re.compile(r"\n\[NEGATIVE PROMPT\]")
+    m = neg_re.search(prompt_wo_panels)
+    joined_panels = "".join(kept)
+    if m:
+        idx = m.start()
+        prompt_text = prompt_wo_panels[:idx] + joined_panels + prompt_wo_panels[idx:]
+    else:
+        prompt_text = prompt_wo_panels + joined_panels
+    return prompt_text.strip()
+
+
+def _legacy_render(style_path: Path, panels: List[Dict[str, Any]]) -> str:
+    style_template = style_path.read_text(encoding="utf-8").strip()
+    if style_template:
+        header = style_template.rstrip() + "\n\n"
+    else:
+        header = DOODLE_GLOBAL_STYLE_BLOCK + "\n" + FORCE_2X2_LAYOUT_BLOCK + "\n\n"
+
+    def ptext(idx: int, p: Dict[str, Any]) -> str:
+        scene = (p.get("scene") or "").strip()
+        emo = (p.get("emotion") or "").strip()
+        cap = (p.get("caption") or "").strip()
+        body = f"Scene: {scene}\n"
+        if emo:
+            body += f"Emotion: {emo}\n"
+        if cap:
+            body += f"Caption: {cap}\n"
+        return f"[PANEL {idx}]\n{body}"
+
+    prompt = header + "\n".join(ptext(i + 1, panels[i] if i < len(panels) else {}) for i in range(4)) + "\n"
+    prompt = _legacy_ensure_negative_prompt(prompt)
+    prompt = _legacy_normalize_layout_to_2x2(prompt)
+    prompt = _legacy_clamp_to_four_panels(prompt)
+    return prompt
+
+
+# ───────────────────────────
+# 실행
+# ───────────────────────────
+
+def run(style: str = "simple", number: int = 5000, repeat: int = 5) -> Dict[str, float]:
+    """before/after 호출당 평균 시간(µs, repeat 중 최솟값)을 반환"""
+    style_path = STYLE_PROMPT_FILES[style]
+    get_style(style)  # 레지스트리 워밍업 (첫 파싱은 측정에서 제외)
+
+    before = min(timeit.repeat(lambda: _legacy_render(style_path, SAMPLE_PANELS), number=number, repeat=repeat))
+    after = min(timeit.repeat(lambda: render_prompt(get_style(style), SAMPLE_PANELS), number=number, repeat=repeat))
+    return {
+        "before_us": before / number * 1e6,
+        "after_us": after / number * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prompt render micro-benchmark (before/after style registry)")
+    parser.add_argument("--style", type=str, default="simple", choices=sorted(STYLE_PROMPT_FILES))
+    parser.add_argument("--number", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = run(style=args.style, number=args.number, repeat=args.repeat)
+    print(f"style={args.style} number={args.number} repeat={args.repeat}")
+    print(f"before (file read + regex chain): {result['before_us']:8.2f} µs/call")
+    print(f"after  (registry + 1-pass render): {result['after_us']:8.2f} µs/call")
+    print(f"speedup: {result['before_us'] / result['after_us']:.1f}x")
@@ -0,0 +1,132 @@
+"""
+프로세스 공유 OpenAI 클라이언트.
+
+- .env / 환경변수는 프로세스당 한 번만 읽는다.
+- 클라이언트는 처음 사용할 때 한 번 만들고(스레드 안전) 이후 재사용한다.
+  → HTTP keep-alive 커넥션 풀을 공유하므로 생성 요청마다 TLS 연결을 새로 맺지 않는다.
+- set_client()로 테스트/벤치마크용 클라이언트를 주입할 수 있다.
+
+환경변수:
+    OPENAI_TIMEOUT            요청 전체 타임아웃(초), 기본 120
+    OPENAI_CONNECT_TIMEOUT    연결 타임아웃(초), 기본 10
+    OPENAI_POOL_MAXSIZE       커넥션 풀 크기, 기본 10
+    OPENAI_KEEPALIVE_EXPIRY   유휴 커넥션 유지 시간(초), 기본 30
+    OPENAI_MAX_RETRIES        SDK 자동 재시도 횟수, 기본 0 (재시도는 resilience.call_openai가 담당)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    # OpenAI Python SDK v1
+    from openai import OpenAI  # type: ignore
+except Exception:  # pragma: no cover - optional import
+    OpenAI = None  # type: ignore
+
+try:
+    from dotenv import load_dotenv  # type: ignore
+except Exception:  # pragma: no cover
+    load_dotenv = None  # type: ignore
+
+try:
+    import httpx  # type: ignore
+except Exception:  # pragma: no cover - openai SDK 의존성이지만 없으면 SDK 기본값 사용
+    httpx = None  # type: ignore
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_lock = threading.RLock()
+_env_loaded = False
+_client: Any = None
+
+
+def ensure_env_loaded() -> None:
+    """.env를 (프로세스당 한 번) 로드하고 OPENAI_API 키를 환경변수로 노출한다."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _lock:
+        if _env_loaded:
+            return
+        if load_dotenv is not None:
+            env_path = PROJECT_ROOT / ".env"
+            if env_path.exists():
+                load_dotenv(dotenv_path=env_path)
+
+        api_key = (
+            os.getenv("OPENAI_API")
+            or os.getenv("OPENAI_API_KEY")
+            or os.getenv("OPENAI_API_TOKEN")
+        )
+        if api_key:
+            os.environ.setdefault("OPENAI_API_KEY", api_key)
+        _env_loaded = True
+
+
+def get_client_config() -> Dict[str, float]:
+    """환경변수에서 클라이언트 설정을 읽는다."""
+    ensure_env_loaded()
+    return {
+        "timeout": float(os.getenv("OPENAI_TIMEOUT", "120")),
+        "connect_timeout": float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+        "pool_maxsize": int(os.getenv("OPENAI_POOL_MAXSIZE", "10")),
+        "keepalive_expiry": float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+        "max_retries": int(os.getenv("OPENAI_MAX_RETRIES", "0")),
+    }
+
+
+def _build_client() -> Any:
+    cfg = get_client_config()
+    kwargs: Dict[str, Any] = {"max_retries": int(cfg["max_retries"])}
+
+    if httpx is not None:
+        timeout = httpx.Timeout(cfg["timeout"], connect=cfg["connect_timeout"])
+        limits = httpx.Limits(
+            max_connections=int(cfg["pool_maxsize"]),
+            max_keepalive_connections=int(cfg["pool_maxsize"]),
+            keepalive_expiry=cfg["keepalive_expiry"],
+        )
+        kwargs["timeout"] = timeout
+        kwargs["http_client"] = httpx.Client(timeout=timeout, limits=limits)
+    else:
+        kwargs["timeout"] = cfg["timeout"]
+
+    return OpenAI(**kwargs)
+
+
+def get_client() -> Optional[Any]:
+    """공유 OpenAI 클라이언트. SDK가 설치되지 않았으면 None."""
+    global _client
+    if _client is not None:
+        return _client
+    if OpenAI is None:
+        return None
+    with _lock:
+        if _client is None:
+            _client = _build_client()
+        return _client
+
+
+def set_client(client: Any) -> None:
+    """클라이언트를 주입한다 (테스트/벤치마크용). None이면 다음 호출 때 새로 만든다."""
+    global _client
+    with _lock:
+        _client = client
+
+
+def reset_client() -> None:
+    """공유 클라이언트를 닫고 비운다."""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    close = getattr(client, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
@@ -0,0 +1,88 @@
+"""
+프롬프트 단위 이미지 캐시 (settings.CARTOON_IMAGE_CACHE=True 일 때만 사용).
+
+key = hash(최종 프롬프트, 이미지 모델, 크기/모드) → 이미 스토리지에 보관된 이미지 URL
+- 같은 일기를 다시 생성하거나, 샘플/데모 일기, 같은 내용을 다른 날짜로 다시 올린 경우
+  (아웃라인 → 프롬프트가 같다면) 이미지 생성 호출 없이 보관된 이미지를 재사용한다.
+- 보관된 URL(스토리지)만 캐시한다. 만료되는 OpenAI 임시 URL은 넣지 않는다.
+- 적중 시 객체가 스토리지에서 사라졌으면 항목을 지우고 미적중으로 처리한다.
+- 전체 IMAGE_CACHE_MAX_ENTRIES개를 넘으면 가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+- 요청별 우회: generate_and_attach_image_to_diary(use_cache=False) / 재생성 버튼(fresh=1)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+
+def cache_enabled() -> bool:
+    return bool(getattr(settings, "CARTOON_IMAGE_CACHE", False))
+
+
+def _max_entries() -> int:
+    return int(getattr(settings, "IMAGE_CACHE_MAX_ENTRIES", 1000))
+
+
+def image_cache_key(prompt: str, model: str, size: str) -> str:
+    """(프롬프트, 모델, 크기)의 sha256 해시"""
+    payload = json.dumps([model, size, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached_image(key: str, storage):
+    """적중 시 ImageCacheEntry를 반환하고 사용 시각/적중 수를 갱신한다."""
+    from diary.storages import is_storage_url
+    from entry.models import ImageCacheEntry
+
+    entry = ImageCacheEntry.objects.filter(key=key).first()
+    if entry is None:
+        return None
+    if not is_storage_url(storage, entry.image_url) or not storage.exists(entry.image_url[len(storage.url("")):]):
+        # 다른 스토리지 설정에서 만든 항목이거나 객체가 지워짐 → 버리고 다시 생성
+        entry.delete()
+        return None
+    ImageCacheEntry.objects.filter(id=entry.id).update(last_used_at=timezone.now(), hits=F("hits") + 1)
+    return entry
+
+
+def store_cached_image(key: str, model: str, size: str, image_url: str, storage,
+                       panel_image_urls: Optional[List[str]] = None) -> None:
+    """보관된 이미지 URL을 캐시에 넣고 크기 제한을 넘는 항목을 정리한다."""
+    from diary.storages import is_storage_url
+    from entry.models import ImageCacheEntry
+
+    if not is_storage_url(storage, image_url):
+        return
+    try:
+        ImageCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                "model": model,
+                "size": size,
+                "image_url": image_url,
+                "panel_image_urls": list(panel_image_urls or []),
+                "last_used_at": timezone.now(),
+            },
+        )
+    except IntegrityError:
+        # 동시에 같은 키가 저장된 경우 → 이미 캐시됨
+        return
+    _evict()
+
+
+def _evict() -> None:
+    from entry.models import ImageCacheEntry
+
+    overflow = ImageCacheEntry.objects.count() - _max_entries()
+    if overflow > 0:
+        oldest_ids = list(
+            ImageCacheEntry.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:overflow]
+        )
+        ImageCacheEntry.objects.filter(id__in=oldest_ids).delete()
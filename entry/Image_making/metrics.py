@@ -0,0 +1,32 @@
+"""
+지연시간 통계 헬퍼 (p50/p90/p99 등).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List
+
+
+def percentile(values: Iterable[float], q: float) -> float:
+    """nearest-rank 방식 백분위수 (q: 0~100). 값이 없으면 0.0"""
+    ordered: List[float] = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values: Iterable[float]) -> Dict[str, float]:
+    """count / mean / p50 / p90 / p99 / max"""
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1],
+    }
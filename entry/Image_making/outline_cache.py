@@ -0,0 +1,120 @@
+"""
+4컷 아웃라인 캐시 (DB 저장 → 서버 재시작 후에도 유지).
+
+일기 내용이 바뀌지 않았다면 재생성 시 gpt-4o-mini 호출을 건너뛰고
+저장된 패널 JSON을 그대로 사용한다.
+
+일기 저장 직후 워커가 아웃라인을 미리 만들어 두고(outline 작업), 내용이 다시 바뀌면
+이전 버전 아웃라인은 discard_stale_outlines로 버린다.
+
+크기 제한:
+- 일기당 최근 사용 OUTLINE_CACHE_MAX_PER_DIARY개만 유지
+- 전체 OUTLINE_CACHE_MAX_ENTRIES개를 넘으면 가장 오래 사용되지 않은 항목부터 삭제
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from entry.Image_making.pipeline import (
+    OUTLINE_MODEL,
+    _outline_diary_into_4_panels,
+    diary_outline_text,
+    outline_cache_key,
+)
+from entry.Image_making.tracing import span
+
+
+def _max_per_diary() -> int:
+    return int(getattr(settings, "OUTLINE_CACHE_MAX_PER_DIARY", 4))
+
+
+def _max_entries() -> int:
+    return int(getattr(settings, "OUTLINE_CACHE_MAX_ENTRIES", 10000))
+
+
+def diary_outline_key(diary, language: str = "en", model: str = OUTLINE_MODEL) -> str:
+    """일기의 현재 내용 버전에 해당하는 캐시 키"""
+    return outline_cache_key(diary_outline_text(diary), language=language, model=model)
+
+
+def has_outline(diary, key: str) -> bool:
+    from entry.models import OutlineCacheEntry
+
+    return OutlineCacheEntry.objects.filter(diary=diary, key=key).exists()
+
+
+def discard_stale_outlines(diary, current_key: str) -> int:
+    """현재 내용 버전(current_key)이 아닌 아웃라인을 삭제하고 삭제 건수를 반환한다."""
+    from entry.models import OutlineCacheEntry
+
+    deleted, _ = OutlineCacheEntry.objects.filter(diary=diary).exclude(key=current_key).delete()
+    return deleted
+
+
+def get_cached_outline(diary, key: str) -> Optional[List[Dict[str, Any]]]:
+    """캐시 적중 시 패널 리스트를 반환하고 사용 시각을 갱신한다."""
+    from entry.models import OutlineCacheEntry
+
+    entry = OutlineCacheEntry.objects.filter(diary=diary, key=key).only("id", "panels").first()
+    if entry is None:
+        return None
+    OutlineCacheEntry.objects.filter(id=entry.id).update(last_used_at=timezone.now())
+    return entry.panels
+
+
+def store_outline(diary, key: str, panels: List[Dict[str, Any]]) -> None:
+    """아웃라인을 저장하고 크기 제한을 넘는 항목을 정리한다."""
+    from entry.models import OutlineCacheEntry
+
+    try:
+        OutlineCacheEntry.objects.update_or_create(
+            diary=diary, key=key,
+            defaults={"panels": panels, "last_used_at": timezone.now()},
+        )
+    except IntegrityError:
+        # 동시에 같은 키가 저장된 경우 → 이미 캐시됨
+        return
+    _evict(diary)
+
+
+def _evict(diary) -> None:
+    from entry.models import OutlineCacheEntry
+
+    stale_ids = list(
+        OutlineCacheEntry.objects.filter(diary=diary)
+        .order_by("-last_used_at", "-id")
+        .values_list("id", flat=True)[_max_per_diary():]
+    )
+    if stale_ids:
+        OutlineCacheEntry.objects.filter(id__in=stale_ids).delete()
+
+    overflow = OutlineCacheEntry.objects.count() - _max_entries()
+    if overflow > 0:
+        oldest_ids = list(
+            OutlineCacheEntry.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:overflow]
+        )
+        OutlineCacheEntry.objects.filter(id__in=oldest_ids).delete()
+
+
+def get_outline_for_diary(
+    diary, diary_text: str, language: str = "en", model: str = OUTLINE_MODEL
+) -> List[Dict[str, Any]]:
+    """캐시를 먼저 확인하고, 없으면 GPT로 아웃라인을 만든 뒤 저장한다."""
+    key = outline_cache_key(diary_text, language=language, model=model)
+    with span("outline", diary_id=diary.pk) as outline_span:
+        panels = get_cached_outline(diary, key)
+        if panels is not None:
+            print(f"[OUTLINE] 캐시 적중 (diary {diary.pk})")
+            outline_span.outcome = "cached"
+            return panels
+
+        panels = _outline_diary_into_4_panels(diary_text, language=language, model=model)
+    # 실패 폴백(빈 패널)은 캐시하지 않는다
+    if any((p.get("scene") or "").strip() for p in panels):
+        store_outline(diary, key, panels)
+    return panels
@@ -13,212 +13,92 @@ OpenAI 기반 일기 → 프롬프트 변환 → 이미지 생성 파이프라
 
 from __future__ import annotations
 
-import base64
-import os
-import re
+import hashlib
+import io
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any, List
+from typing import Optional, Tuple, Dict, Any, List, Union, BinaryIO, Callable
 
-try:
-    # OpenAI Python SDK v1
-    from openai import OpenAI  # type: ignore
-except Exception:  # pragma: no cover - optional import
-    OpenAI = None  # type: ignore
-
-try:
-    from dotenv import load_dotenv  # type: ignore
-except Exception:  # pragma: no cover
-    load_dotenv = None  # type: ignore
+from entry.Image_making.backends import get_image_backend, get_outline_backend
+from entry.Image_making.client import ensure_env_loaded as _ensure_env_loaded
+from entry.Image_making.tracing import span, trace
+from entry.Image_making.styles import (
+    StyleTemplate,
+    get_style,
+    get_style_from_path,
+    parse_style_template,
+    render_panel_prompt,
+    render_prompt,
+)
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 PROJECT_ROOT = BASE_DIR
 MEDIA_DIR = PROJECT_ROOT / "media" / "generated"
 
-
-def _ensure_env_loaded() -> None:
-    """.env를 로드하고 OPENAI_API 키를 환경변수로 노출한다."""
-    if load_dotenv is not None:
-        env_path = PROJECT_ROOT / ".env"
-        if env_path.exists():
-            load_dotenv(dotenv_path=env_path)
-
-    api_key = (
-        os.getenv("OPENAI_API")
-        or os.getenv("OPENAI_API_KEY")
-        or os.getenv("OPENAI_API_TOKEN")
-    )
-    if api_key:
-        os.environ.setdefault("OPENAI_API_KEY", api_key)
-
-
 # ───────────────────────────
-# 스타일 / 레이아웃 / 네거티브
+# 일기 → 4패널 구조화 (JSON)  → 프롬프트 렌더
 # ───────────────────────────
 
-def _doodle_global_style_block() -> str:
-    # '하찮은 그림' 고정 스타일 (말풍선/톤/음영 등 제거)
-    return (
-        "[GLOBAL STYLE]\n"
-        "Ultra-simple black-and-white doodle, childlike and amateurish.\n"
-        "Single-weight clean line art, minimal detail, white background.\n"
-        "Stick-figure-like proportions, naive faces, thin black frames.\n"
-        "Short caption under each panel; no speech balloons.\n"
-        "No color, no shading, no hatching, no gradients, no photorealism.\n"
-    )
+OUTLINE_MODEL = "gpt-4o-mini"
+# 아웃라인 시스템/유저 프롬프트나 스키마를 바꾸면 올려서 기존 캐시를 무효화한다
+OUTLINE_PROMPT_VERSION = 1
 
 
-def _force_2x2_layout_block() -> str:
-    # 2x2 고정 및 '정확히 4컷' 강조
-    return (
-        "[LAYOUT]\n"
-        "A comic strip with EXACTLY four panels in a 2x2 grid (no more than four).\n"
-        "Top-left: Panel 1, top-right: Panel 2, bottom-left: Panel 3, bottom-right: Panel 4.\n"
-        "Equal panel sizes, clear white gutters, thin visible borders.\n"
-        "Do NOT draw 3x2, 1x6, 3x3, collage, storyboard, or any extra frames.\n"
+def outline_cache_key(diary_text: str, language: str = "en", model: str = OUTLINE_MODEL) -> str:
+    """(일기 텍스트, 언어, 모델, 프롬프트 버전)의 sha256 해시"""
+    payload = json.dumps(
+        [OUTLINE_PROMPT_VERSION, model, (language or "").lower(), (diary_text or "").strip()],
+        ensure_ascii=False,
     )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
-def _ensure_negative_prompt(text: str) -> str:
-    multi_panel_block = (
-        "6-panel, 9-panel, 3x2 grid, 3x3 grid, storyboard, collage, thumbnail sheet, "
-        "comic page layout, more than four panels, extra frames, split panels, "
-        "speech balloons, manga tones, shading, gradients, color, photorealism"
-    )
-    if "[NEGATIVE PROMPT]" not in text:
-        return text.rstrip() + "\n\n[NEGATIVE PROMPT]\n" + multi_panel_block + "\n"
-    neg_re = re.compile(r"(\[NEGATIVE PROMPT\]\s*)([\s\S]*)\Z")
-    return neg_re.sub(lambda m: m.group(1) + (m.group(2).strip() + ", " if m.group(2).strip() else "") + multi_panel_block + "\n", text)
+def diary_outline_text(diary) -> str:
+    """DiaryModel → 아웃라인 입력 텍스트 (캐시 키도 이 텍스트 기준)"""
+    return f"Title: {diary.note}\nDate: {diary.posted_date}\n\n{diary.content}"
 
 
-def _normalize_layout_to_2x2(prompt_text: str) -> str:
-    """[LAYOUT] 섹션을 2x2 고정 블록으로 대체/추가"""
-    layout_re = re.compile(r"\[LAYOUT\][\s\S]*?(?=\n\[PANEL|\n\[NEGATIVE PROMPT|\Z)")
-    if layout_re.search(prompt_text):
-        prompt_text = layout_re.sub(_force_2x2_layout_block(), prompt_text)
-    else:
-        prompt_text = _force_2x2_layout_block() + "\n" + prompt_text
-    return prompt_text
-
-
-def _clamp_to_four_panels(prompt_text: str) -> str:
-    """[PANEL N] 블록을 최대 4개로 제한(5번째 이상 제거)"""
-    panel_re = re.compile(r"\n\[PANEL\s*\d+[^\]]*\][\s\S]*?(?=\n\[PANEL|\n\[NEGATIVE PROMPT|\Z)")
-    panels = panel_re.findall("\n" + prompt_text)
-    if not panels:
-        return prompt_text
-    kept = panels[:4]
-    prompt_wo_panels = panel_re.sub("", "\n" + prompt_text)
-    neg_re = re.compile(r"\n\[NEGATIVE PROMPT\]")
-    m = neg_re.search(prompt_wo_panels)
-    joined_panels = "".join(kept)
-    if m:
-        idx = m.start()
-        prompt_text = prompt_wo_panels[:idx] + joined_panels + prompt_wo_panels[idx:]
-    else:
-        prompt_text = prompt_wo_panels + joined_panels
-    return prompt_text.strip()
-
-
-# ───────────────────────────
-# 일기 → 4패널 구조화 (JSON)  → 프롬프트 렌더
-# ───────────────────────────
-
-def _outline_diary_into_4_panels(diary_text: str, language: str = "en") -> List[Dict[str, Any]]:
+def _outline_diary_into_4_panels(
+    diary_text: str, language: str = "en", model: str = OUTLINE_MODEL
+) -> List[Dict[str, Any]]:
     """
     일기를 정확히 4개의 장면으로 압축 (Hook / Complication / HighPoint / Resolution).
-    OpenAI 사용; 실패 시 간단 폴백.
+    실제 호출은 outline 백엔드(CARTOON_BACKEND: openai / fake / record / replay)가 담당.
     """
     text = (diary_text or "").strip()
     if not text:
         return [{"scene":"", "caption":"", "emotion":""} for _ in range(4)]
+    return get_outline_backend().outline(text, language, model)
 
-    if OpenAI is None:
-        # 폴백: 텍스트 4등분
-        lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-        chunks = [" ".join(lines[i::4]) for i in range(4)] or ["", "", "", ""]
-        return [{"scene": c[:120], "caption": c[:40], "emotion": ""} for c in chunks]
 
-    client = OpenAI()
-    lang = "English" if language.lower().startswith("en") else "Korean"
-
-    system = (
-        "You are a story editor. Read the diary and compress it into EXACTLY 4 story beats "
-        "(Hook, Complication, HighPoint, Resolution). Output STRICT JSON only."
-    )
-    user = f"""
-Return JSON with schema:
-{{
-  "panels": [
-    {{"role":"Hook|Complication|HighPoint|Resolution", "scene": "<concise scene>", "caption": "<short {lang} caption>", "emotion":"<one word>"}}
-  ]
-}}
-
-Rules:
-- EXACTLY 4 items in "panels".
-- One main action per panel; merge minor events.
-- Keep captions short (<= 12 words). Use {lang}.
-DIARY:
-{text}
-"""
-    import json
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.3,
-        response_format={"type": "json_object"},
-        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-    )
-    try:
-        data = json.loads(resp.choices[0].message.content or "{}")
-        panels = (data.get("panels") or [])[:4]
-        while len(panels) < 4:
-            panels.append({"scene": "", "caption": "", "emotion": ""})
-        return [{"scene": p.get("scene",""), "caption": p.get("caption",""), "emotion": p.get("emotion","")} for p in panels]
-    except Exception:
-        return [{"scene":"", "caption":"", "emotion":""} for _ in range(4)]
-
-
-def _render_prompt(style_template: str, panels: List[Dict[str, Any]]) -> str:
+def _render_prompt(style_template: Union[str, StyleTemplate], panels: List[Dict[str, Any]]) -> str:
     """선택된 스타일 템플릿과 4패널 데이터를 결합해 최종 프롬프트를 생성."""
-    style_template = (style_template or "").strip()
-    # 스타일 템플릿이 주어지면 그대로 사용, 없으면 기본 '하찮은 그림' 스타일과 2x2 레이아웃 사용
-    if style_template:
-        header = style_template.rstrip() + "\n\n"
-    else:
-        header = _doodle_global_style_block() + "\n" + _force_2x2_layout_block() + "\n\n"
-
-    def ptext(idx: int, p: Dict[str, Any]) -> str:
-        scene = (p.get("scene") or "").strip()
-        emo   = (p.get("emotion") or "").strip()
-        cap   = (p.get("caption") or "").strip()
-        body = f"Scene: {scene}\n"
-        if emo:
-            body += f"Emotion: {emo}\n"
-        if cap:
-            body += f"Caption: {cap}\n"
-        return f"[PANEL {idx}]\n{body}"
-
-    # 정확히 4개만
-    p1 = ptext(1, panels[0] if len(panels) > 0 else {})
-    p2 = ptext(2, panels[1] if len(panels) > 1 else {})
-    p3 = ptext(3, panels[2] if len(panels) > 2 else {})
-    p4 = ptext(4, panels[3] if len(panels) > 3 else {})
-
-    prompt = header + "\n".join([p1, p2, p3, p4]) + "\n"
-    prompt = _ensure_negative_prompt(prompt)
-    prompt = _normalize_layout_to_2x2(prompt)
-    prompt = _clamp_to_four_panels(prompt)
-    return prompt
+    # 템플릿 텍스트가 오면 파싱(같은 텍스트는 캐시), 비어 있으면 기본 '하찮은 그림' 스타일
+    if not isinstance(style_template, StyleTemplate):
+        style_template = parse_style_template(style_template or "")
+    return render_prompt(style_template, panels)
 
 
-def build_prompt_from_diary(diary_text: str, style_template: str, language: str = "en") -> str:
+def build_prompt_from_diary(
+    diary_text: str,
+    style_template: Union[str, StyleTemplate],
+    language: str = "en",
+    panels: Optional[List[Dict[str, Any]]] = None,
+) -> str:
     """
     일기를 sample_prompt 스타일로 변환하되, 반드시 2x2(4패널)만 생성되도록 강제.
     - style_template 인자로 뭐가 오든, 내부 '하찮은 그림' 스타일+2x2 레이아웃로 통일.
+    - panels가 주어지면(캐시된 아웃라인) GPT 호출을 건너뛴다.
     """
     _ensure_env_loaded()
-    panels = _outline_diary_into_4_panels(diary_text, language=language)
-    prompt = _render_prompt(style_template=style_template, panels=panels)
+    if panels is None:
+        with span("outline"):
+            panels = _outline_diary_into_4_panels(diary_text, language=language)
+    with span("render"):
+        prompt = _render_prompt(style_template=style_template, panels=panels)
     return prompt
 
 
@@ -226,94 +106,377 @@ def build_prompt_from_diary(diary_text: str, style_template: str, language: str
 # 이미지 생성 (URL 우선 반환)
 # ───────────────────────────
 
-def generate_image(prompt: str, size: str = "1024x1024") -> Tuple[Optional[str], Optional[Path]]:
-    """
-    DALL·E 3로 이미지를 생성한다.
-    반환: (url, local_path)
-      - url: OpenAI가 제공하는 임시 URL(제공 시)
-      - local_path: base64 응답일 경우 저장한 로컬 파일 경로
-    """
-    _ensure_env_loaded()
+IMAGE_MODEL = "dall-e-3"
 
-    if OpenAI is None:
-        return None, None
+# 일기별 single-flight 임대 시간(초): 실행자가 이 시간 안에 끝내지 못하면 죽은 것으로 보고 이어받는다
+GENERATE_FLIGHT_TTL = 300
+SAVE_FLIGHT_TTL = 120
+# 웹 저장 요청이 다른 요청의 업로드를 기다리는 최대 시간(초). 넘으면 409로 돌려보내고 다시 시도하게 한다
+SAVE_REQUEST_WAIT = 5
 
-    client = OpenAI()
 
+def _request_image(
+    prompt: str, size: str = "1024x1024", response_format: str = "url"
+) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    image 백엔드(기본 DALL·E 3) 호출. 반환: (url, image_bytes)
+      - response_format="url": OpenAI 임시 URL
+      - response_format="b64_json": base64를 한 번만 디코딩한 PNG 바이트
+    fake / replay 백엔드는 형식과 상관없이 바이트를 돌려준다.
+    """
     # size는 1024x1024 고정
-    resp = client.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        size=size,
-        n=1,
-    )
+    with span("image") as image_span:
+        result = get_image_backend().generate(prompt, size, response_format, IMAGE_MODEL)
+        if result.url is None and result.image_bytes is None:
+            image_span.outcome = "error"
+            image_span.error = "empty image response"
+    return result.url, result.image_bytes
 
-    data = resp.data[0]
-    url = getattr(data, "url", None)
-    b64 = getattr(data, "b64_json", None)
 
+def generate_image(
+    prompt: str, size: str = "1024x1024", response_format: str = "url"
+) -> Tuple[Optional[str], Optional[Path]]:
+    """
+    DALL·E 3로 이미지를 생성한다.
+    반환: (url, local_path)
+      - url: OpenAI가 제공하는 임시 URL(제공 시)
+      - local_path: base64 응답일 경우 저장한 로컬 파일 경로 (요청마다 고유한 파일명)
+    """
+    url, image_bytes = _request_image(prompt, size=size, response_format=response_format)
     if url:
         return url, None
 
-    if b64:
+    if image_bytes:
         MEDIA_DIR.mkdir(parents=True, exist_ok=True)
-        file_path = MEDIA_DIR / "diary_4cut_1024.png"
+        file_path = MEDIA_DIR / f"diary_4cut_{uuid.uuid4().hex}.png"
         with open(file_path, "wb") as f:
-            f.write(base64.b64decode(b64))
+            f.write(image_bytes)
         return None, file_path
 
     return None, None
 
 
+def store_cartoon_image(image_bytes: bytes, diary_id: int, storage=None) -> str:
+    """
+    생성된 이미지 바이트를 CartoonStorage(또는 로컬 MEDIA_ROOT/cartoon)에
+    내용 해시 이름으로 바로 저장하고 URL을 반환한다. (같은 바이트면 업로드 생략)
+    """
+    from diary.storages import get_cartoon_storage, save_content_addressed
+
+    storage = storage or get_cartoon_storage()
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    with span("upload", diary_id=diary_id):
+        saved_path, _ = save_content_addressed(storage, io.BytesIO(image_bytes), digest=digest)
+    return storage.url(saved_path)
+
+
+def image_response_format() -> str:
+    """settings.CARTOON_IMAGE_MODE ('url' | 'b64') → OpenAI response_format"""
+    from django.conf import settings  # type: ignore
+
+    mode = str(getattr(settings, "CARTOON_IMAGE_MODE", "url")).lower()
+    return "b64_json" if mode in ("b64", "b64_json") else "url"
+
+
+def generation_mode() -> str:
+    """settings.CARTOON_GENERATION_MODE: 'grid'(한 장에 2x2) | 'panels'(4컷 따로 생성 후 합성)"""
+    from django.conf import settings  # type: ignore
+
+    mode = str(getattr(settings, "CARTOON_GENERATION_MODE", "grid")).lower()
+    return "panels" if mode == "panels" else "grid"
+
+
+# ───────────────────────────
+# 패널 모드: 4컷 동시 생성 → Pillow 2x2 합성
+# ───────────────────────────
+
+PANEL_TILE_SIZE = 512   # 합성 시 패널 한 칸 크기(px)
+PANEL_GUTTER = 16       # 패널 사이/바깥 여백(px) → 결과 1072x1072
+
+
+def _panel_image_bytes(prompt: str, size: str, response_format: str) -> bytes:
+    """패널 하나 생성 (워커 스레드에서 실행 - DB 접근 없음)"""
+    result = get_image_backend().generate(prompt, size, response_format, IMAGE_MODEL)
+    if result.image_bytes is not None:
+        return result.image_bytes
+    if result.url:
+        from entry.Image_making.transfer import DOWNLOAD_TIMEOUT, get_http_session
+
+        response = get_http_session().get(result.url, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+    raise RuntimeError("empty image response")
+
+
+def generate_panel_images(prompts: List[str], size: str = "1024x1024") -> List[bytes]:
+    """패널 프롬프트들을 동시에 생성해 PNG 바이트 리스트로 반환 (순서 유지, 하나라도 실패하면 예외)"""
+    response_format = image_response_format()
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        return list(pool.map(lambda p: _panel_image_bytes(p, size, response_format), prompts))
+
+
+def composite_2x2(panel_images: List[bytes], tile: int = PANEL_TILE_SIZE, gutter: int = PANEL_GUTTER) -> bytes:
+    """패널 이미지 4장을 흰 여백이 있는 2x2 PNG 한 장으로 합성"""
+    from PIL import Image
+
+    side = tile * 2 + gutter * 3
+    canvas = Image.new("RGB", (side, side), "white")
+    for i, image_bytes in enumerate(panel_images[:4]):
+        with Image.open(io.BytesIO(image_bytes)) as panel:
+            panel = panel.convert("RGB").resize((tile, tile), Image.LANCZOS)
+        x = gutter + (i % 2) * (tile + gutter)
+        y = gutter + (i // 2) * (tile + gutter)
+        canvas.paste(panel, (x, y))
+
+    buf = io.BytesIO()
+    canvas.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _generate_panel_cartoon(
+    diary_id: int, template: StyleTemplate, panels: List[Dict[str, Any]], storage=None, use_cache: bool = True
+) -> Tuple[str, str, List[str]]:
+    """
+    패널 모드 생성. 반환: (저장용 프롬프트, 합성 이미지 URL, 패널별 이미지 URL 4개)
+    합성본과 패널 4장 모두 CartoonStorage에 바로 저장한다.
+    """
+    from diary.storages import get_cartoon_storage
+
+    storage = storage or get_cartoon_storage()
+    with span("render"):
+        prompts = [render_panel_prompt(template, panels[i] if i < len(panels) else {}, i + 1) for i in range(4)]
+    prompt = "\n\n----------\n\n".join(prompts)
+
+    cache_key = _image_cache_lookup_key(prompt, f"panels:{PANEL_TILE_SIZE}", use_cache)
+    cached = _cached_image(cache_key, storage)
+    if cached is not None:
+        return prompt, cached.image_url, list(cached.panel_image_urls)
+
+    # 스팬 기록(DB)은 메인 스레드에서만 → image 스팬은 4컷 동시 생성 전체의 벽시계 시간
+    with span("image"):
+        panel_images = generate_panel_images(prompts)
+    with span("composite"):
+        composite = composite_2x2(panel_images)
+
+    panel_urls = [store_cartoon_image(image_bytes, diary_id, storage) for image_bytes in panel_images]
+    composite_url = store_cartoon_image(composite, diary_id, storage)
+    _remember_image(cache_key, f"panels:{PANEL_TILE_SIZE}", composite_url, storage, panel_urls)
+    return prompt, composite_url, panel_urls
+
+
+def _image_cache_lookup_key(prompt: str, size: str, use_cache: bool) -> Optional[str]:
+    """프롬프트 이미지 캐시 키 (캐시를 쓰지 않으면 None)"""
+    from entry.Image_making import image_cache
+
+    if not (use_cache and image_cache.cache_enabled()):
+        return None
+    return image_cache.image_cache_key(prompt, IMAGE_MODEL, size)
+
+
+def _cached_image(cache_key: Optional[str], storage):
+    """캐시 적중 시 ImageCacheEntry (image 스팬은 outcome=cached로 기록)"""
+    from entry.Image_making import image_cache
+
+    if cache_key is None:
+        return None
+    entry = image_cache.get_cached_image(cache_key, storage)
+    if entry is not None:
+        print(f"[IMAGE] 프롬프트 캐시 적중 ({cache_key[:12]})")
+        with span("image") as image_span:
+            image_span.outcome = "cached"
+    return entry
+
+
+def _remember_image(cache_key: Optional[str], size: str, image_url: Optional[str], storage,
+                    panel_image_urls: Optional[List[str]] = None) -> None:
+    from entry.Image_making import image_cache
+
+    if cache_key is None or not image_url:
+        return
+    try:
+        image_cache.store_cached_image(cache_key, IMAGE_MODEL, size, image_url, storage, panel_image_urls)
+    except Exception as e:
+        print(f"[IMAGE] 프롬프트 캐시 저장 실패: {e}")
+
+
 def generate_and_attach_image_to_diary(
     diary_id: int,
-    style_path: Path = PROJECT_ROOT / "sample_prompt.txt",
+    style_path: Optional[Path] = None,
     language: str = "en",
-) -> Tuple[str, Optional[str], Optional[Path]]:
+    style: Optional[str] = None,
+    storage=None,
+    use_cache: bool = True,
+) -> Tuple[str, Optional[str]]:
     """
     특정 DiaryModel(id)에 대해 프롬프트 생성 및 이미지 생성 후
-    diary.image_url에 URL(또는 로컬 파일 경로)을 저장한다.
+    diary.temp_image_url에 URL을 저장한다.
+    - 생성된 이미지는 바로 스토리지(storage, 기본 CartoonStorage)에 내용 해시 이름으로 보관한다.
+      (url 모드는 OpenAI 임시 URL에서 한 번 내려받아 보관, 실패 시 임시 URL 그대로 사용)
+    - 생성 결과는 변형(ImageVariant) 이력에 남아, 재생성 후에도 이전 결과를 다시 고를 수 있다.
+    - settings.CARTOON_IMAGE_CACHE가 켜져 있으면 같은 프롬프트의 보관된 이미지를 재사용한다.
+      use_cache=False면 이번 요청만 캐시를 건너뛰고 새로 생성한다 (재생성 버튼).
+    스타일은 style(이름) > style_path(파일) 순으로 결정 (둘 다 없으면 sample_prompt.txt).
+    같은 diary_id로 동시에 호출되면 하나만 실행되고 나머지는 그 결과를 받는다 (entry.singleflight).
+    반환: (prompt, temp_image_url)
     """
-    from entry.models import DiaryModel  # 지연 import
+    from entry.singleflight import single_flight
 
-    diary = DiaryModel.objects.get(pk=diary_id)
-    diary_text = f"Title: {diary.note}\nDate: {diary.posted_date}\n\n{diary.content}"
+    # 단계별 스팬(outline/render/image/upload)에 diary id / 스타일 태그를 붙인다
+    # 같은 일기에 대한 생성이 이미 진행 중이면(다른 워커 포함) 새로 호출하지 않고 그 결과를 받는다
+    with trace(diary_id=diary_id, style=style):
+        # 캐시 우회(재생성) 실행은 캐시를 쓰는 실행 결과를 받아 가면 안 되므로 key를 나눈다
+        prompt, temp_image_url = single_flight(
+            f"generate:{diary_id}" if use_cache else f"generate:{diary_id}:fresh",
+            lambda: list(_generate_and_attach(diary_id, style_path, language, style, storage, use_cache)),
+            ttl=GENERATE_FLIGHT_TTL,
+        )
+        return prompt, temp_image_url
 
-    style_text = ""
-    try:
-        if style_path and Path(style_path).exists():
-            style_text = Path(style_path).read_text(encoding="utf-8")
-    except Exception:
-        style_text = ""
 
-    prompt = build_prompt_from_diary(diary_text, style_template=style_text, language=language)
+def _generate_and_attach(
+    diary_id: int,
+    style_path: Optional[Path],
+    language: str,
+    style: Optional[str],
+    storage=None,
+    use_cache: bool = True,
+) -> Tuple[str, Optional[str]]:
+    from diary.storages import get_cartoon_storage
+    from entry import events
+    from entry.variants import record_variant
+    from entry.models import DiaryModel  # 지연 import
+    from entry.Image_making.outline_cache import get_outline_for_diary
 
-    url, local_path = generate_image(prompt, size="1024x1024")
+    diary = DiaryModel.objects.get(pk=diary_id)
+    diary_text = diary_outline_text(diary)
+    storage = storage or get_cartoon_storage()
 
-    if url:
-        diary.temp_image_url = url
-    elif local_path:
-        try:
-            from django.conf import settings  # type: ignore
-            rel_path = local_path.relative_to(settings.MEDIA_ROOT)
-            diary.temp_image_url = settings.MEDIA_URL.rstrip("/") + "/" + str(rel_path).replace("\\", "/")
-        except Exception:
-            diary.temp_image_url = str(local_path)
-    # 최종 프롬프트 저장
+    if style:
+        template = get_style(style)
+    else:
+        template = get_style_from_path(style_path or PROJECT_ROOT / "sample_prompt.txt")
+
+    panels = get_outline_for_diary(diary, diary_text, language=language)
+    # 진행 이벤트(SSE): 이미지가 나오기 전에 4컷 캡션부터 보여줄 수 있도록
+    events.publish(diary_id, events.EVENT_OUTLINE, captions=[p.get("caption", "") for p in panels])
+
+    if generation_mode() == "panels":
+        events.publish(diary_id, events.EVENT_IMAGE_REQUESTED, mode="panels")
+        prompt, diary.temp_image_url, diary.panel_image_urls = _generate_panel_cartoon(
+            diary_id, template, panels, storage, use_cache
+        )
+        diary.final_prompt = prompt
+        diary.save(update_fields=["temp_image_url", "panel_image_urls", "final_prompt"])
+        record_variant(diary, style=style or diary.style)
+        events.publish(diary_id, events.EVENT_IMAGE_READY, temp_image_url=diary.temp_image_url)
+        return prompt, diary.temp_image_url
+
+    prompt = build_prompt_from_diary(diary_text, style_template=template, language=language, panels=panels)
+
+    events.publish(diary_id, events.EVENT_IMAGE_REQUESTED, mode="grid")
+    cache_key = _image_cache_lookup_key(prompt, "1024x1024", use_cache)
+    cached = _cached_image(cache_key, storage)
+    if cached is not None:
+        diary.temp_image_url = cached.image_url
+    else:
+        url, image_bytes = _request_image(prompt, size="1024x1024", response_format=image_response_format())
+        if url:
+            # 임시 URL은 곧 만료되므로 바로 보관 → 나중에 이 변형을 다시 고르거나 저장할 때 재다운로드 없음
+            diary.temp_image_url = _keep_remote_image(url, storage, style=style or diary.style)
+        elif image_bytes:
+            # b64 모드: OpenAI 임시 URL을 거치지 않고 스토리지에 바로 저장
+            diary.temp_image_url = store_cartoon_image(image_bytes, diary_id, storage)
+        _remember_image(cache_key, "1024x1024", diary.temp_image_url, storage)
+    # 최종 프롬프트 저장 (이전 패널 모드 결과는 더 이상 이 이미지와 맞지 않음)
     diary.final_prompt = prompt
-    diary.save(update_fields=["temp_image_url", "final_prompt"])
-    return prompt, url, local_path
+    diary.panel_image_urls = []
+    diary.save(update_fields=["temp_image_url", "panel_image_urls", "final_prompt"])
+    if diary.temp_image_url:
+        record_variant(diary, style=style or diary.style)
+    events.publish(diary_id, events.EVENT_IMAGE_READY, temp_image_url=diary.temp_image_url)
+    return prompt, diary.temp_image_url
 
 
-def save_temp_image_to_s3(diary_id: int) -> Optional[str]:
+def save_temp_image_to_s3(diary_id: int, storage=None, wait: Optional[float] = None) -> Optional[str]:
     """
-    DiaryModel의 temp_image_url에서 이미지를 다운로드하고
-    S3에 업로드한 후 image_url에 저장
+    DiaryModel의 temp_image_url에서 이미지를 스트리밍으로 내려받으며
+    S3(CartoonStorage)에 업로드한 후 image_url에 저장
+    - 청크 단위로 SpooledTemporaryFile에 받으며 sha256 계산 → 내용 해시 이름으로 저장
+      (같은 이미지가 이미 있으면 업로드 생략, 객체는 Cache-Control: immutable)
+    - temp_image_url이 이미 스토리지 URL이면(생성 시 보관된 변형) 다운로드 없이 그대로 사용
+    - 저장 후 썸네일(128/256/512) / WebP 렌디션을 원본 옆에 만들어 image_renditions에 기록
+    - storage: 업로드 대상 스토리지 (기본 CartoonStorage, 테스트에서 주입 가능)
+    - 같은 diary_id로 동시에 호출되면 업로드는 한 번만 하고 나머지는 그 URL을 받는다
+    - wait: 진행 중인 업로드를 기다리는 최대 시간(초, 기본 SAVE_FLIGHT_TTL). 넘으면 SingleFlightTimeout
     반환: S3 URL (성공 시)
     """
+    from entry.singleflight import single_flight
+
+    # 중복 저장 요청(더블 클릭 / 여러 탭)은 진행 중인 업로드 결과를 그대로 받는다
+    with trace(diary_id=diary_id):
+        return single_flight(f"save:{diary_id}", lambda: _save_temp_image(diary_id, storage), ttl=SAVE_FLIGHT_TTL, wait=wait)
+
+
+def _attach_renditions(diary, storage, saved_name: str, image_file: BinaryIO) -> None:
+    """원본 옆에 썸네일/WebP 렌디션을 저장하고 diary.image_renditions에 기록 (실패해도 원본은 유지)"""
+    from entry.Image_making.renditions import store_renditions
+
+    try:
+        with span("rendition", style=diary.style):
+            diary.image_renditions = store_renditions(image_file, saved_name, storage)
+    except Exception as e:
+        print(f"[RENDITION] 렌디션 생성 실패 (원본만 사용): {e}")
+        diary.image_renditions = {}
+
+
+def _download_into_storage(
+    url: str, storage, style: Optional[str] = None,
+    on_stored: Optional[Callable[[str, str, BinaryIO], None]] = None,
+) -> Tuple[str, str]:
+    """
+    url 이미지를 청크 단위로 SpooledTemporaryFile에 받으며 sha256을 계산하고 내용 해시 이름으로 저장한다.
+    스토리지 키가 전체 바이트의 해시라서 업로드는 다운로드가 끝난 뒤 시작한다.
+    on_stored(저장된 이름, 저장 URL, 스풀 파일)는 스풀이 닫히기 전에 호출된다 (렌디션을 바이트 복사 없이 만들 때).
+    반환: (저장된 이름, 저장 URL). 다운로드 실패는 requests 예외로 전달
+    """
+    import tempfile
+    from diary.storages import save_content_addressed
+    from entry.Image_making.transfer import DOWNLOAD_TIMEOUT, get_http_session, spool_response
+
+    with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as spool:
+        with span("download", style=style):
+            with get_http_session().get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                digest = spool_response(response, spool)
+        # 같은 이미지가 이미 있으면 HEAD 1회로 끝 (PUT 생략)
+        with span("upload", style=style):
+            saved_path, _ = save_content_addressed(storage, spool, digest=digest)
+        saved_url = storage.url(saved_path)
+        if on_stored is not None:
+            spool.seek(0)
+            on_stored(saved_path, saved_url, spool)
+        return saved_path, saved_url
+
+
+def _keep_remote_image(url: str, storage=None, style: Optional[str] = None) -> str:
+    """OpenAI 임시 URL 이미지를 스토리지에 보관하고 그 URL을 반환 (실패하면 임시 URL 그대로)"""
+    from diary.storages import get_cartoon_storage
+
+    try:
+        return _download_into_storage(url, storage or get_cartoon_storage(), style)[1]
+    except Exception as e:
+        print(f"[VARIANT] 임시 이미지 보관 실패 (임시 URL 사용): {e}")
+        return url
+
+
+def _publish_persisted(diary) -> None:
+    from entry import events
+
+    events.publish(diary.id, events.EVENT_PERSISTED, image_url=diary.image_url, thumbnail_url=diary.thumbnail_url())
+
+
+def _save_temp_image(diary_id: int, storage=None) -> Optional[str]:
     import requests
-    from io import BytesIO
-    from datetime import datetime
     from entry.models import DiaryModel
 
     try:
@@ -323,42 +486,53 @@ def save_temp_image_to_s3(diary_id: int) -> Optional[str]:
         if not diary.temp_image_url:
             return None
 
-        # 2. temp_image_url에서 이미지 다운로드
-        response = requests.get(diary.temp_image_url, timeout=30)
-        response.raise_for_status()
-        image_data = BytesIO(response.content)
+        from diary.storages import get_cartoon_storage, is_storage_url
+        # CartoonStorage 사용 (media/cartoon/ 폴더에 저장, USE_S3=False면 로컬 MEDIA_ROOT)
+        storage = storage or get_cartoon_storage()
+
+        # 생성 시 이미 스토리지에 보관된 이미지(선택한 변형) → 다시 내려받지 않고 보관된 바이트로 확정
+        if is_storage_url(storage, diary.temp_image_url):
+            if diary.image_url == diary.temp_image_url and diary.image_renditions:
+                return diary.image_url
+            diary.image_url = diary.temp_image_url
+            saved_name = diary.temp_image_url[len(storage.url("")):]
+            try:
+                with storage.open(saved_name, "rb") as f:
+                    _attach_renditions(diary, storage, saved_name, f)
+            except Exception as e:
+                print(f"[RENDITION] 원본을 읽을 수 없음: {e}")
+                diary.image_renditions = {}
+            diary.save(update_fields=["image_url", "image_renditions"])
+            _publish_persisted(diary)
+            return diary.image_url
+
+        # 2. temp_image_url 다운로드 (임시 파일에 받으며 sha256 계산) → 3. 내용 해시 키로 업로드
+        renditions_before = diary.image_renditions
+
+        def attach(saved_path, url, image_file):
+            # 렌디션은 다운로드 스풀에서 바로 만든다 (이미지 전체를 bytes로 다시 들고 있지 않음)
+            if not (diary.image_url == url and renditions_before):
+                _attach_renditions(diary, storage, saved_path, image_file)
 
-        # 3. S3에 업로드
         try:
-            from django.conf import settings
-            from diary.storages import CartoonStorage
-
-            # 파일명 생성: diary_{id}_{timestamp}.png
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_name = f"diary_{diary_id}_{timestamp}.png"
-
-            # CartoonStorage 사용 (media/cartoon/ 폴더에 저장)
-            storage = CartoonStorage()
-            saved_path = storage.save(file_name, image_data)
-
-            # S3 URL 생성
-            s3_url = storage.url(saved_path)
-
-            # 4. image_url에 저장
-            diary.image_url = s3_url
-            diary.save(update_fields=["image_url"])
-
-            return s3_url
-
+            _, s3_url = _download_into_storage(diary.temp_image_url, storage, diary.style, on_stored=attach)
+        except requests.RequestException as e:
+            print(f"Image download failed: {e}")
+            return None
         except Exception as e:
             print(f"S3 upload failed: {e}")
             return None
+        if diary.image_url == s3_url and renditions_before:
+            return s3_url
+
+        # 4. image_url / 렌디션 저장
+        diary.image_url = s3_url
+        diary.save(update_fields=["image_url", "image_renditions"])
+        _publish_persisted(diary)
+        return s3_url
 
     except DiaryModel.DoesNotExist:
         return None
-    except requests.RequestException as e:
-        print(f"Image download failed: {e}")
-        return None
 
 
 def run_sample(
@@ -371,13 +545,7 @@ def run_sample(
     반환: (prompt_text, url, local_path)
     """
     diary_text = diary_path.read_text(encoding="utf-8")
-    style_text = ""
-    try:
-        if style_path and Path(style_path).exists():
-            style_text = Path(style_path).read_text(encoding="utf-8")
-    except Exception:
-        style_text = ""
-    prompt = build_prompt_from_diary(diary_text, style_template=style_text, language=language)
+    prompt = build_prompt_from_diary(diary_text, style_template=get_style_from_path(style_path), language=language)
     url, local_path = generate_image(prompt, size="1024x1024")
     return prompt, url, local_path
 
@@ -0,0 +1,103 @@
+"""
+저장된 만화 이미지의 썸네일 / WebP 렌디션.
+
+원본(예: <sha256>.png) 옆에 아래 파일을 같은 스토리지에 만든다.
+    <sha256>_128.png  <sha256>_256.png  <sha256>_512.png
+    <sha256>_128.webp <sha256>_256.webp <sha256>_512.webp <sha256>.webp (원본 크기)
+
+DiaryModel.image_renditions 에 저장되는 구조:
+    {"width": 1024, "png": {"128": url, ...}, "webp": {"128": url, ..., "1024": url}}
+템플릿 / JSON API는 srcset()으로 `url 128w, url 256w, ...` 문자열을 만든다.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from django.core.files.base import ContentFile
+
+
+RENDITION_WIDTHS = (128, 256, 512)
+WEBP_QUALITY = 80
+
+
+def _encode(image, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "webp":
+        image.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def build_renditions(image: Union[bytes, BinaryIO]) -> Dict[str, Any]:
+    """
+    원본(바이트 또는 seek 가능한 파일 객체) → {"width": w, "png": {w: bytes}, "webp": {w: bytes}}
+    원본보다 큰 크기는 만들지 않는다. 파일 객체는 처음부터 읽으므로 다운로드 스풀을 그대로 넘기면 된다.
+    """
+    from PIL import Image
+
+    if isinstance(image, bytes):
+        image = io.BytesIO(image)
+    image.seek(0)
+    with Image.open(image) as source:
+        source.load()
+        image = source.convert("RGBA" if source.mode in ("RGBA", "LA", "P") else "RGB")
+
+    width, height = image.size
+    result: Dict[str, Any] = {"width": width, "png": {}, "webp": {}}
+    for target in RENDITION_WIDTHS:
+        if target >= width:
+            continue
+        resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+        result["png"][target] = _encode(resized, "png")
+        result["webp"][target] = _encode(resized, "webp")
+    result["webp"][width] = _encode(image, "webp")
+    return result
+
+
+def _stem(name: str) -> str:
+    return name.rsplit(".", 1)[0] if "." in name.rsplit("/", 1)[-1] else name
+
+
+def store_renditions(image: Union[bytes, BinaryIO], original_name: str, storage) -> Dict[str, Any]:
+    """렌디션을 원본 이름 옆에 저장하고 DiaryModel.image_renditions 형태로 URL을 반환한다."""
+    built = build_renditions(image)
+    stem = _stem(original_name)
+    urls: Dict[str, Any] = {"width": built["width"], "png": {}, "webp": {}}
+    for fmt in ("png", "webp"):
+        for width, data in built[fmt].items():
+            suffix = "" if width == built["width"] else f"_{width}"
+            name = f"{stem}{suffix}.{fmt}"
+            # 원본 이름이 내용 해시면 렌디션도 결정적 → 이미 있으면 다시 올리지 않는다
+            saved = name if storage.exists(name) else storage.save(name, ContentFile(data))
+            urls[fmt][str(width)] = storage.url(saved)
+    return urls
+
+
+def rendition_names(original_name: str) -> List[str]:
+    """store_renditions가 original_name 옆에 만들 수 있는 렌디션 이름 (원본을 지울 때 함께 정리)"""
+    stem = _stem(original_name)
+    return [f"{stem}_{width}.{fmt}" for fmt in ("png", "webp") for width in RENDITION_WIDTHS] + [f"{stem}.webp"]
+
+
+def srcset(renditions: Optional[Dict[str, Any]], fmt: str = "png", original_url: Optional[str] = None) -> str:
+    """렌디션 → srcset 문자열. png는 original_url을 원본 크기 후보로 덧붙인다."""
+    if not renditions:
+        return ""
+    candidates = {int(width): url for width, url in (renditions.get(fmt) or {}).items()}
+    if fmt == "png" and original_url and renditions.get("width"):
+        candidates.setdefault(int(renditions["width"]), original_url)
+    return ", ".join(f"{url} {width}w" for width, url in sorted(candidates.items()))
+
+
+def thumbnail_url(renditions: Optional[Dict[str, Any]], width: int = 256, fmt: str = "webp") -> Optional[str]:
+    """width 이상인 가장 작은 렌디션 URL (없으면 가장 큰 것)"""
+    if not renditions:
+        return None
+    options = sorted((int(w), url) for w, url in (renditions.get(fmt) or {}).items())
+    for w, url in options:
+        if w >= width:
+            return url
+    return options[-1][1] if options else None
@@ -0,0 +1,327 @@
+"""
+OpenAI 호출 보호 계층: 속도 제한(토큰 버킷) + 재시도(지수 백오프, 지터) + 서킷 브레이커.
+
+- 속도 제한: 호출 종류(chat / images)별로 분당 요청 수(RPM)와 분당 토큰 수(TPM) 버킷
+- 재시도: 429 / 5xx / 타임아웃 / 연결 오류만, PRD에 따라 기본 최대 1회
+- 서킷 브레이커: 연속 실패가 임계치를 넘으면 일정 시간 즉시 실패(CircuitOpenError)
+  → 제공자 장애 시 워커가 타임아웃까지 붙잡혀 있지 않는다.
+
+상태(버킷 / 브레이커)는 프로세스 안에서만 공유되며 snapshot()으로 조회할 수 있다.
+OpenAI를 호출하는 프로세스가 여러 개면(run_generation_worker 여러 개, gunicorn 워커 등) 실제 호출량은
+프로세스 수 × 설정값이 되므로, OPENAI_LIMIT_PROCESSES에 그 수를 넣으면 각 프로세스가 설정값 / N만 쓴다.
+브레이커도 프로세스마다 따로 열리고 닫힌다 (장애 시 프로세스마다 임계치만큼은 실패를 겪는다).
+
+환경변수:
+    OPENAI_CHAT_RPM / OPENAI_CHAT_TPM      chat 호출 제한, 기본 500 / 200000
+    OPENAI_IMAGE_RPM                       images 호출 제한, 기본 50
+    OPENAI_LIMIT_PROCESSES                 위 제한을 나눠 쓰는 프로세스 수, 기본 1
+    OPENAI_LIMITER_MAX_WAIT                제한 대기 최대 시간(초), 기본 30
+    OPENAI_RETRY_MAX                       자동 재시도 횟수, 기본 1
+    OPENAI_RETRY_BASE_DELAY                백오프 기본 지연(초), 기본 1
+    OPENAI_BREAKER_FAILURES                서킷 오픈 연속 실패 수, 기본 5
+    OPENAI_BREAKER_RESET                   서킷 오픈 유지 시간(초), 기본 30
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class RateLimitTimeout(Exception):
+    """속도 제한 대기 시간이 최대치를 넘음"""
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출하지 않고 즉시 실패"""
+
+
+# ───────────────────────────
+# 토큰 버킷 / 속도 제한
+# ───────────────────────────
+
+class TokenBucket:
+    """분당 rate_per_min 만큼 채워지는 토큰 버킷 (용량 = 1분치)"""
+
+    def __init__(self, rate_per_min: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate_per_sec = rate_per_min / 60.0
+        self.capacity = float(rate_per_min)
+        self.tokens = float(rate_per_min)
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate_per_sec)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount를 꺼내려면 기다려야 하는 시간(초). 0이면 즉시 가능"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_sec
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+    def snapshot(self) -> Dict[str, float]:
+        self._refill()
+        return {"available": round(self.tokens, 2), "capacity": self.capacity}
+
+
+class RateLimiter:
+    """RPM + TPM 두 버킷을 함께 만족할 때까지 대기 (스레드 안전)"""
+
+    def __init__(
+        self,
+        requests_per_min: float,
+        tokens_per_min: float = 0,
+        max_wait: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._sleep = sleep
+        self.max_wait = max_wait
+        self.requests = TokenBucket(requests_per_min, clock) if requests_per_min > 0 else None
+        self.tokens = TokenBucket(tokens_per_min, clock) if tokens_per_min > 0 else None
+        self.waited_total = 0.0
+        self.throttled = 0
+
+    def acquire(self, tokens: int = 0) -> None:
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = max(
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                    self.tokens.wait_time(tokens) if self.tokens and tokens else 0.0,
+                )
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.take(1)
+                    if self.tokens and tokens:
+                        self.tokens.take(tokens)
+                    if waited:
+                        self.throttled += 1
+                        self.waited_total += waited
+                    return
+            if waited + wait > self.max_wait:
+                raise RateLimitTimeout(f"rate limit wait {waited + wait:.1f}s exceeds {self.max_wait:.1f}s")
+            self._sleep(wait)
+            waited += wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests.snapshot() if self.requests else None,
+                "tokens": self.tokens.snapshot() if self.tokens else None,
+                "throttled": self.throttled,
+                "waited_total_s": round(self.waited_total, 2),
+            }
+
+
+# ───────────────────────────
+# 서킷 브레이커
+# ───────────────────────────
+
+class CircuitBreaker:
+    """closed → (연속 실패 failure_threshold회) → open → (reset_timeout 경과) → half_open → closed/open"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError("OpenAI circuit open; failing fast")
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                # 반개방 상태에서는 탐색 호출 1건만 통과
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError("OpenAI circuit half-open; probe in flight")
+                self._probe_in_flight = True
+
+    def release(self) -> None:
+        """성공/실패로 셀 수 없는 결과(속도 제한 대기 초과, 4xx 요청 오류)로 끝난 경우 탐색 슬롯만 반환"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            remaining = 0.0
+            if self.state == self.OPEN:
+                remaining = max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "rejected": self.rejected,
+                "open_remaining_s": round(remaining, 1),
+            }
+
+
+# ───────────────────────────
+# 재시도 판단 / 호출 래퍼
+# ───────────────────────────
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429 / 5xx / 타임아웃 / 연결 오류만 재시도 대상"""
+    code = _status_code(exc)
+    if code is not None:
+        return code == 429 or code >= 500
+    name = type(exc).__name__
+    return name in ("APITimeoutError", "APIConnectionError", "Timeout", "TimeoutException", "ConnectError")
+
+
+# 재시도 한 번에 기다리는 최대 시간(초): 백오프와 서버의 Retry-After 모두 이 값을 넘지 않는다
+RETRY_DELAY_CAP = 20.0
+
+
+def _retry_after(exc: BaseException, cap: float = RETRY_DELAY_CAP) -> Optional[float]:
+    """서버가 준 Retry-After(초)를 [0, cap]으로 잘라 반환 (큰 값 / 음수 / 비정상 헤더로 워커가 묶이지 않게)"""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        delay = float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+    if delay is None or delay != delay:  # NaN
+        return None
+    return min(max(delay, 0.0), cap)
+
+
+def backoff_delay(attempt: int, base: float, cap: float = RETRY_DELAY_CAP) -> float:
+    """full jitter 지수 백오프: U(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _per_process(name: str, default: float) -> float:
+    """계정 전체 제한 → 이 프로세스 몫 (OPENAI_LIMIT_PROCESSES개 프로세스가 나눠 씀)"""
+    processes = max(1, int(_env_float("OPENAI_LIMIT_PROCESSES", 1)))
+    return _env_float(name, default) / processes
+
+
+_limiters: Dict[str, RateLimiter] = {
+    "chat": RateLimiter(
+        _per_process("OPENAI_CHAT_RPM", 500),
+        _per_process("OPENAI_CHAT_TPM", 200000),
+        max_wait=_env_float("OPENAI_LIMITER_MAX_WAIT", 30),
+    ),
+    "images": RateLimiter(
+        _per_process("OPENAI_IMAGE_RPM", 50),
+        max_wait=_env_float("OPENAI_LIMITER_MAX_WAIT", 30),
+    ),
+}
+breaker = CircuitBreaker(
+    failure_threshold=int(_env_float("OPENAI_BREAKER_FAILURES", 5)),
+    reset_timeout=_env_float("OPENAI_BREAKER_RESET", 30),
+)
+
+
+def get_limiter(kind: str) -> RateLimiter:
+    return _limiters[kind]
+
+
+def call_openai(
+    fn: Callable[[], T],
+    kind: str,
+    tokens: int = 0,
+    max_retries: Optional[int] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """
+    OpenAI 호출 fn()을 속도 제한 / 재시도 / 서킷 브레이커로 감싸 실행한다.
+    kind: "chat" | "images", tokens: 예상 토큰 수(TPM 계산용)
+    """
+    if max_retries is None:
+        max_retries = int(_env_float("OPENAI_RETRY_MAX", 1))
+    base_delay = _env_float("OPENAI_RETRY_BASE_DELAY", 1)
+    limiter = _limiters[kind]
+
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            limiter.acquire(tokens)
+        except RateLimitTimeout:
+            breaker.release()
+            raise
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_retryable(e):
+                # 4xx 등 요청 자체의 문제 → 제공자 장애로도, 회복으로도 보지 않음 (반개방 탐색 슬롯만 반환)
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if attempt >= max_retries:
+                raise
+            delay = _retry_after(e)
+            delay = backoff_delay(attempt, base_delay) if delay is None else delay
+            print(f"[OPENAI] {kind} 재시도 {attempt + 1}/{max_retries} ({type(e).__name__}), {delay:.1f}s 후")
+            sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+def snapshot() -> Dict[str, Any]:
+    """현재 프로세스의 속도 제한 / 서킷 브레이커 상태"""
+    return {
+        "limiters": {kind: limiter.snapshot() for kind, limiter in _limiters.items()},
+        "breaker": breaker.snapshot(),
+    }
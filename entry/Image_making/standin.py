@@ -0,0 +1,228 @@
+"""
+OpenAI API 로컬 대역(stand-in) 서버 + 전용 HTTP 클라이언트 (벤치마크용).
+
+- POST /v1/chat/completions   : 결정적 4패널 JSON (FakeBackend와 같은 규칙)
+- POST /v1/images/generations : 서버가 제공하는 임시 이미지 URL 또는 b64_json
+- GET  /images/<n>.png        : 임시 이미지 다운로드 (OpenAI 임시 URL 역할)
+
+엔드포인트별 지연시간(+지터)과 오류율을 주입할 수 있다.
+StandInClient는 OpenAI SDK와 같은 모양(client.chat.completions.create / client.images.generate)으로
+이 서버를 호출하므로 OpenAIBackend / call_openai(재시도, 서킷 브레이커)를 그대로 거친다.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import requests
+
+from entry.Image_making.backends import FakeBackend
+
+
+class StandInAPIError(Exception):
+    """대역 서버의 오류 응답 (status_code로 재시도 여부 판단)"""
+
+    def __init__(self, status_code: int, response: Any) -> None:
+        super().__init__(f"stand-in server returned {status_code}")
+        self.status_code = status_code
+        self.response = response
+
+
+class StandInServer:
+    """
+    with StandInServer(image_latency=2.0, error_rate=0.05) as server:
+        client = StandInClient(server.url)
+    """
+
+    def __init__(
+        self,
+        outline_latency: float = 0.0,
+        image_latency: float = 0.0,
+        download_latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = {"outline": outline_latency, "image": image_latency, "download": download_latency}
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._fake = FakeBackend()
+        self._images: Dict[str, bytes] = {}
+        self._images_lock = threading.Lock()
+        self._counter = 0
+        self.requests = {"outline": 0, "image": 0, "download": 0}
+        self.errors = {"outline": 0, "image": 0, "download": 0}
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ───────────────────────────
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # ───────────────────────────
+
+    def _delay(self, stage: str) -> None:
+        base = self.latency[stage]
+        if base <= 0:
+            return
+        with self._random_lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter) if self.jitter else 1
+        time.sleep(max(0.0, base * factor))
+
+    def _should_fail(self, stage: str) -> bool:
+        with self._random_lock:
+            self.requests[stage] += 1
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.errors[stage] += 1
+            return failed
+
+    def _new_image(self, prompt: str) -> str:
+        image_bytes = self._fake.generate(prompt, "1024x1024", "b64_json", "stand-in").image_bytes
+        with self._images_lock:
+            self._counter += 1
+            image_id = str(self._counter)
+            self._images[image_id] = image_bytes
+        return image_id
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _json(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_POST(self):
+                payload = self._body()
+                if self.path.endswith("/chat/completions"):
+                    stage = "outline"
+                elif self.path.endswith("/images/generations"):
+                    stage = "image"
+                else:
+                    self.send_error(404)
+                    return
+
+                server._delay(stage)
+                if server._should_fail(stage):
+                    self._json(server.error_status, {"error": {"message": "injected failure"}})
+                    return
+
+                if stage == "outline":
+                    user = payload["messages"][-1]["content"]
+                    diary_text = user.split("DIARY:", 1)[-1].strip()
+                    panels = server._fake.outline(diary_text, "en", payload.get("model", ""))
+                    content = json.dumps({"panels": panels}, ensure_ascii=False)
+                    self._json(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+                    return
+
+                image_id = server._new_image(payload.get("prompt", ""))
+                if payload.get("response_format") == "b64_json":
+                    with server._images_lock:
+                        image_bytes = server._images.pop(image_id)
+                    self._json(200, {"data": [{"b64_json": base64.b64encode(image_bytes).decode("ascii")}]})
+                else:
+                    self._json(200, {"data": [{"url": f"{server.url}/images/{image_id}.png"}]})
+
+            def do_GET(self):
+                if not self.path.startswith("/images/"):
+                    self.send_error(404)
+                    return
+                server._delay("download")
+                if server._should_fail("download"):
+                    self.send_error(server.error_status)
+                    return
+                with server._images_lock:
+                    image_bytes = server._images.pop(self.path.rsplit("/", 1)[-1].split(".")[0], None)
+                if image_bytes is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(image_bytes)))
+                self.end_headers()
+                self.wfile.write(image_bytes)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ───────────────────────────
+# 클라이언트 (OpenAI SDK와 같은 호출 모양)
+# ───────────────────────────
+
+def _namespace(value: Any) -> Any:
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+class StandInClient:
+    """client.chat.completions.create(...) / client.images.generate(...) 를 대역 서버로 보낸다"""
+
+    def __init__(self, base_url: str, timeout: float = 120.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.images = SimpleNamespace(generate=self._images)
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Any:
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise StandInAPIError(response.status_code, response)
+        return _namespace(response.json())
+
+    def _chat(self, **kwargs: Any) -> Any:
+        return self._post("/v1/chat/completions", kwargs)
+
+    def _images(self, **kwargs: Any) -> Any:
+        return self._post("/v1/images/generations", kwargs)
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,233 @@
+"""
+스타일 템플릿 레지스트리 + 1-pass 프롬프트 렌더러.
+
+sample_prompt_{simple,ani,real}.txt 를 한 번만 읽어 구조화(헤더 / 레이아웃 / 네거티브)해 두고,
+파일 mtime이 바뀌었을 때만 다시 읽는다.
+
+렌더 결과 구조(항상 동일):
+    헤더([GLOBAL STYLE] 등) → 2x2 고정 [LAYOUT] → [PANEL 1..4] → [NEGATIVE PROMPT]
+- 템플릿의 [LAYOUT]은 2x2 고정 블록으로 대체
+- 템플릿의 [NEGATIVE PROMPT] 뒤에 다중 패널 금지 문구를 덧붙임
+- 패널은 정확히 4개
+
+패널 모드(render_panel_prompt): 같은 헤더/네거티브로 패널 하나짜리 프롬프트를 만들고,
+4장을 따로 생성해 로컬에서 2x2로 합성한다.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# 스타일 이름 → 프롬프트 템플릿 파일
+STYLE_PROMPT_FILES: Dict[str, Path] = {
+    "simple": PROJECT_ROOT / "sample_prompt_simple.txt",
+    "ani": PROJECT_ROOT / "sample_prompt_ani.txt",
+    "real": PROJECT_ROOT / "sample_prompt_real.txt",
+}
+DEFAULT_STYLE = "simple"
+
+
+def resolve_style_path(style: Optional[str]) -> Path:
+    """스타일 이름(simple/ani/real)에 해당하는 템플릿 경로. 알 수 없으면 simple."""
+    key = (style or "").strip().lower()
+    return STYLE_PROMPT_FILES.get(key, STYLE_PROMPT_FILES[DEFAULT_STYLE])
+
+
+# ───────────────────────────
+# 스타일 / 레이아웃 / 네거티브 고정 블록
+# ───────────────────────────
+
+# '하찮은 그림' 고정 스타일 (말풍선/톤/음영 등 제거) - 템플릿이 없을 때 사용
+DOODLE_GLOBAL_STYLE_BLOCK = (
+    "[GLOBAL STYLE]\n"
+    "Ultra-simple black-and-white doodle, childlike and amateurish.\n"
+    "Single-weight clean line art, minimal detail, white background.\n"
+    "Stick-figure-like proportions, naive faces, thin black frames.\n"
+    "Short caption under each panel; no speech balloons.\n"
+    "No color, no shading, no hatching, no gradients, no photorealism.\n"
+)
+
+# 2x2 고정 및 '정확히 4컷' 강조
+FORCE_2X2_LAYOUT_BLOCK = (
+    "[LAYOUT]\n"
+    "A comic strip with EXACTLY four panels in a 2x2 grid (no more than four).\n"
+    "Top-left: Panel 1, top-right: Panel 2, bottom-left: Panel 3, bottom-right: Panel 4.\n"
+    "Equal panel sizes, clear white gutters, thin visible borders.\n"
+    "Do NOT draw 3x2, 1x6, 3x3, collage, storyboard, or any extra frames.\n"
+)
+
+MULTI_PANEL_NEGATIVE = (
+    "6-panel, 9-panel, 3x2 grid, 3x3 grid, storyboard, collage, thumbnail sheet, "
+    "comic page layout, more than four panels, extra frames, split panels, "
+    "speech balloons, manga tones, shading, gradients, color, photorealism"
+)
+
+# 패널 모드: 한 장에 한 컷만
+SINGLE_PANEL_LAYOUT_BLOCK = (
+    "[LAYOUT]\n"
+    "A single square comic panel: exactly one frame with a thin black border and white margin.\n"
+    "Draw only the scene below; do NOT split it into a grid or add other panels.\n"
+)
+
+SINGLE_PANEL_NEGATIVE = "2x2 grid, two or more panels, " + MULTI_PANEL_NEGATIVE
+
+_SECTION_RE = re.compile(r"^\[([A-Za-z][A-Za-z0-9 ]*)\][ \t]*$", re.MULTILINE)
+
+
+# ───────────────────────────
+# 템플릿 파싱
+# ───────────────────────────
+
+@dataclass(frozen=True)
+class StyleTemplate:
+    """구조화된 스타일 템플릿"""
+
+    header: str     # [LAYOUT] / [NEGATIVE PROMPT] / [PANEL] 를 제외한 섹션들
+    layout: str     # 원본 [LAYOUT] 본문 (렌더 시 2x2 고정 블록으로 대체됨)
+    negative: str   # 원본 [NEGATIVE PROMPT] 본문
+
+
+DEFAULT_TEMPLATE = StyleTemplate(header=DOODLE_GLOBAL_STYLE_BLOCK.strip(), layout="", negative="")
+
+
+@lru_cache(maxsize=32)
+def parse_style_template(text: str) -> StyleTemplate:
+    """템플릿 텍스트를 섹션 단위로 나눈다. 비어 있으면 기본 '하찮은 그림' 스타일."""
+    text = (text or "").strip()
+    if not text:
+        return DEFAULT_TEMPLATE
+
+    header_parts: List[str] = []
+    layout = negative = ""
+
+    matches = list(_SECTION_RE.finditer(text))
+    preamble = text[: matches[0].start()].strip() if matches else text
+    if preamble:
+        header_parts.append(preamble)
+
+    for i, m in enumerate(matches):
+        name = " ".join(m.group(1).upper().split())
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[m.end():end].strip()
+        if name == "LAYOUT":
+            layout = body
+        elif name == "NEGATIVE PROMPT":
+            negative = body.rstrip(" ,.")
+        elif name.startswith("PANEL"):
+            # 패널은 일기 아웃라인에서 채운다
+            continue
+        else:
+            header_parts.append(f"[{name}]\n{body}" if body else f"[{name}]")
+
+    return StyleTemplate(header="\n\n".join(header_parts), layout=layout, negative=negative)
+
+
+# ───────────────────────────
+# 렌더링 (1-pass)
+# ───────────────────────────
+
+def _panel_block(idx: int, p: Dict[str, Any]) -> str:
+    scene = (p.get("scene") or "").strip()
+    emo = (p.get("emotion") or "").strip()
+    cap = (p.get("caption") or "").strip()
+    body = f"Scene: {scene}\n"
+    if emo:
+        body += f"Emotion: {emo}\n"
+    if cap:
+        body += f"Caption: {cap}\n"
+    return f"[PANEL {idx}]\n{body}"
+
+
+def render_prompt(template: StyleTemplate, panels: List[Dict[str, Any]]) -> str:
+    """헤더 + 2x2 레이아웃 + 정확히 4개 패널 + 네거티브를 한 번에 조립한다."""
+    parts: List[str] = []
+    if template.header:
+        parts.append(template.header + "\n\n")
+    parts.append(FORCE_2X2_LAYOUT_BLOCK + "\n")
+    parts.append("\n".join(
+        _panel_block(i + 1, panels[i] if i < len(panels) else {}) for i in range(4)
+    ))
+    parts.append("\n[NEGATIVE PROMPT]\n")
+    if template.negative:
+        parts.append(template.negative + ", ")
+    parts.append(MULTI_PANEL_NEGATIVE)
+    return "".join(parts)
+
+
+def render_panel_prompt(template: StyleTemplate, panel: Dict[str, Any], index: int) -> str:
+    """패널 모드: 헤더 + 단일 컷 레이아웃 + [PANEL index] + 네거티브"""
+    parts: List[str] = []
+    if template.header:
+        parts.append(template.header + "\n\n")
+    parts.append(SINGLE_PANEL_LAYOUT_BLOCK + "\n")
+    parts.append(_panel_block(index, panel or {}))
+    parts.append("\n[NEGATIVE PROMPT]\n")
+    if template.negative:
+        parts.append(template.negative + ", ")
+    parts.append(SINGLE_PANEL_NEGATIVE)
+    return "".join(parts)
+
+
+# ───────────────────────────
+# 레지스트리 (mtime 기반 재로딩)
+# ───────────────────────────
+
+class StyleRegistry:
+    """템플릿 파일 경로별 파싱 결과 캐시. 파일 mtime이 바뀌면 다시 읽는다."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cache: Dict[Path, Tuple[int, StyleTemplate]] = {}
+
+    def get_path(self, path: Union[str, Path, None]) -> StyleTemplate:
+        if not path:
+            return DEFAULT_TEMPLATE
+        path = Path(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return DEFAULT_TEMPLATE
+
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            try:
+                template = parse_style_template(path.read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError):
+                template = DEFAULT_TEMPLATE
+            self._cache[path] = (mtime, template)
+            return template
+
+    def get(self, style: Optional[str]) -> StyleTemplate:
+        return self.get_path(resolve_style_path(style))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+registry = StyleRegistry()
+
+
+def get_style(style: Optional[str]) -> StyleTemplate:
+    """스타일 이름으로 템플릿 조회"""
+    return registry.get(style)
+
+
+def get_style_from_path(path: Union[str, Path, None]) -> StyleTemplate:
+    """템플릿 파일 경로로 조회"""
+    return registry.get_path(path)
@@ -0,0 +1,153 @@
+"""
+만화 생성 단계별 타이밍 스팬.
+
+    with trace(diary_id=diary.id, style="ani"):
+        with span("outline") as s:
+            ...
+            s.outcome = "cached"
+
+- trace(): 한 번의 생성/저장 작업에 trace_id를 붙이고, 안쪽 스팬에 diary_id / style 태그를 물려준다.
+- span(): 소요 시간과 결과(ok / cached / error)를 싱크에 기록한다. 예외는 그대로 다시 던진다.
+- 싱크(settings.CARTOON_TRACE_SINK): "db"(StageSpan 테이블, 기본) | "log"(entry.tracing 로거에 JSON) | "off"
+  싱크 기록 실패는 생성 흐름에 영향을 주지 않는다.
+
+stage_latency_summary()로 단계별 p50/p90/p99를 집계한다.
+StageSpan은 생성마다 5~7행씩 쌓이므로 prune_spans()가 CARTOON_TRACE_RETENTION_DAYS(기본 14일)가 지난 행을 지운다
+(run_generation_worker가 시작할 때와 이후 한 시간마다 호출).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from entry.Image_making.metrics import summarize
+
+
+logger = logging.getLogger("entry.tracing")
+
+STAGES = ["outline", "render", "image", "composite", "download", "upload", "rendition"]
+
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("cartoon_trace", default=None)
+
+
+class Span:
+    def __init__(self, stage: str, tags: Dict[str, Any]) -> None:
+        self.stage = stage
+        self.tags = tags
+        self.outcome = "ok"
+        self.error = ""
+        self.duration_ms = 0.0
+
+
+def _sink() -> str:
+    from django.conf import settings
+
+    return str(getattr(settings, "CARTOON_TRACE_SINK", "db")).lower()
+
+
+def _record(span: Span, started_at) -> None:
+    sink = _sink()
+    if sink in ("off", "none", ""):
+        return
+    record = {
+        "trace_id": span.tags["trace_id"],
+        "stage": span.stage,
+        "diary_id": span.tags.get("diary_id"),
+        "style": span.tags.get("style") or "",
+        "outcome": span.outcome,
+        "error": span.error[:300],
+        "duration_ms": round(span.duration_ms, 2),
+    }
+    try:
+        if sink == "log":
+            logger.info(json.dumps(dict(record, started_at=started_at.isoformat()), ensure_ascii=False))
+        else:
+            from entry.models import StageSpan
+
+            StageSpan.objects.create(started_at=started_at, **record)
+    except Exception as e:
+        print(f"[TRACE] 스팬 기록 실패: {e}")
+
+
+@contextmanager
+def trace(diary_id: Optional[int] = None, style: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """안쪽 span()들에 공통 태그(trace_id, diary_id, style)를 붙인다. 중첩되면 바깥 trace_id를 유지"""
+    parent = _current.get()
+    tags = {
+        "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+        "diary_id": diary_id if diary_id is not None else (parent or {}).get("diary_id"),
+        "style": style or (parent or {}).get("style"),
+    }
+    token = _current.set(tags)
+    try:
+        yield tags
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(stage: str, **tags: Any) -> Iterator[Span]:
+    from django.utils import timezone
+
+    base = _current.get() or {"trace_id": uuid.uuid4().hex}
+    current = Span(stage, {**base, **{k: v for k, v in tags.items() if v is not None}})
+    started_at = timezone.now()
+    t0 = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.outcome = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - t0) * 1000
+        _record(current, started_at)
+
+
+def stage_latency_summary(hours: float = 24, style: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """최근 hours시간 StageSpan을 단계별로 집계 (ms 단위 count/mean/p50/p90/p99/max + 결과별 건수)"""
+    from django.utils import timezone
+    from entry.models import StageSpan
+
+    queryset = StageSpan.objects.filter(started_at__gte=timezone.now() - timedelta(hours=hours))
+    if style:
+        queryset = queryset.filter(style=style)
+
+    durations: Dict[str, list] = {}
+    outcomes: Dict[str, Dict[str, int]] = {}
+    for stage, outcome, duration_ms in queryset.values_list("stage", "outcome", "duration_ms").iterator():
+        outcomes.setdefault(stage, {}).setdefault(outcome, 0)
+        outcomes[stage][outcome] += 1
+        # 실패한 호출은 지연 분포에서 제외 (타임아웃이 분포를 왜곡하지 않도록)
+        if outcome != "error":
+            durations.setdefault(stage, []).append(duration_ms)
+
+    ordered = STAGES + sorted(set(outcomes) - set(STAGES))
+    summary = {}
+    for stage in ordered:
+        if stage not in outcomes:
+            continue
+        stats = {key: round(value, 1) if isinstance(value, float) else value
+                 for key, value in summarize(durations.get(stage, [])).items()}
+        stats["outcomes"] = outcomes[stage]
+        summary[stage] = stats
+    return summary
+
+
+def prune_spans(retention: Optional[timedelta] = None) -> int:
+    """보관 기간(기본 settings.CARTOON_TRACE_RETENTION_DAYS)이 지난 StageSpan을 지우고 삭제 건수를 반환"""
+    from django.conf import settings
+    from django.utils import timezone
+    from entry.models import StageSpan
+
+    if retention is None:
+        retention = timedelta(days=float(getattr(settings, "CARTOON_TRACE_RETENTION_DAYS", 14)))
+    deleted, _ = StageSpan.objects.filter(started_at__lt=timezone.now() - retention).delete()
+    return deleted
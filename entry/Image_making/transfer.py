@@ -0,0 +1,58 @@
+"""
+임시 이미지 URL → 스토리지 전송.
+
+- 프로세스 공유 requests.Session (커넥션 풀 / keep-alive)
+- 응답 본문을 청크 단위로 임시 파일(작으면 메모리, 크면 디스크)에 받으면서 sha256을 계산한다.
+  → 내용 해시로 스토리지 키를 정해 이미 있는 객체는 업로드를 건너뛴다 (diary.storages.save_content_addressed).
+
+환경변수:
+    IMAGE_DOWNLOAD_POOL_MAXSIZE    커넥션 풀 크기, 기본 10
+    IMAGE_DOWNLOAD_CHUNK_SIZE      다운로드 청크 크기(바이트), 기본 65536
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("IMAGE_DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
+# (연결, 읽기) 타임아웃(초)
+DOWNLOAD_TIMEOUT = (5, 30)
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+
+def get_http_session() -> requests.Session:
+    """이미지 다운로드용 공유 세션"""
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            pool_size = int(os.getenv("IMAGE_DOWNLOAD_POOL_MAXSIZE", "10"))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def spool_response(response: Any, fileobj: Any, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> str:
+    """
+    응답 본문을 청크 단위로 fileobj(SpooledTemporaryFile 등)에 받으면서 sha256을 계산한다.
+    반환: 본문 sha256 hex (fileobj는 처음 위치로 되돌려 둔다)
+    """
+    digest = hashlib.sha256()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        digest.update(chunk)
+        fileobj.write(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
@@ -1,8 +1,49 @@
 from django.contrib import admin
-from .models import DiaryModel
+from .models import DiaryModel, FlightLease, GenerationJob, ImageCacheEntry, ImageVariant, ProductivityStat, StageSpan
 
 # Register your models here.
 class DiaryModelAdmin(admin.ModelAdmin):
     list_display = ['note', 'posted_date', 'temp_image_url', 'image_url']
 
 admin.site.register(DiaryModel, DiaryModelAdmin)
+
+
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'diary', 'kind', 'status', 'style', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status', 'style']
+
+admin.site.register(GenerationJob, GenerationJobAdmin)
+
+
+class StageSpanAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'stage', 'diary_id', 'style', 'outcome', 'duration_ms']
+    list_filter = ['stage', 'outcome', 'style']
+
+admin.site.register(StageSpan, StageSpanAdmin)
+
+
+class FlightLeaseAdmin(admin.ModelAdmin):
+    list_display = ['key', 'status', 'started_at', 'expires_at', 'finished_at']
+    list_filter = ['status']
+
+admin.site.register(FlightLease, FlightLeaseAdmin)
+
+
+class ImageVariantAdmin(admin.ModelAdmin):
+    list_display = ['id', 'diary', 'author', 'style', 'created_at']
+    list_filter = ['style']
+
+admin.site.register(ImageVariant, ImageVariantAdmin)
+
+
+class ImageCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['key', 'model', 'size', 'hits', 'last_used_at']
+
+admin.site.register(ImageCacheEntry, ImageCacheEntryAdmin)
+
+
+class ProductivityStatAdmin(admin.ModelAdmin):
+    list_display = ['author', 'period', 'period_start', 'count', 'total', 'min_productivity', 'max_productivity', 'streak']
+    list_filter = ['period']
+
+admin.site.register(ProductivityStat, ProductivityStatAdmin)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class EntryConfig(AppConfig):
     name = 'entry'
+
+    def ready(self):
+        from . import signals  # noqa: F401  일기 저장·삭제 → 생산성 통계 갱신
@@ -0,0 +1,53 @@
+"""
+만화 생성 진행 이벤트.
+
+파이프라인(워커 프로세스)이 단계마다 publish()로 GenerationEvent 행을 남기고,
+웹의 generation_status 뷰(상태 조회 폴링)가 job_progress()로 그 작업의 단계와 4컷 캡션을 함께 돌려준다.
+→ 화면은 이미지보다 먼저 캡션을 보여 주고, 요청은 조회 한 번으로 끝나 웹 워커를 붙잡지 않는다.
+
+    outline         4컷 아웃라인 완성      {"captions": [...4개]}
+    image_requested 이미지 생성 요청 보냄  {"mode": "grid" | "panels"}
+    image_ready     임시 이미지 준비 완료  {"temp_image_url": ...}
+    persisted       스토리지 저장 완료     {"image_url": ..., "thumbnail_url": ...}
+    failed          작업 실패             {"message": ...}
+"""
+
+from datetime import timedelta
+from typing import Any, Dict
+
+from django.utils import timezone
+
+from .models import GenerationEvent
+
+
+EVENT_OUTLINE = 'outline'
+EVENT_IMAGE_REQUESTED = 'image_requested'
+EVENT_IMAGE_READY = 'image_ready'
+EVENT_PERSISTED = 'persisted'
+EVENT_FAILED = 'failed'
+
+EVENT_RETENTION = timedelta(days=1)
+
+
+def publish(diary_id: int, event: str, **data) -> None:
+    """진행 이벤트 기록. 실패해도 생성 흐름에는 영향을 주지 않는다."""
+    try:
+        if event == EVENT_OUTLINE:
+            # 새 생성이 시작될 때 오래된 이벤트 정리
+            GenerationEvent.objects.filter(
+                diary_id=diary_id, created_at__lt=timezone.now() - EVENT_RETENTION,
+            ).delete()
+        GenerationEvent.objects.create(diary_id=diary_id, event=event, data=data)
+    except Exception as e:
+        print(f"[EVENT] 이벤트 기록 실패 ({event}, diary {diary_id}): {e}")
+
+
+def job_progress(job) -> Dict[str, Any]:
+    """작업이 등록된 뒤 기록된 이벤트 → 마지막 단계(stage)와 4컷 캡션 (아직 없으면 None / [])"""
+    stage, captions = None, []
+    events = GenerationEvent.objects.filter(diary_id=job.diary_id, created_at__gte=job.created_at).order_by('id')
+    for event, data in events.values_list('event', 'data'):
+        stage = event
+        if event == EVENT_OUTLINE:
+            captions = (data or {}).get('captions') or []
+    return {'stage': stage, 'captions': captions}
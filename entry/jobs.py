@@ -0,0 +1,213 @@
+"""
+만화 생성 작업 큐 헬퍼.
+
+- enqueue_generation: 웹 요청에서 작업 등록 (즉시 반환, 진행 중인 작업이 있으면 그 작업 반환)
+- enqueue_outline: 일기 저장 직후 4컷 아웃라인을 미리 만들어 두는 작업 등록 (내용 버전별)
+- claim_next_job: 워커가 대기 중인 작업 하나를 원자적으로 가져감
+- run_job: 파이프라인 실행 후 결과/에러를 작업에 기록
+- requeue_stale_jobs: 워커가 죽어 running 상태로 남은 작업을 다시 대기열로 (MAX_ATTEMPTS회까지, 넘으면 failed)
+
+DB 조건부 UPDATE로 작업을 선점하므로 SQLite/Postgres 모두에서
+여러 워커 프로세스를 동시에 띄워도 같은 작업을 중복 처리하지 않는다.
+"""
+
+import time
+from datetime import timedelta
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .events import EVENT_FAILED, publish
+from .models import DiaryModel, GenerationJob
+
+
+# image 작업이 같은 일기의 실행 중인 outline 작업을 기다리는 최대 시간(초)
+OUTLINE_WAIT_SECONDS = 30
+OUTLINE_WAIT_POLL = 0.2
+
+# 한 작업을 실행(선점)할 수 있는 최대 횟수. 매번 제한 시간을 넘기거나 워커를 죽이는 작업은 여기서 포기한다
+MAX_ATTEMPTS = 3
+
+
+def enqueue_generation(
+    diary: DiaryModel, style: str = 'simple', language: str = 'en', bypass_cache: bool = False,
+) -> GenerationJob:
+    """
+    이미지 생성 작업을 대기열에 등록한다. bypass_cache=True면 프롬프트 이미지 캐시를 쓰지 않는다.
+    같은 일기에 queued/running image 작업이 이미 있으면(더블 클릭, 여러 탭) 새로 만들지 않고 그 작업을 반환.
+    - 캐시를 써도 되는 요청은 진행 중인 어떤 작업에든 붙는다.
+    - 재생성(bypass_cache) 요청은 캐시 우회 작업에만 붙는다. 아직 대기 중인 캐시 작업은 우회로 바꿔 쓰고,
+      이미 실행 중이면 우회 작업을 따로 등록한다 (캐시된 결과를 새 이미지로 돌려주지 않도록).
+    동시에 등록돼도 unique_active_image_job_per_cache_mode 제약으로 모드별 하나만 생성된다.
+    """
+    active = GenerationJob.objects.filter(
+        diary=diary,
+        kind=GenerationJob.KIND_IMAGE,
+        status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING],
+    )
+    if bypass_cache:
+        active = active.filter(bypass_cache=True)
+    while True:
+        existing = active.order_by('-bypass_cache', 'created_at').first()
+        if existing:
+            return existing
+        if bypass_cache:
+            queued = GenerationJob.objects.filter(
+                diary=diary, kind=GenerationJob.KIND_IMAGE, status=GenerationJob.STATUS_QUEUED, bypass_cache=False,
+            )
+            job_id = queued.values_list('id', flat=True).first()
+            if job_id is not None and queued.filter(id=job_id).update(bypass_cache=True):
+                return GenerationJob.objects.get(id=job_id)
+        try:
+            with transaction.atomic():
+                return GenerationJob.objects.create(
+                    diary=diary, style=style, language=language, bypass_cache=bypass_cache,
+                )
+        except IntegrityError:
+            continue  # 다른 요청이 먼저 등록 → 그 작업에 합류
+
+
+def enqueue_outline(diary_id: int, language: str = 'en') -> Optional[GenerationJob]:
+    """
+    일기의 현재 내용 버전에 대한 아웃라인 작업을 등록한다.
+    - 이전 버전 아웃라인과 아직 시작하지 않은 이전 버전 작업은 버린다.
+    - 이미 아웃라인이 있으면 None, 같은 버전 작업이 대기/실행 중이면 그 작업을 반환.
+    """
+    from .Image_making.outline_cache import diary_outline_key, discard_stale_outlines, has_outline
+
+    # 저장 직후 인스턴스는 posted_date가 naive일 수 있으므로 DB 값으로 키를 계산한다
+    diary = DiaryModel.objects.get(pk=diary_id)
+    key = diary_outline_key(diary, language=language)
+
+    discard_stale_outlines(diary, key)
+    outline_jobs = GenerationJob.objects.filter(diary=diary, kind=GenerationJob.KIND_OUTLINE)
+    outline_jobs.filter(status=GenerationJob.STATUS_QUEUED).exclude(content_key=key).delete()
+
+    if has_outline(diary, key):
+        return None
+    existing = outline_jobs.filter(
+        content_key=key,
+        status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING],
+    ).first()
+    if existing:
+        return existing
+    return GenerationJob.objects.create(
+        diary=diary, kind=GenerationJob.KIND_OUTLINE, content_key=key, language=language,
+    )
+
+
+def claim_next_job() -> Optional[GenerationJob]:
+    """가장 오래된 queued 작업을 running으로 바꾸고 반환한다. 없으면 None."""
+    while True:
+        job_id = (
+            GenerationJob.objects
+            .filter(status=GenerationJob.STATUS_QUEUED)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        # 다른 워커가 먼저 가져갔다면 0건 갱신 → 다음 작업 시도
+        claimed = GenerationJob.objects.filter(
+            id=job_id, status=GenerationJob.STATUS_QUEUED
+        ).update(
+            status=GenerationJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return GenerationJob.objects.get(id=job_id)
+
+
+def run_job(job: GenerationJob) -> GenerationJob:
+    """작업 하나를 실행하고 done/failed 상태로 마무리한다."""
+    if job.kind == GenerationJob.KIND_OUTLINE:
+        return _run_outline_job(job)
+
+    from .Image_making.pipeline import generate_and_attach_image_to_diary
+
+    try:
+        # 미리 만들고 있는 아웃라인이 있으면 끝나길 기다렸다가 캐시를 재사용 (GPT 중복 호출 방지)
+        _wait_for_outline(job.diary_id)
+        generate_and_attach_image_to_diary(
+            job.diary_id,
+            style=job.style,
+            language=job.language,
+            use_cache=not job.bypass_cache,
+        )
+        diary = DiaryModel.objects.only('temp_image_url').get(pk=job.diary_id)
+        job.temp_image_url = diary.temp_image_url
+        job.status = GenerationJob.STATUS_DONE
+        job.error = ''
+    except Exception as e:
+        print(f"[JOB] ❌ 작업 #{job.id} 실패: {e}")
+        job.status = GenerationJob.STATUS_FAILED
+        job.error = str(e)
+        publish(job.diary_id, EVENT_FAILED, job_id=job.id, message=str(e))
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'temp_image_url', 'error', 'finished_at'])
+    return job
+
+
+def _wait_for_outline(diary_id: int) -> None:
+    deadline = time.monotonic() + OUTLINE_WAIT_SECONDS
+    running = GenerationJob.objects.filter(
+        diary_id=diary_id, kind=GenerationJob.KIND_OUTLINE, status=GenerationJob.STATUS_RUNNING,
+    )
+    while running.exists() and time.monotonic() < deadline:
+        time.sleep(OUTLINE_WAIT_POLL)
+
+
+def _run_outline_job(job: GenerationJob) -> GenerationJob:
+    from .Image_making.outline_cache import diary_outline_key, get_outline_for_diary
+    from .Image_making.pipeline import diary_outline_text
+    from .models import OutlineCacheEntry
+
+    job.status = GenerationJob.STATUS_DONE
+    job.error = ''
+    try:
+        diary = DiaryModel.objects.get(pk=job.diary_id)
+        if diary_outline_key(diary, language=job.language) != job.content_key:
+            job.error = '내용이 바뀌어 폐기됨'
+        else:
+            get_outline_for_diary(diary, diary_outline_text(diary), language=job.language)
+            # 생성하는 동안 내용이 또 바뀌었다면 방금 만든 아웃라인은 오래된 버전 → 폐기
+            current = DiaryModel.objects.filter(pk=job.diary_id).first()
+            if current is None or diary_outline_key(current, language=job.language) != job.content_key:
+                OutlineCacheEntry.objects.filter(diary_id=job.diary_id, key=job.content_key).delete()
+                job.error = '내용이 바뀌어 폐기됨'
+    except Exception as e:
+        print(f"[JOB] ❌ 아웃라인 작업 #{job.id} 실패: {e}")
+        job.status = GenerationJob.STATUS_FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs(older_than: timedelta) -> int:
+    """
+    started_at 이후 older_than 이상 running 상태인 작업을 다시 queued로 돌리고 그 건수를 반환한다.
+    이미 MAX_ATTEMPTS회 실행된 작업은 다시 돌리지 않고 failed로 마무리한다.
+    """
+    cutoff = timezone.now() - older_than
+    stale = GenerationJob.objects.filter(status=GenerationJob.STATUS_RUNNING, started_at__lt=cutoff)
+
+    exhausted = list(stale.filter(attempts__gte=MAX_ATTEMPTS).values_list('id', 'diary_id', 'kind'))
+    if exhausted:
+        message = f'{MAX_ATTEMPTS}회 시도 후에도 끝나지 않음'
+        GenerationJob.objects.filter(
+            id__in=[job_id for job_id, _, _ in exhausted], status=GenerationJob.STATUS_RUNNING,
+        ).update(status=GenerationJob.STATUS_FAILED, error=message, finished_at=timezone.now())
+        for job_id, diary_id, kind in exhausted:
+            print(f"[JOB] ❌ 작업 #{job_id} 포기: {message}")
+            if kind == GenerationJob.KIND_IMAGE:
+                publish(diary_id, EVENT_FAILED, job_id=job_id, message=message)
+
+    return stale.filter(attempts__lt=MAX_ATTEMPTS).update(status=GenerationJob.STATUS_QUEUED, started_at=None)
@@ -0,0 +1,312 @@
+"""
+일기 → 만화 파이프라인 엔드투엔드 지연시간 벤치마크.
+
+로컬 OpenAI 대역 서버(entry.Image_making.standin)에 지연시간/오류율을 주입하고
+반복마다 아래 단계를 실제 코드 경로(OpenAIBackend → call_openai → 다운로드/업로드)로 실행한다.
+
+    prompt   : build_prompt_from_diary           (PRD: T90 ≤ 3s)
+    image    : generate_image
+    generate : generate_and_attach_image_to_diary (outline + render + image + 변형 보관 다운로드/업로드)
+    persist  : save_temp_image_to_s3              (보관된 변형 확정 + 렌디션)
+    end_to_end = generate + persist               (PRD: prompt + image T90 ≤ 90s)
+
+사용 예시:
+    python manage.py bench_pipeline --iterations 50
+    python manage.py bench_pipeline --outline-latency 1.5 --image-latency 12 --jitter 0.3 --error-rate 0.05
+    python manage.py bench_pipeline --output bench/after.json --baseline bench/before.json
+
+벤치마크용 사용자/일기는 실행이 끝나면 삭제되고, 업로드는 기본적으로 메모리 스토리지로 간다.
+설정된 DB에서 실행되므로 실행 중에는 단계 기록(CARTOON_TRACE_SINK)과 프롬프트 이미지 캐시(CARTOON_IMAGE_CACHE)를 끄고,
+끝나면 일기에 딸리지 않는 single-flight 임대 행도 지운다 (/generate-image/traces/ 집계에 대역 서버 수치가 섞이지 않도록).
+"""
+
+import json
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.files.storage import InMemoryStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from entry.Image_making import backends, client as client_module
+from entry.Image_making.metrics import summarize
+from entry.Image_making.standin import StandInClient, StandInServer
+from entry.models import DiaryModel, FlightLease, ImageCacheEntry, local_day
+
+
+STAGES = ['prompt', 'image', 'generate', 'persist', 'end_to_end']
+# PRD 목표 (p90, 초)
+PRD_TARGETS = {'prompt': 3.0, 'end_to_end': 90.0}
+
+BENCH_BASE_URL = 'https://bench.invalid/cartoon/'
+
+SAMPLE_DIARY = (
+    "Woke up late and ran to the bus stop with toast in my mouth.\n"
+    "The bus left right in front of me, so I had to walk in the rain.\n"
+    "A friend passed by on a scooter and gave me a ride.\n"
+    "Made it to class just in time, soaking wet but laughing."
+)
+
+
+class SlowInMemoryStorage(InMemoryStorage):
+    """업로드 지연을 흉내 내는 메모리 스토리지"""
+
+    def __init__(self, upload_latency=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.upload_latency = upload_latency
+
+    def _save(self, name, content):
+        if self.upload_latency:
+            time.sleep(self.upload_latency)
+        return super()._save(name, content)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the diary -> cartoon pipeline end to end against a local OpenAI stand-in server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='반복 횟수')
+        parser.add_argument('--concurrency', type=int, default=1, help='동시 실행 수')
+        parser.add_argument('--style', type=str, default='simple', help='스타일 (simple/ani/real)')
+        parser.add_argument('--outline-latency', type=float, default=0.0, help='chat(아웃라인) 응답 지연(초)')
+        parser.add_argument('--image-latency', type=float, default=0.0, help='images 응답 지연(초)')
+        parser.add_argument('--download-latency', type=float, default=0.0, help='임시 이미지 다운로드 지연(초)')
+        parser.add_argument('--upload-latency', type=float, default=0.0, help='스토리지 업로드 지연(초, 메모리 스토리지)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='지연 흔들림 비율 (0.2 → ±20%%)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='대역 서버 요청 실패 확률 (0~1)')
+        parser.add_argument('--error-status', type=int, default=500, help='주입할 오류 상태 코드 (429/500/400 등)')
+        parser.add_argument('--seed', type=int, default=None, help='지연/오류 난수 시드')
+        parser.add_argument('--storage', choices=['memory', 'cartoon'], default='memory',
+                            help='업로드 대상 (memory: 메모리, cartoon: 설정된 CartoonStorage)')
+        parser.add_argument('--output', type=str, default='bench_results.json', help='결과 JSON 경로')
+        parser.add_argument('--baseline', type=str, help='비교할 이전 결과 JSON')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations는 1 이상이어야 합니다.')
+
+        config = {key: options[key] for key in (
+            'iterations', 'concurrency', 'style', 'outline_latency', 'image_latency', 'download_latency',
+            'upload_latency', 'jitter', 'error_rate', 'error_status', 'seed', 'storage',
+        )}
+        if options['storage'] == 'memory':
+            storage = SlowInMemoryStorage(
+                upload_latency=options['upload_latency'], base_url=BENCH_BASE_URL,
+            )
+        else:
+            from diary.storages import get_cartoon_storage
+            storage = get_cartoon_storage()
+
+        server = StandInServer(
+            outline_latency=options['outline_latency'],
+            image_latency=options['image_latency'],
+            download_latency=options['download_latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            seed=options['seed'],
+        )
+        user = User.objects.create_user(username=f'bench-{uuid.uuid4().hex[:12]}')
+        diary_ids = []
+        started = time.monotonic()
+        try:
+            with server, override_settings(CARTOON_TRACE_SINK='off', CARTOON_IMAGE_CACHE=False):
+                api_client = StandInClient(server.url)
+                client_module.set_client(api_client)
+                openai_backend = backends.OpenAIBackend()
+                backends.set_backend(outline=openai_backend, image=openai_backend)
+
+                diary_ids = self._create_diaries(user, options['iterations'], options['style'])
+                self.stdout.write(
+                    f'[BENCH] {len(diary_ids)}회, concurrency={options["concurrency"]}, 대역 서버 {server.url}'
+                )
+                samples = self._run_all(diary_ids, options['style'], storage, options['concurrency'])
+                server_stats = {'requests': dict(server.requests), 'injected_errors': dict(server.errors)}
+                api_client.close()
+        finally:
+            client_module.set_client(None)
+            backends.reset_backends()
+            self._cleanup(user, diary_ids)
+        wall = time.monotonic() - started
+
+        result = self._build_result(config, samples, wall, server_stats)
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        self._report(result)
+        if options['baseline']:
+            self._compare(result, options['baseline'])
+        self.stdout.write(f'[BENCH] 결과 저장: {output}')
+
+    # ───────────────────────────
+
+    @staticmethod
+    def _create_diaries(user, count, style):
+        now = timezone.now()
+        diaries = [
+            DiaryModel(
+                author=user,
+                note=f'Bench diary {i + 1}',
+                # 반복마다 본문을 달리해 아웃라인 캐시에 걸리지 않게 한다
+                content=f'{SAMPLE_DIARY}\n(run {uuid.uuid4().hex[:8]})',
+                productivity=5,
+                posted_date=now - timedelta(days=i),
+                # bulk_create는 save()를 거치지 않으므로 하루 한 편 키를 직접 채운다
+                posted_day=local_day(now - timedelta(days=i)),
+                style=style,
+            )
+            for i in range(count)
+        ]
+        return [diary.id for diary in DiaryModel.objects.bulk_create(diaries)]
+
+    @staticmethod
+    def _cleanup(user, diary_ids):
+        """벤치마크가 남긴 행 정리 (작업/이벤트/변형은 일기와 함께 삭제된다)"""
+        keys = [
+            key
+            for diary_id in diary_ids
+            for key in (f'generate:{diary_id}', f'generate:{diary_id}:fresh', f'save:{diary_id}')
+        ]
+        FlightLease.objects.filter(key__in=keys).delete()
+        ImageCacheEntry.objects.filter(image_url__startswith=BENCH_BASE_URL).delete()
+        user.delete()
+
+    def _run_all(self, diary_ids, style, storage, concurrency):
+        if concurrency <= 1:
+            return [self._run_once(diary_id, style, storage) for diary_id in diary_ids]
+
+        def run_in_thread(diary_id):
+            try:
+                return self._run_once(diary_id, style, storage)
+            finally:
+                # 스레드별 DB 커넥션 정리
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(run_in_thread, diary_ids))
+
+    @staticmethod
+    def _run_once(diary_id, style, storage):
+        from entry.Image_making.pipeline import (
+            build_prompt_from_diary,
+            diary_outline_text,
+            generate_and_attach_image_to_diary,
+            generate_image,
+            save_temp_image_to_s3,
+        )
+        from entry.Image_making.styles import get_style
+
+        timings = {}
+        errors = {}
+
+        def timed(stage, fn):
+            t0 = time.perf_counter()
+            try:
+                value = fn()
+            except Exception as e:
+                errors[stage] = f'{type(e).__name__}: {e}'
+                return None
+            finally:
+                timings[stage] = time.perf_counter() - t0
+            return value
+
+        diary = DiaryModel.objects.get(pk=diary_id)
+        diary_text = diary_outline_text(diary)
+
+        prompt = timed('prompt', lambda: build_prompt_from_diary(diary_text, get_style(style)))
+        if prompt is not None:
+            url, _ = timed('image', lambda: generate_image(prompt)) or (None, None)
+            if url is None and 'image' not in errors:
+                errors['image'] = '이미지 생성 결과 없음'
+
+        result = timed('generate', lambda: generate_and_attach_image_to_diary(diary_id, style=style, storage=storage))
+        if result is not None:
+            if not result[1]:
+                errors['generate'] = '이미지 생성 결과 없음'
+            elif not timed('persist', lambda: save_temp_image_to_s3(diary_id, storage=storage)):
+                errors.setdefault('persist', '스토리지 저장 실패')
+            if 'generate' not in errors and 'persist' not in errors:
+                timings['end_to_end'] = timings['generate'] + timings['persist']
+        return {'diary_id': diary_id, 'timings': timings, 'errors': errors}
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except Exception:
+            return None
+
+    def _build_result(self, config, samples, wall, server_stats):
+        stages = {}
+        for stage in STAGES:
+            # 실패한 호출은 지연 분포에서 제외하고 오류 수로 따로 센다
+            values = [s['timings'][stage] for s in samples if stage in s['timings'] and stage not in s['errors']]
+            failed = [s['errors'][stage] for s in samples if stage in s['errors']]
+            stats = summarize(values)
+            stats = {key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()}
+            stats['errors'] = len(failed)
+            stats['error_samples'] = sorted(set(failed))[:5]
+            stages[stage] = stats
+
+        prd = {
+            stage: {
+                'target_p90_s': target,
+                'p90_s': stages[stage]['p90'],
+                'pass': stages[stage]['count'] > 0 and stages[stage]['p90'] <= target,
+            }
+            for stage, target in PRD_TARGETS.items()
+        }
+        return {
+            'commit': self._git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'wall_s': round(wall, 3),
+            'config': config,
+            'server': server_stats,
+            'stages': stages,
+            'prd': prd,
+        }
+
+    def _report(self, result):
+        self.stdout.write('')
+        self.stdout.write('===== 단계별 지연 (초) =====')
+        self.stdout.write(f'{"stage":<11} {"count":>5} {"err":>4} {"p50":>8} {"p90":>8} {"p99":>8} {"max":>8}')
+        for stage in STAGES:
+            s = result['stages'][stage]
+            self.stdout.write(
+                f'{stage:<11} {s["count"]:>5} {s["errors"]:>4} '
+                f'{s["p50"]:>8.3f} {s["p90"]:>8.3f} {s["p99"]:>8.3f} {s["max"]:>8.3f}'
+            )
+        for stage, check in result['prd'].items():
+            line = f'PRD {stage}: p90 {check["p90_s"]:.3f}s (목표 ≤ {check["target_p90_s"]:.0f}s)'
+            self.stdout.write(self.style.SUCCESS(line + ' 통과') if check['pass'] else self.style.WARNING(line + ' 미달'))
+        self.stdout.write(f'소요 {result["wall_s"]:.1f}s, 대역 서버 {json.dumps(result["server"])}')
+
+    def _compare(self, result, baseline_path):
+        try:
+            baseline = json.loads(Path(baseline_path).read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            self.stdout.write(self.style.WARNING(f'[BENCH] 기준 결과를 읽을 수 없습니다: {e}'))
+            return
+        self.stdout.write('')
+        self.stdout.write(f'===== 기준({baseline.get("commit") or baseline_path}) 대비 =====')
+        for stage in STAGES:
+            before = baseline.get('stages', {}).get(stage)
+            after = result['stages'][stage]
+            if not before:
+                continue
+            deltas = []
+            for q in ('p50', 'p90', 'p99'):
+                diff = after[q] - before[q]
+                ratio = f' ({diff / before[q] * 100:+.0f}%)' if before[q] else ''
+                deltas.append(f'{q} {diff:+.3f}s{ratio}')
+            self.stdout.write(f'{stage:<11} ' + ', '.join(deltas))
@@ -0,0 +1,210 @@
+"""
+기존 일기에 대한 만화 일괄 생성 (백필 / 스타일 템플릿 변경 후 재생성).
+
+사용 예시:
+    python manage.py generate_cartoons --workers 4
+    python manage.py generate_cartoons --user a@example.com --since 2025-01-01 --until 2025-06-30
+    python manage.py generate_cartoons --style ani --include-existing --checkpoint ani_rerender.ckpt
+
+체크포인트 파일에 완료된 일기 ID를 한 줄씩 기록하므로, 중간에 죽어도 같은 명령으로
+다시 실행하면 완료된 일기는 건너뛰고 이어서 처리한다.
+파일 첫 줄에 대상 조건(--user/--since/--until/--style/--include-existing/--no-persist)을 기록하고,
+조건이 다른 실행은 그 체크포인트로 이어가지 않는다 (다른 백필이 끝낸 일기를 건너뛰지 않도록).
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from entry.Image_making.metrics import summarize
+from entry.models import DiaryModel
+
+
+CHECKPOINT_HEADER = '# filters: '
+
+
+class Command(BaseCommand):
+    help = 'Generate cartoons for existing diaries in bulk (resumable).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[],
+                            help='대상 사용자 (이메일/아이디/ID, 여러 번 지정 가능)')
+        parser.add_argument('--since', type=str, help='이 날짜(YYYY-MM-DD) 이후 일기만')
+        parser.add_argument('--until', type=str, help='이 날짜(YYYY-MM-DD) 이전 일기만')
+        parser.add_argument('--style', type=str, help='저장된 스타일이 일치하는 일기만 (simple/ani/real)')
+        parser.add_argument('--include-existing', action='store_true',
+                            help='이미 image_url이 있는 일기도 다시 생성')
+        parser.add_argument('--no-persist', action='store_true',
+                            help='temp_image_url까지만 생성하고 스토리지 저장(image_url)은 하지 않음')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='프롬프트 이미지 캐시(CARTOON_IMAGE_CACHE)를 쓰지 않고 모두 새로 생성')
+        parser.add_argument('--workers', type=int, default=4, help='동시 처리 수')
+        parser.add_argument('--limit', type=int, default=0, help='최대 처리 일기 수 (0이면 무제한)')
+        parser.add_argument('--checkpoint', type=str, default='generate_cartoons.checkpoint',
+                            help='완료된 일기 ID를 기록할 파일')
+        parser.add_argument('--reset-checkpoint', action='store_true',
+                            help='체크포인트를 지우고 처음부터')
+        parser.add_argument('--dry-run', action='store_true', help='대상 목록만 출력')
+
+    def handle(self, *args, **options):
+        queryset = self._select(options)
+        checkpoint = Path(options['checkpoint'])
+        if options['reset_checkpoint'] and checkpoint.exists():
+            checkpoint.unlink()
+        filters = self._filters(options)
+        done_ids = self._load_checkpoint(checkpoint, filters)
+
+        targets = [
+            (diary_id, style)
+            for diary_id, style in queryset.order_by('id').values_list('id', 'style')
+            if diary_id not in done_ids
+        ]
+        if options['limit']:
+            targets = targets[:options['limit']]
+
+        self.stdout.write(
+            f'[BULK] 대상 {len(targets)}건 (체크포인트로 건너뜀 {len(done_ids)}건), workers={options["workers"]}'
+        )
+        if options['dry_run'] or not targets:
+            for diary_id, style in targets:
+                self.stdout.write(f'  diary {diary_id} ({style or "simple"})')
+            return
+
+        persist = not options['no_persist']
+        use_cache = not options['no_cache']
+        latencies = []
+        failures = []
+        started = time.monotonic()
+
+        with checkpoint.open('a', encoding='utf-8') as ckpt, \
+                ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            if ckpt.tell() == 0:
+                ckpt.write(f'{CHECKPOINT_HEADER}{json.dumps(filters, sort_keys=True)}\n')
+                ckpt.flush()
+            futures = {
+                pool.submit(self._process, diary_id, style or 'simple', persist, use_cache): diary_id
+                for diary_id, style in targets
+            }
+            for n, future in enumerate(as_completed(futures), start=1):
+                diary_id = futures[future]
+                ok, elapsed, error = future.result()
+                if ok:
+                    latencies.append(elapsed)
+                    ckpt.write(f'{diary_id}\n')
+                    ckpt.flush()
+                else:
+                    failures.append((diary_id, error))
+                status = 'ok' if ok else f'failed: {error}'
+                self.stdout.write(f'[BULK] ({n}/{len(targets)}) diary {diary_id} {status} - {elapsed:.1f}s')
+
+        self._report(time.monotonic() - started, latencies, failures)
+
+    # ───────────────────────────
+
+    def _select(self, options):
+        queryset = DiaryModel.objects.all()
+
+        if options['user']:
+            user_q = Q()
+            for ident in options['user']:
+                user_q |= Q(username=ident) | Q(email=ident)
+                if ident.isdigit():
+                    user_q |= Q(id=int(ident))
+            users = User.objects.filter(user_q)
+            if not users.exists():
+                raise CommandError(f'사용자를 찾을 수 없습니다: {options["user"]}')
+            queryset = queryset.filter(author__in=users)
+
+        if options['since']:
+            queryset = queryset.filter(posted_day__gte=self._parse_date(options['since']))
+        if options['until']:
+            queryset = queryset.filter(posted_day__lte=self._parse_date(options['until']))
+        if options['style']:
+            if options['style'] == 'simple':
+                queryset = queryset.filter(Q(style='simple') | Q(style__isnull=True) | Q(style=''))
+            else:
+                queryset = queryset.filter(style=options['style'])
+        if not options['include_existing']:
+            queryset = queryset.filter(Q(image_url__isnull=True) | Q(image_url=''))
+        return queryset
+
+    @staticmethod
+    def _parse_date(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'날짜 형식이 올바르지 않습니다(YYYY-MM-DD): {value}')
+
+    @staticmethod
+    def _filters(options):
+        """체크포인트를 같이 써도 되는 실행인지 판단하는 대상 조건"""
+        return {
+            'user': sorted(options['user']),
+            'since': options['since'],
+            'until': options['until'],
+            'style': options['style'],
+            'include_existing': options['include_existing'],
+            'no_persist': options['no_persist'],
+        }
+
+    @staticmethod
+    def _load_checkpoint(path, filters):
+        if not path.exists():
+            return set()
+        lines = path.read_text(encoding='utf-8').splitlines()
+        if not lines:
+            return set()
+        saved = None
+        if lines[0].startswith(CHECKPOINT_HEADER):
+            try:
+                saved = json.loads(lines[0][len(CHECKPOINT_HEADER):])
+            except ValueError:
+                pass
+        if saved != filters:
+            raise CommandError(
+                f'체크포인트 {path}는 다른 대상 조건({saved})으로 만든 파일입니다. '
+                '--checkpoint로 다른 파일을 지정하거나 --reset-checkpoint로 처음부터 시작하세요.'
+            )
+        return {int(line) for line in lines[1:] if line.strip().isdigit()}
+
+    @staticmethod
+    def _process(diary_id, style, persist, use_cache=True):
+        from entry.Image_making.pipeline import (
+            generate_and_attach_image_to_diary,
+            save_temp_image_to_s3,
+        )
+
+        started = time.monotonic()
+        try:
+            _, temp_url = generate_and_attach_image_to_diary(diary_id, style=style, use_cache=use_cache)
+            if not temp_url:
+                return False, time.monotonic() - started, '이미지 생성 결과 없음'
+            if persist and not save_temp_image_to_s3(diary_id):
+                return False, time.monotonic() - started, '스토리지 저장 실패'
+            return True, time.monotonic() - started, ''
+        except Exception as e:
+            return False, time.monotonic() - started, str(e)
+        finally:
+            # 스레드별 DB 커넥션 정리
+            connection.close()
+
+    def _report(self, wall, latencies, failures):
+        stats = summarize(latencies)
+        total = len(latencies) + len(failures)
+        self.stdout.write('')
+        self.stdout.write('===== 결과 =====')
+        self.stdout.write(f'처리 {total}건: 성공 {len(latencies)}건, 실패 {len(failures)}건')
+        self.stdout.write(f'소요 {wall:.1f}s, 처리량 {len(latencies) / wall * 60 if wall else 0:.1f}건/분')
+        self.stdout.write(
+            f'지연(성공 기준) p50 {stats["p50"]:.1f}s / p90 {stats["p90"]:.1f}s / '
+            f'p99 {stats["p99"]:.1f}s / max {stats["max"]:.1f}s'
+        )
+        for diary_id, error in failures[:20]:
+            self.stdout.write(self.style.WARNING(f'  실패 diary {diary_id}: {error}'))
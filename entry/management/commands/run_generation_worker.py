@@ -0,0 +1,96 @@
+"""
+만화 생성 워커.
+
+사용 예시:
+    python manage.py run_generation_worker
+    python manage.py run_generation_worker --once
+
+처리량은 띄운 워커 프로세스 수에 비례한다 (웹 워커 수와 무관).
+"""
+
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from entry.Image_making import resilience
+from entry.Image_making.tracing import prune_spans
+from entry.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+# 보관 기간이 지난 단계 스팬(StageSpan) 정리 간격(초)
+SPAN_PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Process queued cartoon generation jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='대기 중인 작업을 모두 처리한 뒤 종료')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='대기열이 비었을 때 재조회 간격(초)')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='running 상태로 이 시간(초) 이상 남은 작업은 다시 대기열로')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='처리할 최대 작업 수 (0이면 무제한)')
+        parser.add_argument('--stats-interval', type=int, default=60,
+                            help='OpenAI 속도 제한/서킷 브레이커 상태 출력 간격(초, 0이면 실패 시에만)')
+
+    def handle(self, *args, **options):
+        once = options['once']
+        poll_interval = options['poll_interval']
+        stale_after = timedelta(seconds=options['stale_after'])
+        max_jobs = options['max_jobs']
+        stats_interval = options['stats_interval']
+
+        processed = 0
+        last_stats = time.monotonic()
+        last_prune = None
+        self.stdout.write('[WORKER] 시작')
+        try:
+            while True:
+                close_old_connections()
+
+                if last_prune is None or time.monotonic() - last_prune >= SPAN_PRUNE_INTERVAL:
+                    pruned = prune_spans()
+                    if pruned:
+                        self.stdout.write(f'[WORKER] 보관 기간이 지난 스팬 {pruned}건 삭제')
+                    last_prune = time.monotonic()
+
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    self.stdout.write(f'[WORKER] 오래된 작업 {requeued}건 재등록')
+
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                started = time.monotonic()
+                job = run_job(job)
+                elapsed = time.monotonic() - started
+                processed += 1
+                self.stdout.write(
+                    f'[WORKER] 작업 #{job.id} {job.kind} (diary {job.diary_id}) {job.status} - {elapsed:.1f}s'
+                )
+
+                if job.status == job.STATUS_FAILED or (
+                    stats_interval and time.monotonic() - last_stats >= stats_interval
+                ):
+                    self._print_limits()
+                    last_stats = time.monotonic()
+
+                if max_jobs and processed >= max_jobs:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write('[WORKER] 중단됨')
+
+        self.stdout.write(f'[WORKER] 종료 (처리 {processed}건)')
+
+    def _print_limits(self):
+        self.stdout.write(f'[WORKER] openai {json.dumps(resilience.snapshot(), ensure_ascii=False)}')
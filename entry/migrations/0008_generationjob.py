@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-18 13:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0007_diarymodel_final_prompt_diarymodel_style'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('style', models.CharField(default='simple', max_length=20)),
+                ('language', models.CharField(default='en', max_length=5)),
+                ('temp_image_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to='entry.diarymodel')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='entry_gener_status_7a119b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 13:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0008_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutlineCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('panels', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outline_cache', to='entry.diarymodel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='entry_outli_last_us_049e3f_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='outlinecacheentry',
+            constraint=models.UniqueConstraint(fields=('diary', 'key'), name='unique_outline_cache_key'),
+        ),
+    ]
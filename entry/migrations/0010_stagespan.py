@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0009_outlinecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StageSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trace_id', models.CharField(db_index=True, max_length=32)),
+                ('stage', models.CharField(max_length=20)),
+                ('diary_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('style', models.CharField(blank=True, default='', max_length=20)),
+                ('outcome', models.CharField(choices=[('ok', 'OK'), ('cached', 'Cached'), ('error', 'Error')], default='ok', max_length=10)),
+                ('error', models.CharField(blank=True, default='', max_length=300)),
+                ('duration_ms', models.FloatField()),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['stage', 'started_at'], name='entry_stage_stage_1e0de9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0010_stagespan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='content_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='kind',
+            field=models.CharField(choices=[('image', 'Image'), ('outline', 'Outline')], default='image', max_length=10),
+        ),
+    ]
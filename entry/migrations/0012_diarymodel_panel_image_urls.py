@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0011_generationjob_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diarymodel',
+            name='panel_image_urls',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
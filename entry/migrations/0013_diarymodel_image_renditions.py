@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0012_diarymodel_panel_image_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diarymodel',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
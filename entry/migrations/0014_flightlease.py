@@ -0,0 +1,48 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fail_duplicate_active_image_jobs(apps, schema_editor):
+    """제약 추가 전: 일기당 가장 먼저 등록된 진행 중 image 작업만 남기고 나머지는 failed 처리"""
+    GenerationJob = apps.get_model('entry', 'GenerationJob')
+    active = GenerationJob.objects.filter(kind='image', status__in=['queued', 'running']).order_by('diary_id', 'created_at', 'id')
+    seen = set()
+    duplicates = []
+    for job_id, diary_id in active.values_list('id', 'diary_id'):
+        if diary_id in seen:
+            duplicates.append(job_id)
+        seen.add(diary_id)
+    GenerationJob.objects.filter(id__in=duplicates).update(
+        status='failed', error='중복 생성 요청', finished_at=django.utils.timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0013_diarymodel_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(max_length=32)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(fail_duplicate_active_image_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='generationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'image'), ('status__in', ['queued', 'running'])), fields=('diary',), name='unique_active_image_job'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0014_flightlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_events', to='entry.diarymodel')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['diary', 'id'], name='entry_gener_diary_i_cd0eca_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('entry', '0015_generationevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('style', models.CharField(blank=True, default='', max_length=20)),
+                ('prompt', models.TextField(blank=True, default='')),
+                ('image_url', models.URLField(max_length=500)),
+                ('panel_image_urls', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to=settings.AUTH_USER_MODEL)),
+                ('diary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='entry.diarymodel')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['author', 'created_at'], name='entry_image_author__ea76b6_idx'), models.Index(fields=['diary', 'created_at'], name='entry_image_diary_i_7690b3_idx')],
+            },
+        ),
+    ]
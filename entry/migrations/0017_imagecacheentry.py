@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:21
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0016_imagevariant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='bypass_cache',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ImageCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model', models.CharField(max_length=50)),
+                ('size', models.CharField(max_length=20)),
+                ('image_url', models.URLField(max_length=500)),
+                ('panel_image_urls', models.JSONField(blank=True, default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='entry_image_last_us_1487f6_idx')],
+            },
+        ),
+    ]
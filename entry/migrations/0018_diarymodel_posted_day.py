@@ -0,0 +1,47 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:22
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_posted_day(apps, schema_editor):
+    """
+    posted_date의 현지 날짜로 posted_day를 채운다.
+    같은 사용자·같은 날 일기가 여러 편이면 가장 최근 것만 날짜를 갖고(기존 조회가 보여주던 일기)
+    나머지는 posted_day=NULL로 남겨 삭제 없이 보존한다 (목록/ID 조회로는 계속 볼 수 있음).
+    """
+    DiaryModel = apps.get_model('entry', 'DiaryModel')
+    seen = set()
+    batch = []
+    rows = DiaryModel.objects.order_by('author_id', '-posted_date', '-id').values_list('id', 'author_id', 'posted_date')
+    for diary_id, author_id, posted_date in rows.iterator():
+        day = (timezone.localtime(posted_date) if timezone.is_aware(posted_date) else posted_date).date()
+        if author_id is not None and (author_id, day) in seen:
+            continue
+        seen.add((author_id, day))
+        batch.append(DiaryModel(id=diary_id, posted_day=day))
+        if len(batch) >= 500:
+            DiaryModel.objects.bulk_update(batch, ['posted_day'])
+            batch = []
+    if batch:
+        DiaryModel.objects.bulk_update(batch, ['posted_day'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0017_imagecacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diarymodel',
+            name='posted_day',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_posted_day, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='diarymodel',
+            constraint=models.UniqueConstraint(fields=('author', 'posted_day'), name='unique_diary_per_author_day'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:28
+
+import html
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+BLOCK_BREAK = re.compile(r'<(?:br|/p|/div|/li|/h[1-6]|/blockquote|/pre)\b[^>]*>', re.IGNORECASE)
+
+
+def fill_summary(apps, schema_editor):
+    """기존 일기의 content로 평문 요약을 채운다 (entry.models.plain_summary와 같은 규칙, 이 시점 기준으로 고정)"""
+    DiaryModel = apps.get_model('entry', 'DiaryModel')
+    batch = []
+    for diary_id, content in DiaryModel.objects.order_by('id').values_list('id', 'content').iterator():
+        text = ' '.join(html.unescape(strip_tags(BLOCK_BREAK.sub(' ', content or ''))).split())
+        if len(text) > 100:
+            text = text[:100] + '  ...'
+        batch.append(DiaryModel(id=diary_id, summary=text))
+        if len(batch) >= 500:
+            DiaryModel.objects.bulk_update(batch, ['summary'])
+            batch = []
+    if batch:
+        DiaryModel.objects.bulk_update(batch, ['summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0020_diary_author_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diarymodel',
+            name='summary',
+            field=models.CharField(blank=True, default='', editable=False, max_length=110),
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import date, timedelta
+
+
+def fill_productivity_stats(apps, schema_editor):
+    """기존 일기로 일/주/월 버킷과 streak를 한 번에 만든다 (이후에는 entry.signals가 증분 갱신)"""
+    DiaryModel = apps.get_model('entry', 'DiaryModel')
+    ProductivityStat = apps.get_model('entry', 'ProductivityStat')
+
+    days = (
+        DiaryModel.objects.filter(author__isnull=False, posted_day__isnull=False)
+        .values('author_id', 'posted_day')
+        .annotate(
+            count=models.Count('id'), total=models.Sum('productivity'),
+            low=models.Min('productivity'), high=models.Max('productivity'),
+        )
+        .order_by('author_id', 'posted_day')
+    )
+    rows, rollups = [], {}
+    previous = None
+    for day in days.iterator():
+        author_id, posted_day = day['author_id'], day['posted_day']
+        if previous and previous[0] == author_id and previous[1] == posted_day - timedelta(days=1):
+            streak = previous[2] + 1
+        else:
+            streak = 1
+        previous = (author_id, posted_day, streak)
+        rows.append(ProductivityStat(
+            author_id=author_id, period='day', period_start=posted_day, count=day['count'], total=day['total'],
+            min_productivity=day['low'], max_productivity=day['high'], streak=streak,
+        ))
+        for period, start in (
+            ('week', posted_day - timedelta(days=posted_day.weekday())),
+            ('month', date(posted_day.year, posted_day.month, 1)),
+        ):
+            bucket = rollups.setdefault((author_id, period, start), [0, 0, day['low'], day['high']])
+            bucket[0] += day['count']
+            bucket[1] += day['total']
+            bucket[2] = min(bucket[2], day['low'])
+            bucket[3] = max(bucket[3], day['high'])
+
+    rows += [
+        ProductivityStat(
+            author_id=author_id, period=period, period_start=start,
+            count=count, total=total, min_productivity=low, max_productivity=high,
+        )
+        for (author_id, period, start), (count, total, low, high) in rollups.items()
+    ]
+    ProductivityStat.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('entry', '0021_diarymodel_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductivityStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('min_productivity', models.IntegerField()),
+                ('max_productivity', models.IntegerField()),
+                ('streak', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productivity_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['period', 'period_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productivitystat',
+            constraint=models.UniqueConstraint(fields=('author', 'period', 'period_start'), name='unique_productivity_bucket'),
+        ),
+        migrations.RunPython(fill_productivity_stats, migrations.RunPython.noop),
+    ]
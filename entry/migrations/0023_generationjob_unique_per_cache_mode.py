@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0022_productivitystat'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='generationjob',
+            name='unique_active_image_job',
+        ),
+        migrations.AddConstraint(
+            model_name='generationjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'image'), ('status__in', ['queued', 'running'])), fields=('diary', 'bypass_cache'), name='unique_active_image_job_per_cache_mode'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entry', '0024_pendingimagedeletion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stagespan',
+            index=models.Index(fields=['started_at'], name='entry_stage_started_805e85_idx'),
+        ),
+    ]
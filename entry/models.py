@@ -1,7 +1,32 @@
+import html
+import re
+
 from django.db import models
+from django.utils import timezone
+from django.utils.html import strip_tags
 from django.contrib.auth.models import User
 
 
+def local_day(value):
+    """posted_date → 작성일(settings.TIME_ZONE 기준 날짜). naive 값은 이미 현지 시각으로 본다."""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+SUMMARY_LENGTH = 100
+_BLOCK_BREAK = re.compile(r'<(?:br|/p|/div|/li|/h[1-6]|/blockquote|/pre)\b[^>]*>', re.IGNORECASE)
+
+
+def plain_summary(content, length=SUMMARY_LENGTH):
+    """Quill HTML 본문 → 목록용 평문 요약 (태그 제거 + 엔티티 해제 + 공백 정리, length자에서 자름)"""
+    text = html.unescape(strip_tags(_BLOCK_BREAK.sub(' ', content or '')))
+    text = ' '.join(text.split())
+    if len(text) > length:
+        return text[:length] + '  ...'
+    return text
+
+
 class DiaryModel(models.Model):
 
     author = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -9,6 +34,9 @@ class DiaryModel(models.Model):
     note = models.CharField(max_length=100)
     content = models.TextField()
     posted_date = models.DateTimeField()
+    # posted_date의 현지 날짜 (하루 한 편: author + posted_day 유니크, 날짜 조회는 이 컬럼으로)
+    # 제약 추가 전 같은 날 중복으로 남아 있던 예전 일기는 NULL (0018 마이그레이션)
+    posted_day = models.DateField(null=True, blank=True, editable=False)
     productivity = models.IntegerField()
     image_url = models.URLField(max_length=500, blank=True, null=True, verbose_name='Diary Image')
     temp_image_url = models.URLField(max_length=500, blank=True, null=True, verbose_name='temp_Image')
@@ -16,7 +44,32 @@ class DiaryModel(models.Model):
     style = models.CharField(max_length=20, blank=True, null=True)
     # 이미지 생성을 위해 최종적으로 사용된 프롬프트 텍스트 저장
     final_prompt = models.TextField(blank=True, null=True)
+    # 패널 모드로 생성한 경우 4컷 각각의 이미지 URL (합성본은 temp_image_url / image_url)
+    panel_image_urls = models.JSONField(default=list, blank=True)
+    # image_url의 썸네일(128/256/512) / WebP 렌디션 URL (entry.Image_making.renditions 참고)
+    image_renditions = models.JSONField(default=dict, blank=True)
+    # 마지막 수정 시각 (달력 API의 ETag / Last-Modified). update_fields 저장에서도 갱신된다
+    updated_at = models.DateTimeField(auto_now=True)
+    # content의 평문 요약 (목록/달력은 content를 읽지 않고 이 컬럼만 쓴다). 저장 시 갱신
+    summary = models.CharField(max_length=SUMMARY_LENGTH + 10, blank=True, default='', editable=False)
+
 
+    def save(self, *args, **kwargs):
+        if self._state.adding or self.posted_day is not None:
+            self.posted_day = local_day(self.posted_date)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'posted_date' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'posted_day'}
+        update_fields = kwargs.get('update_fields')
+        # content를 읽지 않은(defer) 인스턴스는 content도 저장되지 않으므로 요약을 다시 만들 필요가 없다
+        content_saved = 'content' in update_fields if update_fields is not None else 'content' not in self.get_deferred_fields()
+        if content_saved:
+            self.summary = plain_summary(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'summary'}
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
+        super().save(*args, **kwargs)
 
     def date_for_chart(self):
         return self.posted_date.strftime('%b %e')
@@ -24,10 +77,307 @@ class DiaryModel(models.Model):
     def __str__(self):
         return f"{self.note} - {self.author.username if self.author else 'Anonymous'}"
 
-    def summary(self):
-        if len(self.content) > 100:
-            return self.content[:100] + '  ...'
-        return self.content[:100]
+    def image_srcset(self):
+        from .Image_making.renditions import srcset
+        return srcset(self.image_renditions, 'png', original_url=self.image_url)
+
+    def image_webp_srcset(self):
+        from .Image_making.renditions import srcset
+        return srcset(self.image_renditions, 'webp')
+
+    def thumbnail_url(self, width=256):
+        from .Image_making.renditions import thumbnail_url
+        return thumbnail_url(self.image_renditions, width) or self.image_url
 
     class Meta:
         ordering = ['-posted_date']
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'posted_day'], name='unique_diary_per_author_day'),
+        ]
+        indexes = [
+            # 목록 keyset 페이지네이션 (entry.pagination): 작성자별 최신순 (posted_date, id)
+            models.Index(fields=['author', '-posted_date', '-id'], name='diary_author_recent_idx'),
+        ]
+
+
+class GenerationJob(models.Model):
+    """
+    만화 생성 작업 큐.
+    웹 요청은 작업만 등록하고, 실제 GPT/DALL·E 호출은 워커 프로세스
+    (`python manage.py run_generation_worker`)가 처리한다.
+    - image: 아웃라인 + 이미지 생성 (생성 버튼)
+    - outline: 일기 저장 직후 미리 만들어 두는 4컷 아웃라인 (content_key 버전 기준)
+    """
+
+    KIND_IMAGE = 'image'
+    KIND_OUTLINE = 'outline'
+    KIND_CHOICES = [
+        (KIND_IMAGE, 'Image'),
+        (KIND_OUTLINE, 'Outline'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    diary = models.ForeignKey(DiaryModel, on_delete=models.CASCADE, related_name='generation_jobs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_IMAGE)
+    # outline 작업: 등록 시점 일기 내용의 아웃라인 캐시 키 (내용이 바뀌면 폐기)
+    content_key = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    style = models.CharField(max_length=20, default='simple')
+    language = models.CharField(max_length=5, default='en')
+    # 작업 완료 시 생성된 임시 이미지 URL
+    temp_image_url = models.URLField(max_length=500, blank=True, null=True)
+    # True면 프롬프트 이미지 캐시를 건너뛰고 새로 생성 (재생성 버튼)
+    bypass_cache = models.BooleanField(default=False)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Job #{self.pk} {self.kind} (diary {self.diary_id}) - {self.status}"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            # 일기당 진행 중(queued/running)인 image 작업은 캐시 사용/우회(bypass_cache)별로 하나
+            # → 중복 요청은 기존 작업에 붙고, 캐시 작업이 실행 중일 때의 재생성 요청만 따로 돈다
+            models.UniqueConstraint(
+                fields=['diary', 'bypass_cache'],
+                condition=models.Q(kind='image', status__in=['queued', 'running']),
+                name='unique_active_image_job_per_cache_mode',
+            ),
+        ]
+
+
+class OutlineCacheEntry(models.Model):
+    """
+    일기별 4컷 아웃라인(패널 JSON) 캐시.
+    key = hash(일기 텍스트, 언어, 모델, 프롬프트 버전) → 내용이 같으면 GPT 호출 생략
+    """
+
+    diary = models.ForeignKey(DiaryModel, on_delete=models.CASCADE, related_name='outline_cache')
+    key = models.CharField(max_length=64)
+    panels = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Outline {self.key[:12]} (diary {self.diary_id})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['diary', 'key'], name='unique_outline_cache_key'),
+        ]
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+
+
+class ImageCacheEntry(models.Model):
+    """
+    프롬프트 단위 이미지 캐시 (entry.Image_making.image_cache).
+    key = hash(최종 프롬프트, 이미지 모델, 크기) → 스토리지에 보관된 이미지 URL
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=50)
+    size = models.CharField(max_length=20)
+    image_url = models.URLField(max_length=500)
+    # 패널 모드: 합성본(image_url)과 함께 재사용할 4컷 이미지 URL
+    panel_image_urls = models.JSONField(default=list, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Image {self.key[:12]} ({self.model}, {self.size})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+
+
+class PendingImageDeletion(models.Model):
+    """
+    삭제 예약된 스토리지 이미지 (entry.variants).
+    내용 해시 저장은 같은 객체가 있으면 다시 올리지 않으므로, 정리하는 순간 진행 중인 저장이 곧 이 객체를
+    가리킬 수 있다. 그래서 바로 지우지 않고 유예 시간이 지난 뒤 참조를 다시 확인하고 지운다.
+    """
+
+    url = models.URLField(max_length=500, unique=True)
+    requested_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.url} ({self.requested_at:%Y-%m-%d %H:%M})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['requested_at']),
+        ]
+
+
+class StageSpan(models.Model):
+    """
+    만화 생성 단계별 소요 시간 기록 (outline / render / image / download / upload).
+    일기가 삭제돼도 지연 통계는 남도록 diary_id는 FK가 아닌 정수로 저장한다.
+    """
+
+    OUTCOME_OK = 'ok'
+    OUTCOME_CACHED = 'cached'
+    OUTCOME_ERROR = 'error'
+    OUTCOME_CHOICES = [
+        (OUTCOME_OK, 'OK'),
+        (OUTCOME_CACHED, 'Cached'),
+        (OUTCOME_ERROR, 'Error'),
+    ]
+
+    trace_id = models.CharField(max_length=32, db_index=True)
+    stage = models.CharField(max_length=20)
+    diary_id = models.IntegerField(blank=True, null=True, db_index=True)
+    style = models.CharField(max_length=20, blank=True, default='')
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES, default=OUTCOME_OK)
+    error = models.CharField(max_length=300, blank=True, default='')
+    duration_ms = models.FloatField()
+    started_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.stage} {self.duration_ms:.0f}ms (diary {self.diary_id}) - {self.outcome}"
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['stage', 'started_at']),
+            # 보관 기간 정리(prune_spans)와 스타일 필터 없는 기간 집계용
+            models.Index(fields=['started_at']),
+        ]
+
+
+class ImageVariant(models.Model):
+    """
+    일기별 생성 결과 이력. 재생성해도 이전 결과(이미지 + 프롬프트)가 남아
+    추가 생성 비용 없이 다시 고를 수 있다 (entry.variants).
+    image_url은 생성 시 CartoonStorage에 보관한 URL이므로 저장(persist) 때 다시 내려받지 않는다.
+    """
+
+    diary = models.ForeignKey(DiaryModel, on_delete=models.CASCADE, related_name='variants')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='image_variants')
+    style = models.CharField(max_length=20, blank=True, default='')
+    prompt = models.TextField(blank=True, default='')
+    image_url = models.URLField(max_length=500)
+    panel_image_urls = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Variant #{self.pk} {self.style} (diary {self.diary_id})"
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['author', 'created_at']),
+            models.Index(fields=['diary', 'created_at']),
+        ]
+
+
+class GenerationEvent(models.Model):
+    """
+    만화 생성 진행 이벤트 (outline / image_requested / image_ready / persisted / failed).
+    워커가 기록하고 generation_status 뷰가 작업의 진행 단계 / 캡션으로 돌려준다 (entry.events).
+    """
+
+    diary = models.ForeignKey(DiaryModel, on_delete=models.CASCADE, related_name='generation_events')
+    event = models.CharField(max_length=20)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.event} (diary {self.diary_id})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['diary', 'id']),
+        ]
+
+
+class FlightLease(models.Model):
+    """
+    일기별 생성/저장 작업의 single-flight 임대 (entry.singleflight).
+    key(예: "save:12")당 한 행. running 동안 다른 요청(다른 워커 프로세스 포함)은
+    새로 실행하지 않고 이 행이 done/failed가 되길 기다렸다가 result를 그대로 받는다.
+    expires_at이 지나면 실행자가 죽은 것으로 보고 다른 요청이 이어받는다.
+    """
+
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    key = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=32)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.key} - {self.status}"
+
+
+class ProductivityStat(models.Model):
+    """
+    사용자별 생산성 집계 (일/주/월 버킷). 일기 저장·삭제 시 시그널이 해당 버킷만 갱신한다 (entry.stats).
+    - day: 그날 일기들의 합/최소/최대 + streak(그날로 끝나는 연속 작성 일수)
+    - week(월요일 시작) / month(1일 시작): 그 기간 day 행들의 집계
+    """
+
+    PERIOD_DAY = 'day'
+    PERIOD_WEEK = 'week'
+    PERIOD_MONTH = 'month'
+    PERIOD_CHOICES = [
+        (PERIOD_DAY, 'Day'),
+        (PERIOD_WEEK, 'Week'),
+        (PERIOD_MONTH, 'Month'),
+    ]
+
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='productivity_stats')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.IntegerField(default=0)
+    min_productivity = models.IntegerField()
+    max_productivity = models.IntegerField()
+    streak = models.PositiveIntegerField(default=0)
+
+    @property
+    def avg_productivity(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.author_id} {self.period} {self.period_start} (n={self.count})"
+
+    class Meta:
+        ordering = ['period', 'period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'period', 'period_start'], name='unique_productivity_bucket'),
+        ]
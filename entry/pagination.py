@@ -0,0 +1,61 @@
+"""
+일기 목록 keyset 페이지네이션 (최신순: posted_date DESC, id DESC).
+
+    diaries, next_cursor = diary_page(request.user, request.GET.get('cursor'))
+
+- 커서는 직전 페이지 마지막 일기의 (posted_date, id)를 담은 불투명 토큰이다.
+- 다음 페이지는 OFFSET 없이 "(posted_date, id) < 커서" 조건 + LIMIT으로 읽으므로
+  (author, posted_date, id) 인덱스를 타고, 일기가 몇 년 치 쌓여도 페이지당 비용이 같다.
+- page_size + 1개를 읽어 다음 페이지 유무를 판단한다 (COUNT 쿼리 없음).
+"""
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DiaryModel
+
+
+DIARY_PAGE_SIZE = 24
+MAX_DIARY_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """해석할 수 없는 커서 토큰"""
+
+
+def encode_cursor(diary: DiaryModel) -> str:
+    raw = f"{diary.posted_date.isoformat()}|{diary.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        posted, diary_id = raw.rsplit('|', 1)
+        posted_date = datetime.fromisoformat(posted)
+        diary_id = int(diary_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+    if timezone.is_naive(posted_date):
+        posted_date = timezone.make_aware(posted_date)
+    return posted_date, diary_id
+
+
+def diary_page(user, cursor: Optional[str] = None, page_size: int = DIARY_PAGE_SIZE) -> Tuple[List[DiaryModel], Optional[str]]:
+    """user의 일기 한 페이지(최신순)와 다음 페이지 커서(없으면 None). 잘못된 커서는 InvalidCursor"""
+    page_size = max(1, min(page_size, MAX_DIARY_PAGE_SIZE))
+    # 목록 카드는 제목/날짜/요약만 쓴다 → 본문(Quill HTML)과 프롬프트는 DB에서 읽지 않는다
+    diaries = DiaryModel.objects.filter(author=user).defer('content', 'final_prompt').order_by('-posted_date', '-id')
+    if cursor:
+        posted_date, diary_id = decode_cursor(cursor)
+        diaries = diaries.filter(Q(posted_date__lt=posted_date) | Q(posted_date=posted_date, id__lt=diary_id))
+
+    page = list(diaries[:page_size + 1])
+    if len(page) <= page_size:
+        return page, None
+    page = page[:page_size]
+    return page, encode_cursor(page[-1])
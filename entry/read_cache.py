@@ -0,0 +1,95 @@
+"""
+일기 조회 API 읽기 캐시 (Django cache framework, settings.CACHES).
+
+    payload = cached_read(request.user.id, 'by_date', date, build=lambda: {...})
+
+- 키는 사용자별 버전을 포함한다: diary-read:{user_id}:{version}:{name}:{parts}
+- 일기가 저장·삭제되면 시그널(entry.signals)이 bump_version()으로 그 사용자의 버전만 올린다.
+  예전 버전의 항목은 지우지 않고 TTL로 사라지므로 무효화는 키 하나 갱신으로 끝난다.
+- 버전 키가 없으면(첫 조회 / 캐시 재시작 / 축출) 현재 시각(ns)으로 시작해, 예전 버전 번호와 겹치지 않는다.
+- 적중/미스 횟수는 캐시에 카운터로 쌓는다 (read_cache_stats, /api/cache-stats/).
+
+locmem 백엔드는 프로세스마다 따로라 gunicorn 워커가 여러 개면 다른 워커의 무효화를 보지 못한다.
+운영에서는 공유 백엔드(Redis / Memcached, 한 서버라면 file)를 CACHE_BACKEND로 지정한다.
+"""
+
+import time
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+
+HIT_KEY = 'diary-read:stats:hits'
+MISS_KEY = 'diary-read:stats:misses'
+_MISSING = object()
+
+
+def _cache():
+    return default_cache
+
+
+def read_cache_enabled() -> bool:
+    return getattr(settings, 'DIARY_READ_CACHE', True)
+
+
+def _version_key(user_id: int) -> str:
+    return f'diary-read:version:{user_id}'
+
+
+def _version(user_id: int) -> int:
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def bump_version(user_id: int) -> None:
+    """user의 일기가 바뀜 → 이후 조회는 새 키를 쓴다"""
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # 버전 키가 없음 → 새로 시작 (이전 항목과 겹치지 않도록 시각 기반)
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def _count(key: str) -> None:
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def cached_read(user_id: int, name: str, *parts: Any, build: Callable[[], Any]) -> Any:
+    """캐시에 있으면 그대로, 없으면 build()로 만들어 저장. build 결과는 pickle 가능해야 한다 (None도 캐시)"""
+    if not read_cache_enabled():
+        return build()
+
+    cache = _cache()
+    key = ':'.join(['diary-read', str(user_id), str(_version(user_id)), name, *map(str, parts)])
+    hit = cache.get(key, default=_MISSING)
+    if hit is not _MISSING:
+        _count(HIT_KEY)
+        return hit
+
+    _count(MISS_KEY)
+    value = build()
+    cache.set(key, value, timeout=getattr(settings, 'DIARY_READ_CACHE_TTL', 3600))
+    return value
+
+
+def read_cache_stats() -> Dict[str, Any]:
+    values = _cache().get_many([HIT_KEY, MISS_KEY])
+    hits, misses = values.get(HIT_KEY, 0), values.get(MISS_KEY, 0)
+    return {
+        'enabled': read_cache_enabled(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
@@ -0,0 +1,55 @@
+"""
+일기 저장·삭제 →
+- 조회 API 읽기 캐시(entry.read_cache) 무효화: 작성자의 캐시 버전을 올린다.
+- 생산성 통계(entry.stats) 갱신: 날짜를 옮긴 저장은 예전 날짜와 새 날짜 버킷을 모두 다시 계산한다.
+  이미지 URL만 바꾸는 저장(update_fields에 통계 필드 없음)은 건너뛴다.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import DiaryModel
+from .read_cache import bump_version
+from .stats import refresh_days
+
+
+STAT_FIELDS = {'author', 'posted_date', 'posted_day', 'productivity'}
+
+
+def _affects_stats(update_fields) -> bool:
+    return update_fields is None or bool(STAT_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=DiaryModel)
+def remember_stat_bucket(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stat_previous = None
+    if raw or instance.pk is None or not _affects_stats(update_fields):
+        return
+    instance._stat_previous = DiaryModel.objects.filter(pk=instance.pk).values_list('author_id', 'posted_day').first()
+
+
+@receiver(post_save, sender=DiaryModel)
+def update_stats_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _affects_stats(update_fields):
+        return
+    keys = [(instance.author_id, instance.posted_day)]
+    if getattr(instance, '_stat_previous', None):
+        keys.append(instance._stat_previous)
+    refresh_days(keys)
+
+
+@receiver(post_delete, sender=DiaryModel)
+def update_stats_on_delete(sender, instance, **kwargs):
+    refresh_days([(instance.author_id, instance.posted_day)])
+
+
+@receiver(post_save, sender=DiaryModel)
+@receiver(post_delete, sender=DiaryModel)
+def invalidate_read_cache(sender, instance, raw=False, **kwargs):
+    if raw or instance.author_id is None:
+        return
+    author_id = instance.author_id
+    bump_version(author_id)
+    # 커밋 전 다른 요청이 예전 값을 새 버전으로 캐시했을 수 있으므로 커밋 후 한 번 더 올린다
+    transaction.on_commit(lambda: bump_version(author_id))
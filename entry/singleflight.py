@@ -0,0 +1,111 @@
+"""
+일기별 생성/저장 요청 single-flight.
+
+    url = single_flight(f"save:{diary_id}", lambda: _save(...), ttl=120)
+
+- 같은 key로 실행 중인 작업이 없으면 FlightLease 행을 만들고 직접 실행한다.
+- 이미 실행 중이면(다른 gunicorn 워커 / run_generation_worker 포함) 새로 실행하지 않고
+  그 작업이 끝나길 기다렸다가 결과(result)를 그대로 받는다. 실패했다면 같은 에러를 받는다.
+- 행 생성은 key 유니크 제약, 이어받기는 조건부 UPDATE로 처리하므로 SQLite/Postgres 모두에서
+  프로세스 간에 한 요청만 실행된다.
+- 실행자가 죽어 expires_at(ttl)이 지난 행은 다음 요청이 이어받는다.
+
+결과는 FlightLease.result(JSONField)에 저장되므로 fn의 반환값은 JSON 직렬화 가능해야 한다.
+"""
+
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import FlightLease
+
+
+FLIGHT_POLL_INTERVAL = 0.5
+
+
+class SingleFlightError(RuntimeError):
+    """붙어서 기다린 작업이 실패했거나 제한 시간 안에 끝나지 않음"""
+
+
+class SingleFlightTimeout(SingleFlightError):
+    """wait 안에 실행 중인 작업이 끝나지 않음 (작업은 계속 진행 중)"""
+
+
+def _try_lead(key: str, owner: str, ttl: float) -> bool:
+    """실행 권한을 얻으면 True (새 행 생성 또는 끝났거나 만료된 행 이어받기)"""
+    now = timezone.now()
+    fields = {
+        'owner': owner,
+        'status': FlightLease.STATUS_RUNNING,
+        'result': None,
+        'error': '',
+        'started_at': now,
+        'expires_at': now + timedelta(seconds=ttl),
+        'finished_at': None,
+    }
+    try:
+        with transaction.atomic():
+            FlightLease.objects.create(key=key, **fields)
+        return True
+    except IntegrityError:
+        pass
+    # 다른 요청이 먼저 가져갔다면 0건 갱신
+    return bool(
+        FlightLease.objects
+        .filter(key=key)
+        .filter(~Q(status=FlightLease.STATUS_RUNNING) | Q(expires_at__lt=now))
+        .update(**fields)
+    )
+
+
+def _finish(key: str, owner: str, status: str, result: Any = None, error: str = '') -> None:
+    # 만료돼 다른 요청이 이어받은 뒤라면 그 실행의 상태를 덮어쓰지 않는다
+    FlightLease.objects.filter(key=key, owner=owner).update(
+        status=status, result=result, error=error[:1000], finished_at=timezone.now(),
+    )
+
+
+def single_flight(key: str, fn: Callable[[], Any], ttl: float = 300, wait: Optional[float] = None) -> Any:
+    """
+    key당 하나의 fn만 실행한다. 동시에 들어온 요청은 실행 중인 작업의 결과를 받는다.
+    ttl: 실행자가 응답 없이 죽었다고 볼 시간(초), wait: 기다리는 최대 시간(초, 기본 ttl)
+    wait 안에 끝나지 않으면 SingleFlightTimeout (웹 요청은 짧은 wait로 워커를 오래 붙잡지 않는다)
+    """
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + (ttl if wait is None else wait)
+
+    while True:
+        if _try_lead(key, owner, ttl):
+            try:
+                result = fn()
+            except BaseException as e:
+                _finish(key, owner, FlightLease.STATUS_FAILED, error=f"{type(e).__name__}: {e}")
+                raise
+            _finish(key, owner, FlightLease.STATUS_DONE, result=result)
+            return result
+
+        print(f"[FLIGHT] {key} 실행 중인 작업에 합류")
+        lease = _wait_for(key, deadline)
+        if lease is None:
+            continue  # 만료 → 다음 루프에서 이어받기 시도
+        if lease.status == FlightLease.STATUS_DONE:
+            return lease.result
+        raise SingleFlightError(lease.error or f"{key} 작업 실패")
+
+
+def _wait_for(key: str, deadline: float) -> Optional[FlightLease]:
+    """실행 중인 행이 끝나면 그 행을, 만료됐거나 사라졌으면 None을 반환"""
+    while True:
+        lease = FlightLease.objects.filter(key=key).first()
+        if lease is None or (lease.status == FlightLease.STATUS_RUNNING and lease.expires_at < timezone.now()):
+            return None
+        if lease.status != FlightLease.STATUS_RUNNING:
+            return lease
+        if time.monotonic() >= deadline:
+            raise SingleFlightTimeout(f"{key} 작업이 {lease.started_at:%H:%M:%S}부터 실행 중입니다. 잠시 후 다시 시도하세요.")
+        time.sleep(FLIGHT_POLL_INTERVAL)
@@ -0,0 +1,156 @@
+"""
+사용자별 생산성 통계 (ProductivityStat: 일/주/월 버킷).
+
+일기가 저장·삭제되면 시그널(entry.signals)이 refresh_day()로 그 날짜의 버킷만 다시 계산한다.
+- day 버킷: 그날 일기(posted_day 인덱스 조회, 하루 한 편)에서 합/최소/최대를 구한다.
+- week / month 버킷: 같은 기간의 day 행(최대 7 / 31행)을 합친다 → 일기 행을 훑지 않는다.
+- streak: day 행마다 "그날로 끝나는 연속 작성 일수". 바뀐 날부터 앞으로만 다시 매기고,
+  저장된 값이 이미 맞는 행을 만나면 멈춘다.
+
+조회(stats_window)는 통계 행만 읽으므로 몇 년 치 차트도 일기 본문을 불러오지 않는다.
+posted_day가 없는 예전 중복 일기(0018 마이그레이션)는 집계에서 빠진다.
+"""
+
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import DiaryModel, ProductivityStat
+
+
+DAY = ProductivityStat.PERIOD_DAY
+WEEK = ProductivityStat.PERIOD_WEEK
+MONTH = ProductivityStat.PERIOD_MONTH
+PERIODS = (DAY, WEEK, MONTH)
+
+# 기간을 지정하지 않았을 때 보여 줄 버킷 수
+DEFAULT_POINTS = {DAY: 90, WEEK: 52, MONTH: 24}
+
+
+def period_start(period: str, day: date) -> date:
+    if period == WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def shift(period: str, start: date, n: int) -> date:
+    """버킷 시작일을 n개 버킷만큼 이동 (음수면 과거로)"""
+    if period == WEEK:
+        return start + timedelta(weeks=n)
+    if period == MONTH:
+        months = start.year * 12 + start.month - 1 + n
+        return date(months // 12, months % 12 + 1, 1)
+    return start + timedelta(days=n)
+
+
+def _save_bucket(author_id: int, period: str, start: date, aggregate: Dict[str, Any]) -> None:
+    if not aggregate['count']:
+        ProductivityStat.objects.filter(author_id=author_id, period=period, period_start=start).delete()
+        return
+    ProductivityStat.objects.update_or_create(
+        author_id=author_id, period=period, period_start=start,
+        defaults={
+            'count': aggregate['count'],
+            'total': aggregate['total'],
+            'min_productivity': aggregate['low'],
+            'max_productivity': aggregate['high'],
+        },
+    )
+
+
+def _refresh_streaks(author_id: int, day: date) -> None:
+    """day부터 앞으로 연속 구간의 streak를 다시 매긴다"""
+    days = ProductivityStat.objects.filter(author_id=author_id, period=DAY)
+    previous = days.filter(period_start=day - timedelta(days=1)).values_list('streak', flat=True).first() or 0
+
+    expected, run = day, previous
+    for row in list(days.filter(period_start__gte=day).order_by('period_start')):
+        if row.period_start != expected:
+            if expected != day:
+                break
+            # day 버킷이 없어졌으면(삭제) 다음 날부터 새 연속이 시작된다
+            expected, run = day + timedelta(days=1), 0
+            if row.period_start != expected:
+                break
+        run += 1
+        if row.streak == run:
+            break
+        row.streak = run
+        row.save(update_fields=['streak'])
+        expected += timedelta(days=1)
+
+
+def refresh_day(author_id: int, day: date) -> None:
+    """author의 day 날짜 일기가 바뀐 뒤 호출: day / 그 주 / 그 달 버킷과 streak 갱신"""
+    aggregate = DiaryModel.objects.filter(author_id=author_id, posted_day=day).aggregate(
+        count=Count('id'), total=Sum('productivity'), low=Min('productivity'), high=Max('productivity'),
+    )
+    _save_bucket(author_id, DAY, day, aggregate)
+    _refresh_streaks(author_id, day)
+
+    for period in (WEEK, MONTH):
+        start = period_start(period, day)
+        _save_bucket(author_id, period, start, ProductivityStat.objects.filter(
+            author_id=author_id, period=DAY, period_start__gte=start, period_start__lt=shift(period, start, 1),
+        ).aggregate(count=Sum('count'), total=Sum('total'), low=Min('min_productivity'), high=Max('max_productivity')))
+
+
+def refresh_days(keys: Iterable[Tuple[Optional[int], Optional[date]]]) -> None:
+    for author_id, day in set(keys):
+        if author_id is not None and day is not None:
+            refresh_day(author_id, day)
+
+
+def stats_window(author_id: int, period: str = DAY, start: Optional[date] = None,
+                 end: Optional[date] = None, window: int = 7) -> Dict[str, Any]:
+    """
+    [start, end] 구간의 버킷별 통계 + 이동 평균(직전 window개 버킷, 일기 수 가중) + 연속 작성 일수.
+    일기가 없는 버킷은 points에 나오지 않는다.
+    """
+    window = max(1, window)
+    end = period_start(period, end or timezone.localdate())
+    start = period_start(period, start) if start else shift(period, end, -(DEFAULT_POINTS[period] - 1))
+
+    rows = ProductivityStat.objects.filter(
+        author_id=author_id, period=period,
+        period_start__gte=shift(period, start, -(window - 1)), period_start__lte=end,
+    ).order_by('period_start')
+
+    points = []
+    recent, count, total = deque(), 0, 0
+    for row in rows:
+        recent.append(row)
+        count, total = count + row.count, total + row.total
+        while recent[0].period_start < shift(period, row.period_start, -(window - 1)):
+            dropped = recent.popleft()
+            count, total = count - dropped.count, total - dropped.total
+        if row.period_start < start:
+            continue
+        points.append({
+            'period_start': row.period_start.isoformat(),
+            'count': row.count,
+            'avg': round(row.avg_productivity, 2),
+            'min': row.min_productivity,
+            'max': row.max_productivity,
+            'rolling_avg': round(total / count, 2),
+        })
+
+    days = ProductivityStat.objects.filter(author_id=author_id, period=DAY)
+    latest = days.order_by('-period_start').values('period_start', 'streak').first()
+    current = latest['streak'] if latest and latest['period_start'] >= timezone.localdate() - timedelta(days=1) else 0
+    return {
+        'period': period,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'window': window,
+        'points': points,
+        'streak': {
+            'current': current,
+            'longest': days.aggregate(longest=Max('streak'))['longest'] or 0,
+        },
+    }
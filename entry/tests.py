@@ -1,3 +1,1656 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .Image_making import backends, client, renditions, resilience
+from .Image_making.backends import FakeBackend
+from .Image_making.metrics import percentile, summarize
+from .Image_making.outline_cache import diary_outline_key, get_outline_for_diary, store_outline
+from .Image_making.pipeline import (
+    PANEL_GUTTER,
+    PANEL_TILE_SIZE,
+    diary_outline_text,
+    generate_and_attach_image_to_diary,
+    outline_cache_key,
+    save_temp_image_to_s3,
+)
+from .Image_making.styles import (
+    FORCE_2X2_LAYOUT_BLOCK,
+    MULTI_PANEL_NEGATIVE,
+    SINGLE_PANEL_LAYOUT_BLOCK,
+    SINGLE_PANEL_NEGATIVE,
+    STYLE_PROMPT_FILES,
+    StyleRegistry,
+    get_style,
+    parse_style_template,
+    render_panel_prompt,
+    render_prompt,
+)
+from .Image_making.tracing import stage_latency_summary
+from . import events
+from .management.commands.generate_cartoons import Command as GenerateCartoonsCommand
+from .jobs import MAX_ATTEMPTS, claim_next_job, enqueue_generation, enqueue_outline, requeue_stale_jobs, run_job
+from .models import DiaryModel, FlightLease, GenerationEvent, GenerationJob, ImageCacheEntry, ImageVariant, OutlineCacheEntry, PendingImageDeletion, ProductivityStat, StageSpan
+from .singleflight import SingleFlightError
+from .variants import evict_variants, purge_pending_images, record_variant
+
+
+IMAGE_BYTES = bytes(range(256)) * 4096  # 1MB
+
+
+def _png_bytes(size=1024):
+    import io
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new('RGB', (size, size), 'white').save(buf, format='PNG')
+    return buf.getvalue()
+
+
+PNG_BYTES = _png_bytes()
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """임시 이미지 URL 역할을 하는 로컬 HTTP 서버"""
+
+    def do_GET(self):
+        bodies = {'/image.png': IMAGE_BYTES, '/cartoon.png': PNG_BYTES}
+        if self.path not in bodies:
+            self.send_error(404)
+            return
+        body = bodies[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RecordingStorage(InMemoryStorage):
+    """메모리 S3 대용. 업로드된 이름을 기록한다."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.uploads = []
+
+    def _save(self, name, content):
+        self.uploads.append(name)
+        return super()._save(name, content)
+
+
+class CartoonStorageTests(TestCase):
+
+    def setUp(self):
+        from diary.storages import CartoonStorage
+
+        self.storage = CartoonStorage(bucket_name='test-bucket', custom_domain='cdn.example.com')
+        # S3 대신: 업로드된 키를 기억하는 가짜 버킷
+        self.stored = {}
+        bucket = mock.Mock()
+        bucket.Object.side_effect = lambda key: mock.Mock(
+            upload_fileobj=lambda content, ExtraArgs, Config: self.stored.setdefault(key, (content.read(), ExtraArgs)),
+        )
+        patcher = mock.patch.object(type(self.storage), 'bucket', new_callable=mock.PropertyMock, return_value=bucket)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        exists = mock.patch.object(self.storage, 'exists', side_effect=lambda name: f'media/cartoon/{name}' in self.stored)
+        self.exists = exists.start()
+        self.addCleanup(exists.stop)
+
+    def test_content_addressed_objects_are_immutable(self):
+        from diary.storages import save_content_addressed
+
+        self.assertEqual(
+            self.storage.get_object_parameters('abc.png')['CacheControl'], 'public, max-age=31536000, immutable',
+        )
+        name, uploaded = save_content_addressed(self.storage, io.BytesIO(PNG_BYTES))
+
+        self.assertTrue(uploaded)
+        self.assertEqual(name, f'{hashlib.sha256(PNG_BYTES).hexdigest()}.png')
+        body, params = self.stored[f'media/cartoon/{name}']
+        self.assertEqual(body, PNG_BYTES)
+        self.assertEqual(params['CacheControl'], 'public, max-age=31536000, immutable')
+        self.assertEqual(params['ContentType'], 'image/png')
+        self.assertEqual(self.storage.url(name), f'https://cdn.example.com/media/cartoon/{name}')
+
+    def test_saving_same_bytes_again_is_a_no_op(self):
+        from diary.storages import save_content_addressed
+
+        first = save_content_addressed(self.storage, io.BytesIO(PNG_BYTES))
+        second = save_content_addressed(self.storage, io.BytesIO(PNG_BYTES))
+
+        self.assertEqual(second, (first[0], False))
+        self.assertEqual(len(self.stored), 1)
+        # file_overwrite=True: 같은 키를 다시 저장해도 _1 같은 새 이름을 만들지 않는다
+        self.assertEqual(self.storage.get_available_name(first[0]), first[0])
+
+
+class SaveTempImageToS3Tests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _ImageHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='a@example.com', password='pw')
+        self.storage = RecordingStorage(base_url='https://bucket.example.com/media/cartoon/')
+
+    def _diary(self, temp_image_url, author=None):
+        return DiaryModel.objects.create(
+            author=author or self.user, note='n', content='c', productivity=5,
+            posted_date=timezone.now(), temp_image_url=temp_image_url,
+        )
+
+    def test_stores_image_under_content_hash(self):
+        diary = self._diary(f'{self.base_url}/image.png')
+
+        url = save_temp_image_to_s3(diary.id, storage=self.storage)
+
+        name = f'{hashlib.sha256(IMAGE_BYTES).hexdigest()}.png'
+        self.assertEqual(url, f'https://bucket.example.com/media/cartoon/{name}')
+        self.assertEqual(self.storage.uploads, [name])
+        with self.storage.open(name, 'rb') as f:
+            self.assertEqual(f.read(), IMAGE_BYTES)
+        diary.refresh_from_db()
+        self.assertEqual(diary.image_url, url)
+
+    def test_same_image_bytes_are_uploaded_once(self):
+        first = save_temp_image_to_s3(self._diary(f'{self.base_url}/cartoon.png').id, storage=self.storage)
+        uploads = list(self.storage.uploads)
+
+        other = User.objects.create_user(username='b@example.com', password='pw')
+        diary = self._diary(f'{self.base_url}/cartoon.png', author=other)
+        second = save_temp_image_to_s3(diary.id, storage=self.storage)
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.storage.uploads, uploads)
+        diary.refresh_from_db()
+        self.assertEqual(diary.image_url, first)
+        self.assertTrue(diary.image_renditions)
+
+    def test_already_stored_image_is_not_downloaded_again(self):
+        stored_url = self.storage.url(self.storage.save('diary_x.png', ContentFile(b'png')))
+        diary = self._diary(stored_url)
+
+        self.assertEqual(save_temp_image_to_s3(diary.id, storage=self.storage), stored_url)
+        self.assertEqual(len(self.storage.uploads), 1)
+        diary.refresh_from_db()
+        self.assertEqual(diary.image_url, stored_url)
+
+    def test_download_error_returns_none(self):
+        diary = self._diary(f'{self.base_url}/missing.png')
+
+        self.assertIsNone(save_temp_image_to_s3(diary.id, storage=self.storage))
+        diary.refresh_from_db()
+        self.assertIsNone(diary.image_url)
+
+    def test_records_download_and_upload_spans(self):
+        diary = self._diary(f'{self.base_url}/image.png')
+        save_temp_image_to_s3(diary.id, storage=self.storage)
+
+        spans = StageSpan.objects.filter(diary_id=diary.id).order_by('started_at')
+        self.assertEqual([s.stage for s in spans], ['download', 'upload', 'rendition'])
+        self.assertEqual([s.outcome for s in spans[:2]], ['ok', 'ok'])
+        self.assertEqual(len({s.trace_id for s in spans}), 1)
+
+    def test_download_error_is_recorded_on_span(self):
+        diary = self._diary(f'{self.base_url}/missing.png')
+        save_temp_image_to_s3(diary.id, storage=self.storage)
+
+        span = StageSpan.objects.get(diary_id=diary.id)
+        self.assertEqual((span.stage, span.outcome), ('download', 'error'))
+        self.assertIn('404', span.error)
+
+    def test_creates_thumbnail_and_webp_renditions(self):
+        diary = self._diary(f'{self.base_url}/cartoon.png')
+
+        url = save_temp_image_to_s3(diary.id, storage=self.storage)
+
+        diary.refresh_from_db()
+        stem = url.rsplit('/', 1)[-1][:-len('.png')]
+        renditions = diary.image_renditions
+        self.assertEqual(renditions['width'], 1024)
+        self.assertEqual(sorted(renditions['png'], key=int), ['128', '256', '512'])
+        self.assertEqual(sorted(renditions['webp'], key=int), ['128', '256', '512', '1024'])
+        self.assertTrue(renditions['webp']['256'].endswith(f'{stem}_256.webp'))
+        self.assertTrue(self.storage.exists(f'{stem}_128.png'))
+        self.assertEqual(diary.image_srcset().split(', ')[-1], f'{url} 1024w')
+        self.assertIn(f'{stem}_512.webp 512w', diary.image_webp_srcset())
+        self.assertEqual(diary.thumbnail_url(200), renditions['webp']['256'])
+
+    def test_renditions_are_built_from_the_download_spool(self):
+        diary = self._diary(f'{self.base_url}/cartoon.png')
+
+        with mock.patch.object(renditions, 'store_renditions', wraps=renditions.store_renditions) as store:
+            save_temp_image_to_s3(diary.id, storage=self.storage)
+
+        # 이미지 전체를 bytes로 복사해 넘기지 않고 스풀 파일 객체를 그대로 읽는다
+        source = store.call_args.args[0]
+        self.assertNotIsInstance(source, bytes)
+        self.assertTrue(hasattr(source, 'seek'))
+        diary.refresh_from_db()
+        self.assertEqual(diary.image_renditions['width'], 1024)
+
+    def test_without_temp_image_url_returns_none(self):
+        diary = self._diary(None)
+        self.assertIsNone(save_temp_image_to_s3(diary.id, storage=self.storage))
+
+
+class StageLatencyTests(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+
+        def add(stage, style, duration_ms, outcome='ok', hours_ago=1):
+            StageSpan.objects.create(
+                trace_id='t', stage=stage, style=style, outcome=outcome, duration_ms=duration_ms,
+                started_at=now - timedelta(hours=hours_ago),
+            )
+
+        for ms in range(1, 11):
+            add('outline', 'ani', float(ms))
+        add('outline', 'ani', 5000.0, outcome='error')   # 실패는 분포에서 제외
+        add('outline', 'ani', 3.0, outcome='cached')
+        add('outline', 'simple', 100.0)
+        add('image', 'ani', 9000.0, hours_ago=30)       # 집계 기간 밖
+        add('image', 'ani', 20000.0, hours_ago=24 * 20)  # 보관 기간 밖
+
+    def test_summary_counts_and_percentiles_per_stage_and_style(self):
+        summary = stage_latency_summary(hours=24, style='ani')
+        self.assertEqual(list(summary), ['outline'])
+        outline = summary['outline']
+        self.assertEqual(outline['count'], 11)
+        self.assertEqual((outline['p50'], outline['p90'], outline['max']), (5.0, 9.0, 10.0))
+        self.assertEqual(outline['outcomes'], {'ok': 10, 'error': 1, 'cached': 1})
+
+        everything = stage_latency_summary(hours=48)
+        self.assertEqual(list(everything), ['outline', 'image'])
+        self.assertEqual(everything['outline']['max'], 100.0)
+        self.assertEqual(everything['image']['count'], 1)
+
+    def test_traces_view_is_staff_only(self):
+        user = User.objects.create_user(username='a@example.com', password='pw')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/generate-image/traces/').status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get('/generate-image/traces/', {'hours': 24, 'style': 'ani'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stages']['outline']['p90'], 9.0)
+        self.assertEqual(self.client.get('/generate-image/traces/', {'hours': 'x'}).status_code, 400)
+
+    @override_settings(CARTOON_TRACE_RETENTION_DAYS=14)
+    def test_worker_prunes_spans_past_retention(self):
+        with tempfile.TemporaryFile('w+') as out:
+            call_command('run_generation_worker', once=True, stdout=out)
+        self.assertEqual(StageSpan.objects.count(), 14)
+        self.assertFalse(StageSpan.objects.filter(duration_ms=20000.0).exists())
+
+
+class B64ImageModeTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(
+            USE_S3=False, MEDIA_ROOT=media.name, MEDIA_URL='/media/', CARTOON_IMAGE_MODE='b64',
+            CARTOON_GENERATION_MODE='grid', CARTOON_IMAGE_CACHE=False, CARTOON_TRACE_SINK='off',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # 실제 OpenAIBackend 경로: images.generate가 b64_json을 돌려주는 클라이언트
+        self.images = {}
+        self.api = mock.Mock()
+        self.api.images.generate.side_effect = self._b64_response
+        client.set_client(self.api)
+        self.addCleanup(client.set_client, None)
+        openai_backend = backends.OpenAIBackend()
+        backends.set_backend(outline=FakeBackend(), image=openai_backend)
+        self.addCleanup(backends.reset_backends)
+
+        self.user = User.objects.create_user(username='a@example.com', password='pw')
+
+    def _b64_response(self, prompt, response_format, **kwargs):
+        self.assertEqual(response_format, 'b64_json')
+        image = _png_bytes(64 + 32 * len(self.images))
+        self.images[prompt] = image
+        return mock.Mock(data=[mock.Mock(url=None, b64_json=base64.b64encode(image).decode('ascii'))])
+
+    def _diary(self, content, days_ago=0):
+        return DiaryModel.objects.create(
+            author=self.user, note='n', content=content, productivity=5,
+            posted_date=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def test_generations_are_decoded_into_local_storage_under_unique_names(self):
+        first, second = self._diary('went to the beach'), self._diary('stayed home and read', days_ago=1)
+        _, first_url = generate_and_attach_image_to_diary(first.id, style='simple')
+        _, second_url = generate_and_attach_image_to_diary(second.id, style='simple')
+
+        self.assertNotEqual(first_url, second_url)
+        for diary_id, url in ((first.id, first_url), (second.id, second_url)):
+            self.assertTrue(url.startswith('/media/cartoon/'))
+            name = url[len('/media/cartoon/'):]
+            with open(f'{self.media_root}/cartoon/{name}', 'rb') as f:
+                stored = f.read()
+            # base64를 디코딩한 바이트 그대로, 내용 해시 이름으로 저장
+            self.assertEqual(stored, self.images[DiaryModel.objects.get(pk=diary_id).final_prompt])
+            self.assertEqual(name, f'{hashlib.sha256(stored).hexdigest()}.png')
+
+    def test_concurrent_local_fallbacks_do_not_share_a_file(self):
+        from entry.Image_making import pipeline
+
+        results = []
+        with mock.patch.object(pipeline, 'MEDIA_DIR', pipeline.Path(self.media_root) / 'generated'):
+            threads = [
+                threading.Thread(target=lambda: results.append(
+                    pipeline.generate_image('same prompt', response_format='b64_json')[1]
+                ))
+                for _ in range(2)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(len(set(results)), 2)
+        self.assertNotIn('diary_4cut_1024.png', {path.name for path in results})
+        self.assertTrue(all(path.read_bytes().startswith(b'\x89PNG') for path in results))
+
+    def test_saving_stored_image_makes_no_http_request(self):
+        diary = self._diary('went to the beach')
+        _, temp_url = generate_and_attach_image_to_diary(diary.id, style='simple')
+
+        with mock.patch('entry.Image_making.transfer.get_http_session') as session:
+            self.assertEqual(save_temp_image_to_s3(diary.id), temp_url)
+        session.assert_not_called()
+        diary.refresh_from_db()
+        self.assertEqual(diary.image_url, temp_url)
+        self.assertEqual(diary.image_renditions['width'], 64)
+
+
+class BenchPipelineCommandTests(TestCase):
+
+    @override_settings(CARTOON_TRACE_SINK='db', CARTOON_IMAGE_CACHE=True)
+    def test_writes_per_stage_percentiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = f'{tmp}/bench.json'
+            call_command('bench_pipeline', iterations=3, image_latency=0.01, output=output, stdout=open(f'{tmp}/log', 'w'))
+            with open(output, encoding='utf-8') as f:
+                result = json.load(f)
+
+        for stage in ('prompt', 'image', 'generate', 'persist', 'end_to_end'):
+            self.assertEqual(result['stages'][stage]['count'], 3)
+            self.assertEqual(result['stages'][stage]['errors'], 0)
+            self.assertLessEqual(result['stages'][stage]['p50'], result['stages'][stage]['p99'])
+        self.assertGreaterEqual(result['stages']['image']['p50'], 0.01)
+        self.assertTrue(result['prd']['prompt']['pass'])
+        # 벤치마크용 사용자/일기는 정리된다
+        self.assertFalse(User.objects.filter(username__startswith='bench-').exists())
+        self.assertFalse(DiaryModel.objects.exists())
+        # 지연 집계 / single-flight 임대 / 이미지 캐시에도 흔적을 남기지 않는다
+        self.assertFalse(StageSpan.objects.exists())
+        self.assertFalse(FlightLease.objects.exists())
+        self.assertFalse(ImageCacheEntry.objects.exists())
+
+
+class GenerateCartoonsCommandTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        bob = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        day = timezone.make_aware(timezone.datetime(2025, 3, 10, 12))
+
+        def diary(author, days_ago, **fields):
+            return DiaryModel.objects.create(
+                author=author, note='n', content='c', productivity=5, posted_date=day - timedelta(days=days_ago), **fields,
+            ).id
+
+        self.plain = diary(self.alice, 0)
+        self.ani = diary(self.alice, 1, style='ani')
+        self.saved = diary(self.alice, 2, image_url='https://bucket.example.com/media/cartoon/a.png')
+        self.old = diary(self.alice, 40)
+        self.bob = diary(bob, 0)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = f'{tmp.name}/bulk.ckpt'
+
+    def _run(self, process, **options):
+        out = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self.addCleanup(out.close)
+        with mock.patch.object(GenerateCartoonsCommand, '_process', side_effect=process) as patched:
+            call_command('generate_cartoons', checkpoint=self.checkpoint, workers=2, stdout=out, **options)
+        out.seek(0)
+        return sorted(args[0] for args, _ in patched.call_args_list), out.read()
+
+    def test_selects_by_user_date_style_and_missing_image(self):
+        def ok(diary_id, style, persist, use_cache):
+            return True, 0.1, ''
+
+        processed, _ = self._run(ok, user=['alice@example.com'], since='2025-03-01', reset_checkpoint=True)
+        self.assertEqual(processed, sorted([self.plain, self.ani]))
+
+        processed, _ = self._run(ok, style='ani', include_existing=True, reset_checkpoint=True)
+        self.assertEqual(processed, [self.ani])
+
+    def test_rerun_resumes_from_checkpoint_and_retries_failures(self):
+        def flaky(diary_id, style, persist, use_cache):
+            return (diary_id != self.bob, 0.1, '' if diary_id != self.bob else 'boom')
+
+        processed, output = self._run(flaky)
+        self.assertEqual(processed, sorted([self.plain, self.ani, self.old, self.bob]))
+        self.assertIn('성공 3건, 실패 1건', output)
+        self.assertIn(f'실패 diary {self.bob}: boom', output)
+
+        # 실패한 일기만 다시 처리
+        processed, _ = self._run(lambda *args: (True, 0.1, ''))
+        self.assertEqual(processed, [self.bob])
+
+        processed, output = self._run(lambda *args: (True, 0.1, ''))
+        self.assertEqual(processed, [])
+        self.assertIn('대상 0건', output)
+
+    def test_checkpoint_from_other_filters_is_not_resumed(self):
+        processed, _ = self._run(lambda *args: (True, 0.1, ''), style='ani')
+        self.assertEqual(processed, [self.ani])
+
+        # 다른 조건의 백필이 ani 백필의 체크포인트로 일기를 건너뛰지 않는다
+        with self.assertRaisesMessage(CommandError, '--reset-checkpoint'):
+            self._run(lambda *args: (True, 0.1, ''), include_existing=True)
+
+        processed, _ = self._run(lambda *args: (True, 0.1, ''), include_existing=True, reset_checkpoint=True)
+        self.assertEqual(processed, sorted([self.plain, self.ani, self.saved, self.old, self.bob]))
+
+    def test_invalid_date_is_a_command_error(self):
+        with self.assertRaisesMessage(CommandError, 'YYYY-MM-DD'):
+            call_command('generate_cartoons', since='10/03/2025', checkpoint=self.checkpoint)
+
+    def test_latency_percentiles_use_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual((percentile(values, 50), percentile(values, 90), percentile(values, 99)), (50.0, 90.0, 99.0))
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(summarize([]), {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0})
+        self.assertEqual(summarize([2.0, 4.0])['mean'], 3.0)
+
+
+class CountingOutlineBackend(FakeBackend):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def outline(self, diary_text, language, model):
+        self.calls += 1
+        return super().outline(diary_text, language, model)
+
+
+class StylePromptTests(TestCase):
+    PANELS = [{'scene': f'scene {i}', 'emotion': f'mood {i}', 'caption': f'caption {i}'} for i in range(1, 5)]
+
+    def _template_sections(self, style):
+        """템플릿 파일에서 헤더([LAYOUT] 앞)와 [NEGATIVE PROMPT] 본문을 직접 잘라낸다"""
+        text = STYLE_PROMPT_FILES[style].read_text(encoding='utf-8')
+        header, rest = text.split('[LAYOUT]', 1)
+        negative = rest.split('[NEGATIVE PROMPT]', 1)[1]
+        return header.strip(), negative.strip().rstrip(' ,.')
+
+    def test_render_prompt_output_for_each_style(self):
+        panels = ''.join(
+            f'[PANEL {i}]\nScene: scene {i}\nEmotion: mood {i}\nCaption: caption {i}\n' + ('\n' if i < 4 else '')
+            for i in range(1, 5)
+        )
+        for style in ('simple', 'ani', 'real'):
+            with self.subTest(style=style):
+                header, negative = self._template_sections(style)
+                prompt = render_prompt(get_style(style), self.PANELS)
+
+                self.assertEqual(prompt, (
+                    f'{header}\n\n{FORCE_2X2_LAYOUT_BLOCK}\n{panels}'
+                    f'\n[NEGATIVE PROMPT]\n{negative}, {MULTI_PANEL_NEGATIVE}'
+                ))
+                # 다중 패널 금지 문구는 네거티브 블록에만, 4번째 컷 캡션에는 붙지 않는다
+                last_panel = prompt.split('[PANEL 4]', 1)[1].split('[NEGATIVE PROMPT]', 1)[0]
+                self.assertEqual(last_panel, '\nScene: scene 4\nEmotion: mood 4\nCaption: caption 4\n\n')
+                self.assertEqual(prompt.count('[LAYOUT]'), 1)
+
+    def test_render_panel_prompt_output_for_each_style(self):
+        for style in ('simple', 'ani', 'real'):
+            with self.subTest(style=style):
+                header, negative = self._template_sections(style)
+                self.assertEqual(render_panel_prompt(get_style(style), self.PANELS[2], 3), (
+                    f'{header}\n\n{SINGLE_PANEL_LAYOUT_BLOCK}\n'
+                    '[PANEL 3]\nScene: scene 3\nEmotion: mood 3\nCaption: caption 3\n'
+                    f'\n[NEGATIVE PROMPT]\n{negative}, {SINGLE_PANEL_NEGATIVE}'
+                ))
+
+    def test_template_sample_panels_are_dropped_and_missing_panels_padded(self):
+        template = parse_style_template(
+            '[GLOBAL STYLE]\nInk doodle.\n\n[CHARACTER]\nSame kid.\n\n[LAYOUT]\n3x2 grid.\n\n'
+            '[PANEL 1]\nSample scene one.\n\n[PANEL 5]\nSample scene five.\n\n'
+            '[NEGATIVE PROMPT]\nno color,\n'
+        )
+        prompt = render_prompt(template, self.PANELS[:2])
+
+        self.assertNotIn('Sample scene', prompt)
+        self.assertNotIn('3x2 grid.', prompt)
+        self.assertTrue(prompt.startswith('[GLOBAL STYLE]\nInk doodle.\n\n[CHARACTER]\nSame kid.\n\n[LAYOUT]'))
+        self.assertEqual([line for line in prompt.splitlines() if line.startswith('[PANEL')],
+                         ['[PANEL 1]', '[PANEL 2]', '[PANEL 3]', '[PANEL 4]'])
+        self.assertIn('[PANEL 4]\nScene: \n', prompt)
+        self.assertTrue(prompt.endswith(f'[NEGATIVE PROMPT]\nno color, {MULTI_PANEL_NEGATIVE}'))
+
+    def test_registry_reparses_only_when_file_changes(self):
+        registry = StyleRegistry()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/style.txt'
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[GLOBAL STYLE]\nfirst\n')
+            first = registry.get_path(path)
+            with mock.patch('entry.Image_making.styles.parse_style_template') as parse:
+                self.assertIs(registry.get_path(path), first)
+            parse.assert_not_called()
+
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[GLOBAL STYLE]\nsecond\n')
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            self.assertEqual(registry.get_path(path).header, '[GLOBAL STYLE]\nsecond')
+
+
+class OpenAIClientTests(TestCase):
+
+    def setUp(self):
+        client.set_client(None)
+        self.addCleanup(client.set_client, None)
+        patcher = mock.patch.object(client, 'OpenAI')
+        self.OpenAI = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_client_is_shared_across_threads(self):
+        # 생성이 느려도(커넥션 풀 준비) 동시에 들어온 스레드가 각자 만들지 않는다
+        self.OpenAI.side_effect = lambda **kwargs: time.sleep(0.01) or mock.DEFAULT
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.get_client())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.OpenAI.assert_called_once()
+        self.assertEqual({id(c) for c in results}, {id(self.OpenAI.return_value)})
+
+    def test_client_uses_pooled_http_client_from_env(self):
+        env = {
+            'OPENAI_TIMEOUT': '60', 'OPENAI_CONNECT_TIMEOUT': '5', 'OPENAI_POOL_MAXSIZE': '4',
+            'OPENAI_KEEPALIVE_EXPIRY': '15', 'OPENAI_MAX_RETRIES': '0',
+        }
+        with mock.patch.dict('os.environ', env), mock.patch.object(client, 'httpx') as httpx:
+            client.get_client()
+
+        httpx.Timeout.assert_called_once_with(60.0, connect=5.0)
+        httpx.Limits.assert_called_once_with(max_connections=4, max_keepalive_connections=4, keepalive_expiry=15.0)
+        kwargs = self.OpenAI.call_args.kwargs
+        self.assertEqual(kwargs['max_retries'], 0)
+        self.assertIs(kwargs['http_client'], httpx.Client.return_value)
+
+    def test_reset_closes_client_and_next_call_rebuilds(self):
+        injected = mock.Mock()
+        client.set_client(injected)
+        self.assertIs(client.get_client(), injected)
+
+        client.reset_client()
+        injected.close.assert_called_once()
+        self.assertIs(client.get_client(), self.OpenAI.return_value)
+
+    def test_env_is_loaded_once_and_api_alias_exposed(self):
+        load_dotenv = mock.Mock()
+        with tempfile.TemporaryDirectory() as root:
+            open(f'{root}/.env', 'w').close()
+            with mock.patch.object(client, 'PROJECT_ROOT', client.Path(root)), \
+                    mock.patch.object(client, '_env_loaded', False), mock.patch.object(client, 'load_dotenv', load_dotenv), \
+                    mock.patch.dict('os.environ', {'OPENAI_API': 'sk-test'}, clear=True):
+                client.ensure_env_loaded()
+                client.ensure_env_loaded()
+                self.assertEqual(client.os.environ['OPENAI_API_KEY'], 'sk-test')
+        load_dotenv.assert_called_once()
+
+
+class SpeculativeOutlineTests(TestCase):
+
+    def setUp(self):
+        self.backend = CountingOutlineBackend()
+        backends.set_backend(outline=self.backend)
+        self.addCleanup(backends.reset_backends)
+        self.user = User.objects.create_user(username='a@example.com', password='pw')
+        self.diary = DiaryModel.objects.create(
+            author=self.user, note='n', content='first version', productivity=5, posted_date=timezone.now(),
+        )
+
+    def _change_content(self, content):
+        DiaryModel.objects.filter(pk=self.diary.pk).update(content=content)
+        self.diary.refresh_from_db()
+
+    def test_generation_reuses_precomputed_outline(self):
+        run_job(enqueue_outline(self.diary.id))
+        self.assertEqual(self.backend.calls, 1)
+
+        get_outline_for_diary(self.diary, diary_outline_text(self.diary))
+        self.assertEqual(self.backend.calls, 1)
+        self.assertIsNone(enqueue_outline(self.diary.id))
+
+    def test_content_change_discards_stale_outline_and_queued_job(self):
+        run_job(enqueue_outline(self.diary.id))
+        self._change_content('second version')
+        queued = enqueue_outline(self.diary.id)
+
+        self.assertFalse(OutlineCacheEntry.objects.filter(diary=self.diary).exists())
+        self._change_content('third version')
+        latest = enqueue_outline(self.diary.id)
+
+        self.assertFalse(GenerationJob.objects.filter(pk=queued.pk).exists())
+        self.assertEqual(latest.content_key, diary_outline_key(self.diary))
+
+    def test_job_for_outdated_content_is_skipped(self):
+        job = enqueue_outline(self.diary.id)
+        self._change_content('edited before the worker ran')
+        job.status = GenerationJob.STATUS_RUNNING
+
+        run_job(job)
+
+        self.assertEqual(self.backend.calls, 0)
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertFalse(OutlineCacheEntry.objects.exists())
+
+
+class EmptyOutlineBackend(CountingOutlineBackend):
+    """GPT 호출이 실패해 빈 패널로 폴백한 경우"""
+
+    def outline(self, diary_text, language, model):
+        self.calls += 1
+        return [{'scene': '', 'caption': '', 'emotion': ''} for _ in range(4)]
+
+
+class OutlineCacheTests(TestCase):
+
+    def setUp(self):
+        self.backend = CountingOutlineBackend()
+        backends.set_backend(outline=self.backend)
+        self.addCleanup(backends.reset_backends)
+        user = User.objects.create_user(username='a@example.com', password='pw')
+        self.diary = DiaryModel.objects.create(
+            author=user, note='n', content='a long day at school', productivity=5, posted_date=timezone.now(),
+        )
+        self.other = DiaryModel.objects.create(
+            author=user, note='n', content='another day', productivity=5,
+            posted_date=timezone.now() - timedelta(days=1),
+        )
+
+    def test_unchanged_diary_skips_outline_call(self):
+        text = diary_outline_text(self.diary)
+        first = get_outline_for_diary(self.diary, text)
+        self.assertEqual(get_outline_for_diary(self.diary, text), first)
+        self.assertEqual(self.backend.calls, 1)
+
+        # 언어 / 내용이 다르면 다른 키
+        get_outline_for_diary(self.diary, text, language='ko')
+        get_outline_for_diary(self.diary, text + ' edited')
+        self.assertEqual(self.backend.calls, 3)
+
+    def test_key_covers_text_language_model_and_prompt_version(self):
+        key = outline_cache_key('diary', language='en', model='m')
+        self.assertEqual(key, outline_cache_key('  diary\n', language='EN', model='m'))
+        self.assertNotEqual(key, outline_cache_key('diary', language='ko', model='m'))
+        self.assertNotEqual(key, outline_cache_key('diary', language='en', model='other'))
+        with mock.patch('entry.Image_making.pipeline.OUTLINE_PROMPT_VERSION', 2):
+            self.assertNotEqual(key, outline_cache_key('diary', language='en', model='m'))
+
+    def test_empty_fallback_outline_is_not_cached(self):
+        backend = EmptyOutlineBackend()
+        backends.set_backend(outline=backend)
+        text = diary_outline_text(self.diary)
+
+        get_outline_for_diary(self.diary, text)
+        get_outline_for_diary(self.diary, text)
+        self.assertEqual(backend.calls, 2)
+        self.assertFalse(OutlineCacheEntry.objects.exists())
+
+    @override_settings(OUTLINE_CACHE_MAX_PER_DIARY=2, OUTLINE_CACHE_MAX_ENTRIES=3)
+    def test_entries_are_capped_per_diary_and_globally(self):
+        panels = [{'scene': 's', 'caption': 'c', 'emotion': ''}] * 4
+        for key in ('a1', 'a2', 'a3'):
+            store_outline(self.diary, key, panels)
+        # 일기당 최근 2개만
+        self.assertEqual(set(OutlineCacheEntry.objects.values_list('key', flat=True)), {'a2', 'a3'})
+
+        store_outline(self.other, 'b1', panels)
+        store_outline(self.other, 'b2', panels)
+        # 전체 3개 초과 → 가장 오래 사용되지 않은 항목부터
+        self.assertEqual(set(OutlineCacheEntry.objects.values_list('key', flat=True)), {'a3', 'b1', 'b2'})
+
+
+class PanelModeTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(
+            USE_S3=False, MEDIA_ROOT=media.name, CARTOON_GENERATION_MODE='panels',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.backend = FakeBackend(image_latency=0.3)
+        backends.set_backend(outline=self.backend, image=self.backend)
+        self.addCleanup(backends.reset_backends)
+        self.media_root = media.name
+
+        user = User.objects.create_user(username='a@example.com', password='pw')
+        self.diary = DiaryModel.objects.create(
+            author=user, note='n', content='a long day at school', productivity=5, posted_date=timezone.now(),
+        )
+
+    def test_generates_panels_concurrently_and_composites_2x2(self):
+        from PIL import Image
+
+        started = time.monotonic()
+        prompt, temp_url = generate_and_attach_image_to_diary(self.diary.id, style='simple')
+        elapsed = time.monotonic() - started
+
+        # 4컷이 순차가 아니라 동시에 생성됨 (순차라면 1.2초 이상)
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(prompt.count('[PANEL '), 4)
+
+        self.diary.refresh_from_db()
+        self.assertEqual(self.diary.temp_image_url, temp_url)
+        self.assertEqual(len(self.diary.panel_image_urls), 4)
+        self.assertEqual(len(set(self.diary.panel_image_urls)), 4)
+
+        name = temp_url.rsplit('/', 1)[-1]
+        with Image.open(f'{self.media_root}/cartoon/{name}') as composite:
+            side = PANEL_TILE_SIZE * 2 + PANEL_GUTTER * 3
+            self.assertEqual(composite.size, (side, side))
+
+        # 합성본은 이미 스토리지에 있으므로 저장 시 다시 내려받지 않는다
+        self.assertEqual(save_temp_image_to_s3(self.diary.id), temp_url)
+
+
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='a@example.com', password='pw')
+        self.diary = DiaryModel.objects.create(
+            author=user, note='n', content='c', productivity=5,
+            posted_date=timezone.now(), temp_image_url='http://127.0.0.1:9/never.png',
+        )
+        self.storage = RecordingStorage(base_url='https://bucket.example.com/media/cartoon/')
+
+    def _running_lease(self, key, expires_in=60):
+        return FlightLease.objects.create(
+            key=key, owner='other-worker', expires_at=timezone.now() + timedelta(seconds=expires_in),
+        )
+
+    def _finish_on_poll(self, key, **fields):
+        """기다리는 동안(sleep) 다른 워커가 작업을 끝낸 것처럼 임대 행을 갱신"""
+        return mock.patch(
+            'entry.singleflight.time.sleep',
+            side_effect=lambda _: FlightLease.objects.filter(key=key).update(**fields),
+        )
+
+    def test_duplicate_generate_request_attaches_to_active_job(self):
+        first = enqueue_generation(self.diary, style='ani')
+        second = enqueue_generation(self.diary, style='simple')
+        self.assertEqual(second.id, first.id)
+
+        GenerationJob.objects.filter(id=first.id).update(status=GenerationJob.STATUS_DONE)
+        self.assertNotEqual(enqueue_generation(self.diary).id, first.id)
+
+    def test_regenerate_request_does_not_attach_to_cached_job(self):
+        queued = enqueue_generation(self.diary)
+        # 대기 중인 캐시 작업 → 캐시 우회로 바꿔 그대로 사용
+        self.assertEqual(enqueue_generation(self.diary, bypass_cache=True).id, queued.id)
+        self.assertTrue(GenerationJob.objects.get(id=queued.id).bypass_cache)
+        GenerationJob.objects.filter(id=queued.id).update(status=GenerationJob.STATUS_DONE)
+
+        running = enqueue_generation(self.diary)
+        GenerationJob.objects.filter(id=running.id).update(status=GenerationJob.STATUS_RUNNING)
+        # 이미 실행 중인 캐시 작업 → 우회 작업을 따로 등록, 이후 요청은 모두 그 작업에 붙는다
+        fresh = enqueue_generation(self.diary, bypass_cache=True)
+        self.assertNotEqual(fresh.id, running.id)
+        self.assertTrue(fresh.bypass_cache)
+        self.assertEqual(enqueue_generation(self.diary, bypass_cache=True).id, fresh.id)
+        self.assertEqual(enqueue_generation(self.diary).id, fresh.id)
+
+    def test_concurrent_save_receives_in_flight_result(self):
+        key = f'save:{self.diary.id}'
+        self._running_lease(key)
+        stored_url = 'https://bucket.example.com/media/cartoon/abc.png'
+
+        with self._finish_on_poll(key, status=FlightLease.STATUS_DONE, result=stored_url):
+            self.assertEqual(save_temp_image_to_s3(self.diary.id, storage=self.storage), stored_url)
+        self.assertEqual(self.storage.uploads, [])
+
+    def test_failure_is_shared_with_waiting_callers(self):
+        key = f'generate:{self.diary.id}'
+        self._running_lease(key)
+
+        with self._finish_on_poll(key, status=FlightLease.STATUS_FAILED, error='RuntimeError: boom'):
+            with self.assertRaisesMessage(SingleFlightError, 'boom'):
+                generate_and_attach_image_to_diary(self.diary.id, style='simple')
+
+    def test_save_request_does_not_wait_out_running_upload(self):
+        self._running_lease(f'save:{self.diary.id}')
+        self.client.force_login(self.diary.author)
+
+        # 실행 중인 업로드가 끝나지 않음 → SAVE_REQUEST_WAIT 뒤 409 (SAVE_FLIGHT_TTL만큼 붙잡지 않는다)
+        with mock.patch('entry.Image_making.pipeline.SAVE_REQUEST_WAIT', 0), \
+                mock.patch('entry.singleflight.time.sleep') as sleep:
+            response = self.client.post(f'/save-image/{self.diary.id}/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'error')
+        sleep.assert_not_called()
+        self.assertEqual(self.storage.uploads, [])
+
+    def test_expired_lease_is_taken_over(self):
+        self._running_lease(f'save:{self.diary.id}', expires_in=-1)
+
+        # 다운로드는 실패하지만 새 실행자가 직접 실행했고 결과(None)를 기록한다
+        self.assertIsNone(save_temp_image_to_s3(self.diary.id, storage=self.storage))
+        lease = FlightLease.objects.get(key=f'save:{self.diary.id}')
+        self.assertEqual((lease.status, lease.result), (FlightLease.STATUS_DONE, None))
+        self.assertNotEqual(lease.owner, 'other-worker')
+
+
+class GenerationEventTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(USE_S3=False, MEDIA_ROOT=media.name, CARTOON_GENERATION_MODE='grid')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        backends.set_backend(outline=FakeBackend(), image=FakeBackend())
+        self.addCleanup(backends.reset_backends)
+
+        self.user = User.objects.create_user(username='a@example.com', password='pw')
+        self.diary = DiaryModel.objects.create(
+            author=self.user, note='n', content='a long day at school', productivity=5, posted_date=timezone.now(),
+        )
+
+    def test_pipeline_publishes_stage_events(self):
+        _, temp_url = generate_and_attach_image_to_diary(self.diary.id, style='simple')
+
+        published = list(GenerationEvent.objects.filter(diary=self.diary))
+        self.assertEqual([e.event for e in published], ['outline', 'image_requested', 'image_ready'])
+        self.assertEqual(len(published[0].data['captions']), 4)
+        self.assertEqual(published[2].data['temp_image_url'], temp_url)
+
+    def test_status_reports_stage_and_captions_of_this_job(self):
+        events.publish(self.diary.id, events.EVENT_OUTLINE, captions=['old'] * 4)
+        GenerationEvent.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        job = enqueue_generation(self.diary)
+
+        self.client.force_login(self.user)
+        status = self.client.get(f'/generate-image/status/{job.id}/').json()
+        # 이전 생성의 이벤트는 보이지 않는다
+        self.assertEqual((status['stage'], status['captions']), (None, []))
+
+        events.publish(self.diary.id, events.EVENT_OUTLINE, captions=['a', 'b', 'c', 'd'])
+        events.publish(self.diary.id, events.EVENT_IMAGE_REQUESTED, mode='grid')
+        status = self.client.get(f'/generate-image/status/{job.id}/').json()
+        self.assertEqual((status['stage'], status['captions']), ('image_requested', ['a', 'b', 'c', 'd']))
+        self.assertEqual(status['job_status'], GenerationJob.STATUS_QUEUED)
+
+    def test_status_is_limited_to_own_diary(self):
+        job = enqueue_generation(self.diary)
+        other = User.objects.create_user(username='b@example.com', password='pw')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(f'/generate-image/status/{job.id}/').status_code, 404)
+
+
+class CountingImageBackend(FakeBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.image_calls = 0
+
+    def generate(self, prompt, size, response_format, model):
+        self.image_calls += 1
+        return super().generate(prompt, size, response_format, model)
+
+
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(USE_S3=False, MEDIA_ROOT=media.name, CARTOON_GENERATION_MODE='grid')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.backend = CountingImageBackend()
+        backends.set_backend(outline=self.backend, image=self.backend)
+        self.addCleanup(backends.reset_backends)
+
+        self.user = User.objects.create_user(username='a@example.com', password='pw')
+        self.diary = DiaryModel.objects.create(
+            author=self.user, note='n', content='a long day at school', productivity=5, posted_date=timezone.now(),
+        )
+
+    def test_reselecting_earlier_variant_needs_no_generation_or_download(self):
+        _, first_url = generate_and_attach_image_to_diary(self.diary.id, style='simple')
+        _, second_url = generate_and_attach_image_to_diary(self.diary.id, style='ani')
+        self.assertNotEqual(first_url, second_url)
+        first = self.diary.variants.get(image_url=first_url)
+
+        self.client.force_login(self.user)
+        listed = self.client.get(f'/generate-image/{self.diary.id}/variants/').json()['variants']
+        self.assertEqual([v['image_url'] for v in listed], [second_url, first_url])
+        self.assertEqual([v['selected'] for v in listed], [True, False])
+
+        response = self.client.post(f'/generate-image/{self.diary.id}/variants/{first.id}/select/')
+        self.assertEqual(response.json()['temp_image_url'], first_url)
+        self.diary.refresh_from_db()
+        self.assertEqual(self.diary.final_prompt, first.prompt)
+
+        # 보관된 바이트로 저장 → 다운로드 없이 같은 URL
+        with mock.patch('entry.Image_making.pipeline._download_into_storage') as download:
+            self.assertEqual(save_temp_image_to_s3(self.diary.id), first_url)
+        download.assert_not_called()
+        self.assertEqual(self.backend.image_calls, 2)
+
+    @override_settings(CARTOON_VARIANTS_PER_USER=2, CARTOON_VARIANT_MAX_AGE_DAYS=7)
+    def test_caps_and_age_eviction_keep_selected_and_saved_images(self):
+        def add(url, days_ago=0):
+            ImageVariant.objects.create(
+                diary=self.diary, author=self.user, image_url=url,
+                created_at=timezone.now() - timedelta(days=days_ago),
+            )
+
+        add('https://cdn.example.com/saved.png', days_ago=30)
+        add('https://cdn.example.com/old.png', days_ago=30)
+        add('https://cdn.example.com/a.png', days_ago=3)
+        add('https://cdn.example.com/b.png', days_ago=2)
+        add('https://cdn.example.com/c.png', days_ago=1)
+        DiaryModel.objects.filter(pk=self.diary.pk).update(
+            image_url='https://cdn.example.com/saved.png', temp_image_url='https://cdn.example.com/a.png',
+        )
+
+        self.diary.refresh_from_db()
+        self.diary.temp_image_url = 'https://cdn.example.com/d.png'
+        record_variant(self.diary)
+
+        kept = set(ImageVariant.objects.values_list('image_url', flat=True))
+        self.assertEqual(kept, {
+            'https://cdn.example.com/saved.png',  # 저장된 이미지 (오래됐어도 유지)
+            'https://cdn.example.com/a.png',      # 일기 DB의 현재 선택
+            'https://cdn.example.com/c.png',
+            'https://cdn.example.com/d.png',
+        })
+
+    @override_settings(CARTOON_VARIANT_MAX_AGE_DAYS=7, CARTOON_IMAGE_DELETE_GRACE_SECONDS=0)
+    def test_eviction_keeps_panels_still_shown_elsewhere(self):
+        from diary.storages import get_cartoon_storage
+
+        storage = get_cartoon_storage()
+
+        def stored(name):
+            return storage.url(storage.save(name, ContentFile(name.encode())))
+
+        composite, shared, own, diary_panel = (stored(n) for n in ('old.png', 'shared.png', 'own.png', 'diary.png'))
+        ImageVariant.objects.create(
+            diary=self.diary, author=self.user, image_url=composite, panel_image_urls=[shared, own, diary_panel],
+            created_at=timezone.now() - timedelta(days=30),
+        )
+        ImageVariant.objects.create(diary=self.diary, author=self.user, image_url=stored('new.png'), panel_image_urls=[shared])
+        DiaryModel.objects.filter(pk=self.diary.pk).update(panel_image_urls=[diary_panel])
+
+        evict_variants(self.user.id)
+
+        def exists(url):
+            return storage.exists(url[len(storage.url('')):])
+        self.assertFalse(exists(composite))
+        self.assertFalse(exists(own))
+        self.assertTrue(exists(shared))       # 다른 변형의 패널
+        self.assertTrue(exists(diary_panel))  # 일기가 보여 주는 패널
+
+
+    @override_settings(CARTOON_VARIANT_MAX_AGE_DAYS=7, CARTOON_IMAGE_DELETE_GRACE_SECONDS=60)
+    def test_evicted_image_is_deleted_with_renditions_after_grace(self):
+        from diary.storages import get_cartoon_storage
+
+        storage = get_cartoon_storage()
+        names = ['gone.png', 'gone_128.png', 'gone_256.webp', 'gone.webp', 'reused.png', 'reused_128.png']
+        for name in names:
+            storage.save(name, ContentFile(name.encode()))
+        gone, reused = storage.url('gone.png'), storage.url('reused.png')
+        for url in (gone, reused):
+            ImageVariant.objects.create(
+                diary=self.diary, author=self.user, image_url=url, created_at=timezone.now() - timedelta(days=30),
+            )
+
+        evict_variants(self.user.id)
+        # 유예 시간 동안은 남는다 (동시에 같은 내용 해시로 저장한 요청이 아직 참조를 기록하지 않았을 수 있음)
+        self.assertTrue(all(storage.exists(name) for name in names))
+        self.assertEqual(PendingImageDeletion.objects.count(), 2)
+
+        # 그 사이 다른 저장이 같은 객체를 가리키게 됨
+        DiaryModel.objects.filter(pk=self.diary.pk).update(image_url=reused)
+        PendingImageDeletion.objects.update(requested_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(purge_pending_images(), 1)
+
+        self.assertEqual([name for name in names if storage.exists(name)], ['reused.png', 'reused_128.png'])
+        self.assertFalse(PendingImageDeletion.objects.exists())
+
+
+class PromptImageCacheTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(
+            USE_S3=False, MEDIA_ROOT=media.name, CARTOON_GENERATION_MODE='grid', CARTOON_IMAGE_CACHE=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.backend = CountingImageBackend()
+        backends.set_backend(outline=self.backend, image=self.backend)
+        self.addCleanup(backends.reset_backends)
+
+        self.user = User.objects.create_user(username='a@example.com', password='pw')
+
+    def _diary(self, content='a long day at school'):
+        # 캐시는 사용자와 무관 → 같은 날짜의 같은 내용을 서로 다른 사용자가 제출
+        author = User.objects.create_user(username=f'u{User.objects.count()}@example.com', password='pw')
+        return DiaryModel.objects.create(
+            author=author, note='n', content=content, productivity=5,
+            posted_date=timezone.now().replace(hour=9, minute=0, second=0, microsecond=0),
+        )
+
+    def test_identical_prompt_reuses_stored_image(self):
+        _, first_url = generate_and_attach_image_to_diary(self._diary().id, style='simple')
+        _, second_url = generate_and_attach_image_to_diary(self._diary().id, style='simple')
+
+        self.assertEqual(second_url, first_url)
+        self.assertEqual(self.backend.image_calls, 1)
+        self.assertEqual(ImageCacheEntry.objects.get().hits, 1)
+        self.assertTrue(StageSpan.objects.filter(stage='image', outcome='cached').exists())
+
+    def test_bypass_flag_generates_again(self):
+        diary = self._diary()
+        generate_and_attach_image_to_diary(diary.id, style='simple')
+        generate_and_attach_image_to_diary(diary.id, style='simple', use_cache=False)
+        self.assertEqual(self.backend.image_calls, 2)
+
+        self.client.force_login(diary.author)
+        self.client.post(f'/generate-image/{diary.id}/', {'fresh': '1'})
+        self.assertTrue(GenerationJob.objects.get(diary=diary).bypass_cache)
+
+    @override_settings(IMAGE_CACHE_MAX_ENTRIES=1)
+    def test_least_recently_used_entry_is_evicted(self):
+        generate_and_attach_image_to_diary(self._diary('first').id, style='simple')
+        generate_and_attach_image_to_diary(self._diary('second').id, style='simple')
+
+        self.assertEqual(ImageCacheEntry.objects.count(), 1)
+        generate_and_attach_image_to_diary(self._diary('first').id, style='simple')
+        self.assertEqual(self.backend.image_calls, 3)
+
+    @override_settings(CARTOON_GENERATION_MODE='panels', CARTOON_VARIANT_MAX_AGE_DAYS=7, CARTOON_IMAGE_DELETE_GRACE_SECONDS=0)
+    def test_evicting_variant_keeps_panels_of_cached_image(self):
+        from diary.storages import get_cartoon_storage
+
+        storage = get_cartoon_storage()
+        first = self._diary()
+        generate_and_attach_image_to_diary(first.id, style='simple')
+        panels = ImageCacheEntry.objects.get().panel_image_urls
+        # 같은 패널(내용 해시)을 쓰는 다른 합성본 변형. 일기는 더는 이 이미지를 쓰지 않음 → 패널의 남은 참조는 캐시 항목뿐
+        other_composite = storage.url(storage.save('other.png', ContentFile(b'other')))
+        DiaryModel.objects.filter(pk=first.pk).update(temp_image_url=None, panel_image_urls=[])
+        first.variants.update(image_url=other_composite, created_at=timezone.now() - timedelta(days=30))
+
+        evict_variants(first.author_id)
+
+        self.assertFalse(ImageVariant.objects.exists())
+        self.assertFalse(storage.exists(other_composite[len(storage.url('')):]))
+        second = self._diary()
+        generate_and_attach_image_to_diary(second.id, style='simple')
+        second.refresh_from_db()
+        self.assertEqual(self.backend.image_calls, 4)  # 두 번째는 캐시 적중
+        self.assertEqual(second.panel_image_urls, panels)
+        for url in panels:
+            self.assertTrue(storage.exists(url[len(storage.url('')):]))
+
+
+class PostedDayTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='a@example.com', password='pw')
+        self.client.force_login(self.user)
+
+    def _post(self, note, content='c'):
+        with mock.patch('entry.jobs.enqueue_outline'):
+            return self.client.post('/', {
+                'note': note, 'content': content, 'productivity': 5, 'selected_date': '2025-03-01',
+            })
+
+    def test_posted_day_is_local_date(self):
+        # 2025-03-01 00:30 KST == 2025-02-28 15:30 UTC
+        posted = timezone.make_aware(timezone.datetime(2025, 3, 1, 0, 30))
+        diary = DiaryModel.objects.create(author=self.user, note='n', content='c', productivity=5, posted_date=posted)
+        self.assertEqual(str(diary.posted_day), '2025-03-01')
+
+    def test_entry_upserts_one_diary_per_day(self):
+        self._post('first')
+        self._post('second', content='changed')
+
+        diary = DiaryModel.objects.get(author=self.user)
+        self.assertEqual((diary.note, diary.content, str(diary.posted_day)), ('second', 'changed', '2025-03-01'))
+        data = self.client.get('/api/diary/2025-03-01/').json()
+        self.assertEqual(data['data']['id'], diary.id)
+        self.assertEqual(self.client.get('/api/diary/dates/').json()['dates'], ['2025-03-01'])
+
+    def test_legacy_same_day_duplicates_are_kept_for_detail_view(self):
+        day = timezone.make_aware(timezone.datetime(2025, 3, 1, 9))
+        kept = DiaryModel.objects.create(author=self.user, note='kept', content='c', productivity=5, posted_date=day)
+        # 제약 도입 전 중복(마이그레이션이 posted_day=NULL로 남김) - bulk_create는 save()를 거치지 않는다
+        [legacy] = DiaryModel.objects.bulk_create([DiaryModel(
+            author=self.user, note='legacy', content='c', productivity=5, posted_date=day.replace(hour=8),
+        )])
+
+        response = self.client.get('/detail/2025-03-01/')
+        self.assertEqual([d.id for d in response.context['diaries']], [legacy.id, kept.id])
+
+
+class DiaryMonthApiTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='m@example.com', password='pw')
+        self.client.force_login(self.user)
+        self.diary = DiaryModel.objects.create(
+            author=self.user, note='march', content='c', productivity=4,
+            posted_date=timezone.make_aware(timezone.datetime(2025, 3, 5, 9)),
+            image_url='https://img.example.com/cartoon.png',
+        )
+        DiaryModel.objects.create(
+            author=self.user, note='april', content='c', productivity=3,
+            posted_date=timezone.make_aware(timezone.datetime(2025, 4, 1, 9)),
+        )
+
+    def test_month_returns_day_summaries(self):
+        response = self.client.get('/api/diary/month/2025/3/')
+
+        days = response.json()['days']
+        self.assertEqual(list(days), ['2025-03-05'])
+        self.assertEqual(days['2025-03-05']['id'], self.diary.id)
+        self.assertEqual(days['2025-03-05']['note'], 'march')
+        self.assertEqual(days['2025-03-05']['thumbnail_url'], 'https://img.example.com/cartoon.png')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_unchanged_month_revalidates_with_304(self):
+        etag = self.client.get('/api/diary/month/2025/3/')['ETag']
+
+        response = self.client.get('/api/diary/month/2025/3/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.diary.note = 'edited'
+        self.diary.save(update_fields=['note'])
+        response = self.client.get('/api/diary/month/2025/3/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalid_month_is_rejected(self):
+        self.assertEqual(self.client.get('/api/diary/month/2025/13/').status_code, 400)
+        self.assertEqual(self.client.get('/api/diary/month/9999/12/').status_code, 400)
+
+
+class DiaryPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='p@example.com', password='pw')
+        self.client.force_login(self.user)
+        start = timezone.make_aware(timezone.datetime(2024, 1, 1, 9))
+        self.diaries = [
+            DiaryModel.objects.create(
+                author=self.user, note=f'day {i}', content='c', productivity=5, posted_date=start + timedelta(days=i),
+            )
+            for i in range(30)
+        ]
+
+    def test_show_renders_newest_page_with_cursor(self):
+        response = self.client.get('/show/')
+
+        shown = response.context['diaries']
+        self.assertEqual(len(shown), 24)
+        self.assertEqual(shown[0].id, self.diaries[-1].id)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_api_follows_cursor_to_the_end_without_gaps(self):
+        first = self.client.get('/show/').context
+        data = self.client.get('/api/diary/page/', {'cursor': first['next_cursor']}).json()
+
+        ids = [d.id for d in first['diaries']] + [d['id'] for d in data['diaries']]
+        self.assertEqual(ids, [d.id for d in reversed(self.diaries)])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_cursor_breaks_posted_date_ties_by_id(self):
+        same_time = self.diaries[0].posted_date
+        # 같은 시각의 예전 중복 일기 (posted_day=NULL) - bulk_create는 save()를 거치지 않는다
+        DiaryModel.objects.bulk_create([
+            DiaryModel(author=self.user, note='legacy', content='c', productivity=5, posted_date=same_time)
+            for _ in range(2)
+        ])
+
+        seen, cursor = [], None
+        while True:
+            data = self.client.get('/api/diary/page/', {'size': 5, **({'cursor': cursor} if cursor else {})}).json()
+            seen += [d['id'] for d in data['diaries']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 32)
+        self.assertEqual(len(set(seen)), 32)
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/diary/page/', {'cursor': '!!not-a-cursor'}).status_code, 400)
+
+
+class DiarySummaryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='s@example.com', password='pw')
+        self.client.force_login(self.user)
+
+    def _diary(self, content):
+        return DiaryModel.objects.create(
+            author=self.user, note='n', content=content, productivity=5,
+            posted_date=timezone.make_aware(timezone.datetime(2025, 3, 1, 9)),
+        )
+
+    def test_summary_is_plain_text(self):
+        diary = self._diary('<p>오늘은 <strong>맑음</strong> &amp; 산책</p><p>저녁</p>')
+        self.assertEqual(diary.summary, '오늘은 맑음 & 산책 저녁')
+
+    def test_long_content_is_cut_without_breaking_tags(self):
+        diary = self._diary('<p>' + '가' * 98 + '<em>나다라</em></p>')
+        self.assertEqual(diary.summary, '가' * 98 + '나다  ...')
+
+    def test_content_update_refreshes_summary(self):
+        diary = self._diary('<p>before</p>')
+        diary.content = '<p>after</p>'
+        diary.save(update_fields=['content'])
+        self.assertEqual(DiaryModel.objects.get(pk=diary.pk).summary, 'after')
+
+    def test_list_does_not_load_content(self):
+        self._diary('<p>body</p>')
+        diaries = self.client.get('/show/').context['diaries']
+        self.assertIn('content', diaries[0].get_deferred_fields())
+        self.assertEqual(diaries[0].summary, 'body')
+
+
+class ProductivityStatTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='st@example.com', password='pw')
+        self.client.force_login(self.user)
+
+    def _diary(self, day, productivity):
+        return DiaryModel.objects.create(
+            author=self.user, note='n', content='c', productivity=productivity,
+            posted_date=timezone.make_aware(timezone.datetime(2025, 3, day, 9)),
+        )
+
+    def _stat(self, period, start):
+        return ProductivityStat.objects.get(author=self.user, period=period, period_start=start)
+
+    def test_buckets_follow_saves_and_deletes(self):
+        self._diary(3, 4)
+        tuesday = self._diary(4, 8)
+        self._diary(5, 6)
+
+        week = self._stat('week', '2025-03-03')
+        self.assertEqual((week.count, week.total, week.min_productivity, week.max_productivity), (3, 18, 4, 8))
+        self.assertEqual(self._stat('day', '2025-03-05').streak, 3)
+
+        tuesday.productivity = 10
+        tuesday.save(update_fields=['productivity'])
+        self.assertEqual(self._stat('month', '2025-03-01').max_productivity, 10)
+
+        tuesday.delete()
+        self.assertEqual(self._stat('week', '2025-03-03').count, 2)
+        self.assertEqual(self._stat('day', '2025-03-05').streak, 1)
+
+    def test_moving_a_diary_updates_both_days(self):
+        diary = self._diary(3, 4)
+        diary.posted_date = timezone.make_aware(timezone.datetime(2025, 4, 1, 9))
+        diary.save(update_fields=['posted_date'])
+
+        self.assertFalse(ProductivityStat.objects.filter(period='month', period_start='2025-03-01').exists())
+        self.assertEqual(self._stat('day', '2025-04-01').total, 4)
+
+    def test_api_returns_window_with_rolling_average(self):
+        for day, productivity in [(1, 2), (2, 4), (3, 6)]:
+            self._diary(day, productivity)
+
+        data = self.client.get('/api/productivity/', {
+            'period': 'day', 'start': '2025-03-02', 'end': '2025-03-31', 'window': 2,
+        }).json()
+
+        self.assertEqual([p['period_start'] for p in data['points']], ['2025-03-02', '2025-03-03'])
+        self.assertEqual([p['rolling_avg'] for p in data['points']], [3.0, 5.0])
+        self.assertEqual(data['streak']['longest'], 3)
+        self.assertEqual(self.client.get('/api/productivity/', {'period': 'year'}).status_code, 400)
+
+
+class ReadCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='rc@example.com', password='pw', is_staff=True)
+        self.client.force_login(self.user)
+        self.diary = DiaryModel.objects.create(
+            author=self.user, note='cached', content='c', productivity=5,
+            posted_date=timezone.make_aware(timezone.datetime(2025, 3, 1, 9)),
+        )
+
+    def test_repeated_reads_stay_off_the_database(self):
+        self.client.get('/api/diary/2025-03-01/')
+        with mock.patch('entry.views._diary_by_date_data') as build:
+            data = self.client.get('/api/diary/2025-03-01/').json()
+        build.assert_not_called()
+        self.assertEqual(data['data']['note'], 'cached')
+
+        stats = self.client.get('/api/cache-stats/').json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_save_and_delete_invalidate_the_owner(self):
+        self.assertEqual(self.client.get(f'/api/diary/detail/{self.diary.id}/').json()['data']['note'], 'cached')
+
+        self.diary.note = 'edited'
+        self.diary.save(update_fields=['note'])
+        self.assertEqual(self.client.get(f'/api/diary/detail/{self.diary.id}/').json()['data']['note'], 'edited')
+        self.assertEqual(self.client.get('/api/diary/dates/').json()['dates'], ['2025-03-01'])
+
+        self.diary.delete()
+        self.assertEqual(self.client.get(f'/api/diary/detail/{self.diary.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/diary/dates/').json()['dates'], [])
+
+    def test_cache_is_per_user(self):
+        other = User.objects.create_user(username='other@example.com', password='pw')
+        self.client.get('/api/diary/2025-03-01/')
+
+        self.client.force_login(other)
+        self.assertEqual(self.client.get('/api/diary/2025-03-01/').json()['status'], 'empty')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+        self.response = mock.Mock(status_code=status_code, headers=headers or {})
+
+
+class ResilienceTests(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+        limiter = resilience.RateLimiter(600, clock=self.clock, sleep=self.clock.sleep)
+        for patcher in (
+            mock.patch.object(resilience, 'breaker', self.breaker),
+            mock.patch.dict(resilience._limiters, {'images': limiter}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _call(self, *outcomes, **kwargs):
+        outcomes = iter(outcomes)
+
+        def fn():
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return resilience.call_openai(fn, 'images', sleep=self.clock.sleep, **kwargs)
+
+    def test_limiter_waits_for_refill_and_gives_up_past_max_wait(self):
+        limiter = resilience.RateLimiter(2, tokens_per_min=100, clock=self.clock, sleep=self.clock.sleep)
+        limiter.acquire(10)
+        limiter.acquire(10)
+        self.assertEqual(self.clock.now, 0)
+
+        limiter.acquire(10)  # 요청 버킷이 1개 찰 때까지 30초
+        self.assertAlmostEqual(self.clock.now, 30)
+        self.assertEqual(limiter.throttled, 1)
+
+        limiter.max_wait = 20
+        with self.assertRaises(resilience.RateLimitTimeout):
+            limiter.acquire(10)  # 다음 요청 토큰까지 30초 > 최대 대기 20초
+        self.assertAlmostEqual(self.clock.now, 30)  # 기다리지 않고 바로 실패
+
+    def test_backoff_is_full_jitter_capped(self):
+        with mock.patch('entry.Image_making.resilience.random.uniform', side_effect=lambda low, high: high) as uniform:
+            self.assertEqual(resilience.backoff_delay(0, 1), 1)
+            self.assertEqual(resilience.backoff_delay(3, 1), 8)
+            self.assertEqual(resilience.backoff_delay(10, 1, cap=20), 20)
+        self.assertEqual(uniform.call_args.args[0], 0)
+
+    def test_retry_honours_retry_after(self):
+        result = self._call(FakeAPIError(429, {'retry-after': '7'}), 'ok', max_retries=1)
+
+        self.assertEqual(result, 'ok')
+        self.assertEqual(self.clock.now, 7)
+
+    def test_retry_after_is_clamped_to_backoff_cap(self):
+        self._call(FakeAPIError(429, {'retry-after': '86400'}), 'ok', max_retries=1)
+        self.assertEqual(self.clock.now, resilience.RETRY_DELAY_CAP)
+
+        self._call(FakeAPIError(503, {'retry-after': '-5'}), 'ok', max_retries=1)
+        self.assertEqual(self.clock.now, resilience.RETRY_DELAY_CAP)  # 음수 → 0초
+
+        with mock.patch('entry.Image_making.resilience.random.uniform', return_value=0.5):
+            self._call(FakeAPIError(429, {'retry-after': 'nan'}), 'ok', max_retries=1)
+        self.assertEqual(self.clock.now, resilience.RETRY_DELAY_CAP + 0.5)  # 비정상 값 → 백오프
+
+    def test_non_retryable_error_is_not_retried(self):
+        with self.assertRaises(FakeAPIError):
+            self._call(FakeAPIError(400), 'unused', max_retries=3)
+        self.assertEqual(self.clock.now, 0)
+
+    def test_breaker_opens_then_half_open_probe_closes_it(self):
+        for _ in range(2):
+            with self.assertRaises(FakeAPIError):
+                self._call(FakeAPIError(503), max_retries=0)
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(resilience.CircuitOpenError):
+            self._call('unused')
+
+        self.clock.now += 30
+        self.breaker.before_call()  # 반개방: 탐색 1건만 통과
+        self.assertEqual(self.breaker.state, 'half_open')
+        with self.assertRaises(resilience.CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self._call('ok'), 'ok')
+
+    def test_half_open_probe_failing_reopens(self):
+        self.breaker.state, self.breaker.opened_at = 'open', self.clock.now
+        self.clock.now += 30
+        with self.assertRaises(FakeAPIError):
+            self._call(FakeAPIError(500), max_retries=0)
+        self.assertEqual(self.breaker.state, 'open')
+
+    def test_request_error_during_half_open_does_not_close_breaker(self):
+        self.breaker.state, self.breaker.opened_at, self.breaker.failures = 'open', self.clock.now, 2
+        self.clock.now += 30
+        with self.assertRaises(FakeAPIError):
+            self._call(FakeAPIError(400))
+
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.assertEqual(self.breaker.failures, 2)
+        self.assertEqual(self._call('ok'), 'ok')  # 탐색 슬롯은 반환됨
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_limits_are_split_across_processes(self):
+        with mock.patch.dict('os.environ', {'OPENAI_IMAGE_RPM': '60', 'OPENAI_LIMIT_PROCESSES': '3'}):
+            self.assertEqual(resilience._per_process('OPENAI_IMAGE_RPM', 50), 20)
+
+
+class GenerationJobQueueTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(USE_S3=False, MEDIA_ROOT=media.name, CARTOON_GENERATION_MODE='grid')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        backends.set_backend(outline=FakeBackend(), image=FakeBackend())
+        self.addCleanup(backends.reset_backends)
+
+        self.user = User.objects.create_user(username='q@example.com', password='pw')
+        self.diary = DiaryModel.objects.create(
+            author=self.user, note='n', content='a long day at school', productivity=5, posted_date=timezone.now(),
+        )
+
+    def _job(self, **fields):
+        other = DiaryModel.objects.create(
+            author=User.objects.create_user(username=f'q{User.objects.count()}@example.com', password='pw'),
+            note='n', content='c', productivity=5, posted_date=timezone.now(),
+        )
+        return GenerationJob.objects.create(diary=other, **fields)
+
+    def test_claim_takes_oldest_queued_job_once(self):
+        first, second = self._job(), self._job()
+
+        self.assertEqual(claim_next_job().id, first.id)
+        self.assertEqual(claim_next_job().id, second.id)
+        self.assertIsNone(claim_next_job())
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), ('running', 1))
+
+    def test_claim_lost_to_another_worker_moves_on(self):
+        first, second = self._job(), self._job()
+        original_first = QuerySet.first
+        raced = []
+
+        def first_then_steal(queryset):
+            job_id = original_first(queryset)
+            if not raced and job_id == first.id:
+                # 이 워커가 id를 읽은 직후 다른 워커가 같은 작업을 선점
+                raced.append(job_id)
+                GenerationJob.objects.filter(id=job_id).update(status='running', attempts=1)
+            return job_id
+
+        with mock.patch.object(QuerySet, 'first', first_then_steal):
+            claimed = claim_next_job()
+
+        self.assertEqual(claimed.id, second.id)
+        first.refresh_from_db()
+        self.assertEqual(first.attempts, 1)  # 두 워커가 함께 가져가지 않음
+
+    def test_run_job_records_result_or_failure(self):
+        enqueue_generation(self.diary)
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.temp_image_url, DiaryModel.objects.get(pk=self.diary.pk).temp_image_url)
+
+        enqueue_generation(self.diary)
+        with mock.patch('entry.Image_making.pipeline.generate_and_attach_image_to_diary', side_effect=RuntimeError('boom')):
+            job = run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'boom'))
+        self.assertTrue(GenerationEvent.objects.filter(diary=self.diary, event='failed').exists())
+
+    def test_requeue_stale_jobs_caps_attempts(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        retry = self._job(status='running', started_at=long_ago, attempts=1)
+        exhausted = self._job(status='running', started_at=long_ago, attempts=MAX_ATTEMPTS)
+        fresh = self._job(status='running', started_at=timezone.now(), attempts=1)
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=10)), 1)
+
+        statuses = dict(GenerationJob.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[retry.id], 'queued')
+        self.assertEqual(statuses[exhausted.id], 'failed')
+        self.assertEqual(statuses[fresh.id], 'running')
+        self.assertTrue(GenerationEvent.objects.filter(diary=exhausted.diary, event='failed').exists())
+
+
+class RecordReplayBackendTests(TestCase):
+
+    def setUp(self):
+        recordings = tempfile.TemporaryDirectory()
+        self.addCleanup(recordings.cleanup)
+        self.directory = recordings.name
+
+    def test_recorded_responses_replay_byte_for_byte(self):
+        recorder = backends.RecordReplayBackend(self.directory, mode='record', inner=FakeBackend())
+        panels = recorder.outline('a long day at school', 'en', 'gpt-4o-mini')
+        image = recorder.generate('four panels', '256x256', 'b64_json', 'dall-e-3')
+
+        replayer = backends.RecordReplayBackend(self.directory, mode='replay', inner=mock.Mock())
+        self.assertEqual(replayer.outline('a long day at school', 'en', 'gpt-4o-mini'), panels)
+        self.assertEqual(replayer.generate('four panels', '256x256', 'url', 'dall-e-3').image_bytes, image.image_bytes)
+        replayer.inner.assert_not_called()
+
+    def test_url_responses_are_recorded_as_bytes(self):
+        inner = mock.Mock()
+        inner.generate.return_value = backends.ImageResult(url='https://openai.example.com/tmp.png')
+        session = mock.Mock()
+        session.get.return_value = mock.Mock(content=IMAGE_BYTES[:1024])
+        with mock.patch('entry.Image_making.transfer.get_http_session', return_value=session):
+            backends.RecordReplayBackend(self.directory, mode='record', inner=inner).generate('p', '256x256', 'url', 'dall-e-3')
+
+        replayed = backends.RecordReplayBackend(self.directory, mode='replay').generate('p', '256x256', 'url', 'dall-e-3')
+        self.assertEqual(replayed.image_bytes, IMAGE_BYTES[:1024])
+
+    def test_unrecorded_request_raises_in_replay(self):
+        replayer = backends.RecordReplayBackend(self.directory, mode='replay', inner=mock.Mock())
+        with self.assertRaises(backends.ReplayMissError):
+            replayer.generate('never recorded', '256x256', 'url', 'dall-e-3')
+        with self.assertRaises(backends.ReplayMissError):
+            replayer.outline('never recorded', 'en', 'gpt-4o-mini')
@@ -11,11 +11,19 @@ urlpatterns = [
    
     # API
     path('api/diary/dates/', views.diary_dates_api, name='diary_dates_api'),
+    path('api/diary/page/', views.diary_page_api, name='diary_page_api'),
+    path('api/diary/month/<int:year>/<int:month>/', views.diary_month_api, name='diary_month_api'),
     path('api/diary/<str:date>/', views.diary_by_date_api, name='diary_by_date_api'),
     path('api/diary/detail/<int:diary_id>/', views.get_diary_detail, name='get_diary_detail'),
     
     path('productivity/', views.productivity, name='productivity'),
+    path('api/productivity/', views.productivity_stats_api, name='productivity_stats_api'),
+    path('api/cache-stats/', views.read_cache_stats, name='read_cache_stats'),
     path('generate-image/<int:diary_id>/', views.generate_image, name='generate_image'),
+    path('generate-image/status/<int:job_id>/', views.generation_status, name='generation_status'),
+    path('generate-image/traces/', views.generation_traces, name='generation_traces'),
+    path('generate-image/<int:diary_id>/variants/', views.diary_variants, name='diary_variants'),
+    path('generate-image/<int:diary_id>/variants/<int:variant_id>/select/', views.select_variant, name='select_variant'),
     path('save-image/<int:diary_id>/', views.save_image, name='save_image'),
     path('download/<int:diary_id>/', views.download_image, name='download'),  # ← views.py에 없는 함수!
 
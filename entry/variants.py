@@ -0,0 +1,145 @@
+"""
+일기별 만화 생성 변형(ImageVariant) 이력.
+
+- record_variant: 생성이 끝날 때마다 이미지(스토리지 URL) + 프롬프트를 이력에 남기고 정리한다.
+- select_variant: 이전 변형을 다시 고름 → 생성 호출 없이 temp_image_url / final_prompt만 바꾼다.
+  저장(save_temp_image_to_s3)은 이미 보관된 바이트를 그대로 쓰므로 다시 내려받지 않는다.
+
+정리 규칙 (생성할 때마다 해당 사용자 기준으로 적용)
+- CARTOON_VARIANT_MAX_AGE_DAYS일이 지난 변형 삭제
+- 사용자당 CARTOON_VARIANTS_PER_USER개를 넘으면 오래된 것부터 삭제
+- 단, 일기에 현재 선택됐거나(temp_image_url) 저장된(image_url) 이미지의 변형은 남긴다.
+- 삭제된 변형의 이미지(합성본 + 패널)는 삭제 예약(PendingImageDeletion)만 해 두고,
+  CARTOON_IMAGE_DELETE_GRACE_SECONDS가 지난 뒤 다른 변형 / 일기 / 프롬프트 이미지 캐시가 합성본이나 패널로
+  같은 객체(내용 해시)를 쓰지 않을 때만 렌디션과 함께 스토리지에서 지운다.
+  (내용 해시 저장은 중복이면 exists만 확인하므로, 바로 지우면 동시에 같은 객체로 저장한 요청의 이미지가 사라진다)
+"""
+
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DiaryModel, ImageCacheEntry, ImageVariant, PendingImageDeletion
+
+
+def _max_per_user() -> int:
+    return int(getattr(settings, 'CARTOON_VARIANTS_PER_USER', 30))
+
+
+def _max_age() -> timedelta:
+    return timedelta(days=float(getattr(settings, 'CARTOON_VARIANT_MAX_AGE_DAYS', 14)))
+
+
+def _delete_grace() -> timedelta:
+    return timedelta(seconds=float(getattr(settings, 'CARTOON_IMAGE_DELETE_GRACE_SECONDS', 3600)))
+
+
+def record_variant(diary: DiaryModel, style: Optional[str] = None) -> Optional[ImageVariant]:
+    """
+    diary의 현재 생성 결과(temp_image_url / final_prompt / panel_image_urls)를 변형으로 기록.
+    같은 이미지(프롬프트 캐시 적중 등)의 변형이 이미 있으면 새로 만들지 않고 최신으로 올린다.
+    """
+    try:
+        existing = diary.variants.filter(image_url=diary.temp_image_url).first()
+        if existing:
+            existing.created_at = timezone.now()
+            existing.save(update_fields=['created_at'])
+            return existing
+        variant = ImageVariant.objects.create(
+            diary=diary,
+            author_id=diary.author_id,
+            style=style or '',
+            prompt=diary.final_prompt or '',
+            image_url=diary.temp_image_url,
+            panel_image_urls=list(diary.panel_image_urls or []),
+        )
+        evict_variants(diary.author_id)
+        return variant
+    except Exception as e:
+        print(f"[VARIANT] 변형 기록 실패 (diary {diary.id}): {e}")
+        return None
+
+
+def select_variant(diary: DiaryModel, variant: ImageVariant) -> DiaryModel:
+    """이전 변형을 현재 미리보기로 되돌린다 (생성 호출 없음)"""
+    diary.temp_image_url = variant.image_url
+    diary.final_prompt = variant.prompt
+    diary.panel_image_urls = list(variant.panel_image_urls or [])
+    diary.save(update_fields=['temp_image_url', 'final_prompt', 'panel_image_urls'])
+    return diary
+
+
+def evict_variants(author_id: Optional[int]) -> int:
+    """사용자 변형 중 오래됐거나 개수 상한을 넘는 것을 삭제하고 삭제 건수를 반환"""
+    variants = ImageVariant.objects.filter(author_id=author_id)
+    in_use = set()
+    for temp_url, image_url in DiaryModel.objects.filter(author_id=author_id).values_list('temp_image_url', 'image_url'):
+        in_use.update(url for url in (temp_url, image_url) if url)
+
+    cutoff = timezone.now() - _max_age()
+    expired = list(variants.filter(created_at__lt=cutoff).exclude(image_url__in=in_use))
+    newest_first = variants.filter(created_at__gte=cutoff).order_by('-created_at', '-id')
+    over_cap = [v for v in newest_first[_max_per_user():] if v.image_url not in in_use]
+    stale = expired + over_cap
+    if not stale:
+        return 0
+
+    ImageVariant.objects.filter(id__in=[v.id for v in stale]).delete()
+    _schedule_image_deletion(
+        url
+        for variant in stale
+        for url in [variant.image_url, *(variant.panel_image_urls or [])]
+    )
+    purge_pending_images()
+    return len(stale)
+
+
+def _is_referenced(url: str) -> bool:
+    """합성본(image_url 계열 컬럼) 또는 패널(panel_image_urls JSON)로 아직 쓰이는 이미지인지"""
+    # panel_image_urls는 JSON 텍스트 부분 일치로 찾는다 (SQLite는 JSON contains 미지원).
+    # 비슷한 URL에 잘못 걸려도 파일을 남기는 쪽이라 안전하다
+    in_panels = Q(panel_image_urls__icontains=url)
+    return (
+        ImageVariant.objects.filter(Q(image_url=url) | in_panels).exists()
+        or ImageCacheEntry.objects.filter(Q(image_url=url) | in_panels).exists()
+        or DiaryModel.objects.filter(Q(temp_image_url=url) | Q(image_url=url) | in_panels).exists()
+    )
+
+
+def _schedule_image_deletion(urls: Iterable[str]) -> None:
+    from diary.storages import get_cartoon_storage, is_storage_url
+
+    storage = get_cartoon_storage()
+    # 보관 실패로 남은 OpenAI 임시 URL 등은 스토리지 객체가 아니다
+    pending = [PendingImageDeletion(url=url) for url in set(urls) if is_storage_url(storage, url)]
+    PendingImageDeletion.objects.bulk_create(pending, ignore_conflicts=True)
+
+
+def purge_pending_images(limit: int = 200) -> int:
+    """
+    유예 시간이 지난 삭제 예약을 처리한다. 그 사이 다시 참조된 이미지는 남기고 예약만 지운다.
+    반환: 스토리지에서 지운 이미지 수
+    """
+    from diary.storages import get_cartoon_storage
+    from .Image_making.renditions import rendition_names
+
+    storage = get_cartoon_storage()
+    due = PendingImageDeletion.objects.filter(requested_at__lte=timezone.now() - _delete_grace()).order_by('id')
+    deleted = 0
+    for pending_id, url in list(due.values_list('id', 'url')[:limit]):
+        # 다른 프로세스가 먼저 처리했다면 0건 삭제 → 건너뜀
+        if not PendingImageDeletion.objects.filter(id=pending_id).delete()[0]:
+            continue
+        if _is_referenced(url):
+            continue
+        name = url[len(storage.url('')):]
+        try:
+            for key in [name, *rendition_names(name)]:
+                storage.delete(key)
+            deleted += 1
+        except Exception as e:
+            print(f"[VARIANT] 이미지 삭제 실패 ({url}): {e}")
+    return deleted
@@ -1,16 +1,27 @@
-from datetime import datetime
+from datetime import date as date_cls, datetime, time, timedelta
+import hashlib
 import json
 
 from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout
 from django.contrib import messages
-
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.formats import date_format
+from django.utils.http import http_date
+
+from .events import job_progress
 from .forms import AddForm
-from .models import DiaryModel
+from .models import DiaryModel, GenerationJob, ProductivityStat, local_day
+from .pagination import DIARY_PAGE_SIZE, InvalidCursor, diary_page
+from .read_cache import cached_read
 
 
 @login_required
@@ -32,11 +43,11 @@ def entry(request):
                 print(f"[ENTRY] 선택된 날짜: {selected_date}")
 
                 if selected_date:
-                    # 날짜 문자열을 datetime으로 변환
-                    posted_date = datetime.strptime(selected_date, '%Y-%m-%d')
+                    # 날짜 문자열을 datetime으로 변환 (현지 시각 자정)
+                    posted_date = timezone.make_aware(datetime.strptime(selected_date, '%Y-%m-%d'))
                 else:
                     # 날짜 선택 안 했으면 오늘
-                    posted_date = datetime.now()
+                    posted_date = timezone.now()
 
                 productivity = int(request.POST.get('productivity', 5))
                 # 사용자가 선택한 테마(스타일)
@@ -53,40 +64,44 @@ def entry(request):
 
                 image_url = request.POST.get('image_url', '').strip()
 
-                # ✅ 같은 날짜의 일기가 있는지 확인
-                today_date = posted_date.date()
-                existing_diary = DiaryModel.objects.filter(
-                    author=request.user,
-                    posted_date__date=today_date
-                ).first()
-
-                if existing_diary:
-                    # 기존 일기 수정
-                    print(f"[ENTRY] 기존 일기 수정 (ID: {existing_diary.id})")
-                    existing_diary.note = note
-                    existing_diary.content = content
-                    existing_diary.productivity = productivity
-                    if selected_style:
-                        existing_diary.style = selected_style
-                    if image_url:
-                        existing_diary.image_url = image_url
-                    existing_diary.save()
-                    todays_diary = existing_diary
-                else:
-                    # 새 일기 생성
-                    print(f"[ENTRY] 새 일기 생성")
-                    todays_diary = DiaryModel()
-                    todays_diary.author = request.user
-                    todays_diary.note = note
-                    todays_diary.posted_date = posted_date
-                    todays_diary.content = content
-                    todays_diary.productivity = productivity
-                    if selected_style:
-                        todays_diary.style = selected_style
-                    if image_url:
-                        todays_diary.image_url = image_url
-                    todays_diary.save()
-                    print(f"[ENTRY] ✅ 일기 생성 완료 (ID: {todays_diary.id})")
+                # ✅ 하루 한 편: (작성자, 날짜)로 원자적 upsert
+                # 유니크 제약 + 행 잠금이라 동시에 저장해도 같은 날 일기가 두 편 생기지 않는다
+                with transaction.atomic():
+                    todays_diary, created = DiaryModel.objects.select_for_update().get_or_create(
+                        author=request.user,
+                        posted_day=local_day(posted_date),
+                        defaults={
+                            'note': note,
+                            'content': content,
+                            'posted_date': posted_date,
+                            'productivity': productivity,
+                            'style': selected_style,
+                            'image_url': image_url or None,
+                        },
+                    )
+                    if created:
+                        print(f"[ENTRY] ✅ 일기 생성 완료 (ID: {todays_diary.id})")
+                        content_changed = True
+                    else:
+                        # 기존 일기 수정
+                        print(f"[ENTRY] 기존 일기 수정 (ID: {todays_diary.id})")
+                        content_changed = (todays_diary.note, todays_diary.content) != (note, content)
+                        todays_diary.note = note
+                        todays_diary.content = content
+                        todays_diary.productivity = productivity
+                        if selected_style:
+                            todays_diary.style = selected_style
+                        if image_url:
+                            todays_diary.image_url = image_url
+                        todays_diary.save(update_fields=['note', 'content', 'productivity', 'style', 'image_url'])
+
+                if content_changed:
+                    # 생성 버튼을 누르기 전에 워커가 4컷 아웃라인을 미리 만들어 둔다
+                    try:
+                        from .jobs import enqueue_outline
+                        enqueue_outline(todays_diary.id)
+                    except Exception as e:
+                        print(f"[ENTRY] 아웃라인 예약 실패 (무시): {e}")
 
                 form = AddForm()
                 return render(
@@ -124,9 +139,12 @@ def entry(request):
 
 @login_required
 def show(request):
-    # ✅ 자신의 일기만 조회
-    diaries = DiaryModel.objects.filter(author=request.user).order_by('posted_date')
-    icon = True if len(diaries) == 0 else None
+    # ✅ 자신의 일기만 조회 - 최신순 keyset 페이지 (다음 페이지는 diary_page_api로 이어 받음)
+    try:
+        diaries, next_cursor = diary_page(request.user, request.GET.get('cursor'))
+    except InvalidCursor:
+        return redirect('show')
+    icon = True if not diaries and not request.GET.get('cursor') else None
 
     return render(
         request,
@@ -135,12 +153,39 @@ def show(request):
             'show_highlight': True,
             'title': 'All Entries',
             'subtitle': 'It\'s all you\'ve written.',
-            'diaries': reversed(diaries),
+            'diaries': diaries,
+            'next_cursor': next_cursor,
             'icon': icon
         }
     )
 
 
+@login_required
+def diary_page_api(request):
+    """일기 목록 다음 페이지 (무한 스크롤). ?cursor=<next_cursor>&size=<개수>"""
+    try:
+        page_size = int(request.GET.get('size', DIARY_PAGE_SIZE))
+        diaries, next_cursor = diary_page(request.user, request.GET.get('cursor'), page_size)
+    except (InvalidCursor, ValueError):
+        return JsonResponse({'status': 'error', 'message': '잘못된 페이지 요청입니다.'}, status=400)
+
+    return JsonResponse({
+        'status': 'ok',
+        'diaries': [
+            {
+                'id': diary.id,
+                'note': diary.note,
+                'posted_date': timezone.localtime(diary.posted_date).isoformat(),
+                'posted_date_display': date_format(timezone.localtime(diary.posted_date), 'DATETIME_FORMAT'),
+                'summary': diary.summary,
+                'url': reverse('detail', args=[diary.id]),
+            }
+            for diary in diaries
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
 @login_required
 
 # views.py
@@ -153,9 +198,12 @@ def detail_view(request, date):
         target_date = datetime.strptime(date, '%Y-%m-%d').date()
         
         # 해당 날짜의 모든 일기 가져오기
+        # posted_day 인덱스 조회 + 날짜 컬럼 도입 전 같은 날 중복으로 남은 예전 일기(posted_day=NULL)
+        day_start = timezone.make_aware(datetime.combine(target_date, time.min))
         diaries = DiaryModel.objects.filter(
+            Q(posted_day=target_date)
+            | Q(posted_day__isnull=True, posted_date__gte=day_start, posted_date__lt=day_start + timedelta(days=1)),
             author=request.user,
-            posted_date__date=target_date
         ).order_by('posted_date')  # 작성 순서대로
         
         if not diaries.exists():
@@ -179,24 +227,36 @@ def detail_view(request, date):
 @login_required
 def get_diary_detail(request, diary_id):
     """AJAX로 특정 일기 상세 정보 가져오기"""
-    try:
-        diary = DiaryModel.objects.get(id=diary_id, author=request.user)  # ✅ 수정!
-        return JsonResponse({
-            'status': 'ok',
-            'data': {
-                'id': diary.id,
-                'note': diary.note,
-                'content': diary.content,
-                'image_url': diary.image_url,
-                'posted_date': diary.posted_date.strftime('%Y-%m-%d'),
-                'date_created': diary.posted_date.strftime('%Y-%m-%d %H:%M:%S')
-            }
-        })
-    except DiaryModel.DoesNotExist:  # ✅ 수정!
+    # 사용자별 읽기 캐시 (없는 일기도 None으로 캐시, 일기 저장·삭제 시 무효화)
+    data = cached_read(request.user.id, 'detail', diary_id, build=lambda: _diary_detail_data(request.user, diary_id))
+    if data is None:
         return JsonResponse({
             'status': 'error',
             'message': '일기를 찾을 수 없습니다.'
         }, status=404)
+    return JsonResponse({
+        'status': 'ok',
+        'data': data
+    })
+
+
+def _diary_detail_data(user, diary_id):
+    try:
+        diary = DiaryModel.objects.get(id=diary_id, author=user)  # ✅ 수정!
+    except DiaryModel.DoesNotExist:  # ✅ 수정!
+        return None
+    return {
+        'id': diary.id,
+        'note': diary.note,
+        'content': diary.content,
+        'image_url': diary.image_url,
+        'image_srcset': diary.image_srcset(),
+        'image_webp_srcset': diary.image_webp_srcset(),
+        'thumbnail_url': diary.thumbnail_url(),
+        'panel_image_urls': diary.panel_image_urls,
+        'posted_date': diary.posted_date.strftime('%Y-%m-%d'),
+        'date_created': diary.posted_date.strftime('%Y-%m-%d %H:%M:%S')
+    }
 
 def detail(request, diary_id):
     # ✅ 자신의 일기만 조회
@@ -239,9 +299,8 @@ def download_image(request, diary_id):
 
 @login_required
 def productivity(request):
-    # ✅ 자신의 일기만 조회
-    data = DiaryModel.objects.filter(author=request.user).order_by('posted_date')[:10]
-    icon = True if len(data) == 0 else None
+    # ✅ 자신의 통계만 조회 - 차트 데이터는 productivity_stats_api에서 기간별로 받는다
+    icon = True if not ProductivityStat.objects.filter(author=request.user).exists() else None
 
     return render(
         request,
@@ -249,56 +308,186 @@ def productivity(request):
         {
             'title': 'Productivity Chart',
             'subtitle': 'Keep the line heading up always.',
-            'data': data,
             'icon': icon
         }
     )
 
 
+@login_required
+def productivity_stats_api(request):
+    """
+    생산성 통계 (entry.stats). ?period=day|week|month&start=YYYY-MM-DD&end=YYYY-MM-DD&window=7
+    버킷별 개수/평균/최소/최대 + 직전 window개 버킷 이동 평균 + 연속 작성 일수
+    """
+    from .stats import PERIODS, stats_window
+
+    period = request.GET.get('period', 'day')
+    try:
+        if period not in PERIODS:
+            raise ValueError(period)
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else None
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else None
+        window = int(request.GET.get('window', 7))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '잘못된 통계 요청입니다.'}, status=400)
+    if start and end and start > end:
+        return JsonResponse({'status': 'error', 'message': '시작일이 종료일보다 늦습니다.'}, status=400)
+
+    return JsonResponse({'status': 'ok', **stats_window(request.user.id, period, start, end, window)})
+
+
 @login_required
 def generate_image(request, diary_id):
+    """이미지 생성 작업을 대기열에 등록하고 작업 ID를 즉시 반환"""
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
 
     try:
-        from .Image_making.pipeline import generate_and_attach_image_to_diary
-        from pathlib import Path
+        from .jobs import enqueue_generation
 
         # ✅ 자신의 일기만 처리
         diary = get_object_or_404(DiaryModel, pk=diary_id, author=request.user)
         # 스타일 결정: 요청 파라미터 > 일기 저장된 스타일 > 기본(simple)
         raw_style = (request.POST.get('style') or '').strip().lower()
         style = raw_style or (diary.style or 'simple')
-        base_dir = Path(__file__).resolve().parents[1]
-        style_map = {
-            'simple': base_dir / 'sample_prompt_simple.txt',
-            'ani': base_dir / 'sample_prompt_ani.txt',
-            'real': base_dir / 'sample_prompt_real.txt',
-        }
-        style_path = style_map.get(style, base_dir / 'sample_prompt_simple.txt')
 
-        generate_and_attach_image_to_diary(diary_id, style_path=style_path, language='en')
-        diary.refresh_from_db()
-        return JsonResponse({'status': 'ok', 'temp_image_url': diary.temp_image_url})
+        # 재생성 버튼(fresh=1)은 같은 프롬프트여도 캐시된 이미지 대신 새로 생성
+        fresh = request.POST.get('fresh') in ('1', 'true')
+        job = enqueue_generation(diary, style=style, language='en', bypass_cache=fresh)
+        return JsonResponse({
+            'status': 'ok',
+            'job_id': job.id,
+            'job_status': job.status,
+        }, status=202)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 
+@login_required
+def generation_status(request, job_id):
+    """이미지 생성 작업 상태 조회 (queued/running/done/failed) + 진행 단계(stage)와 4컷 캡션"""
+    try:
+        # ✅ 자신의 일기에 대한 작업만 조회
+        job = GenerationJob.objects.get(id=job_id, diary__author=request.user)
+    except GenerationJob.DoesNotExist:
+        return JsonResponse({
+            'status': 'error',
+            'message': '작업을 찾을 수 없습니다.'
+        }, status=404)
+
+    return JsonResponse({
+        'status': 'ok',
+        'job_id': job.id,
+        'diary_id': job.diary_id,
+        'job_status': job.status,
+        'temp_image_url': job.temp_image_url,
+        'message': job.error,
+        **job_progress(job),
+    })
+
+
+@login_required
+def diary_variants(request, diary_id):
+    """일기의 생성 변형(재생성 이력) 목록 - 최신순, 현재 선택(selected)/저장(persisted) 표시"""
+    # ✅ 자신의 일기만 조회
+    diary = get_object_or_404(DiaryModel, pk=diary_id, author=request.user)
+    variants = diary.variants.only('id', 'style', 'image_url', 'created_at')
+    return JsonResponse({
+        'status': 'ok',
+        'diary_id': diary.id,
+        'variants': [
+            {
+                'id': variant.id,
+                'style': variant.style,
+                'image_url': variant.image_url,
+                'created_at': variant.created_at.isoformat(),
+                'selected': variant.image_url == diary.temp_image_url,
+                'persisted': variant.image_url == diary.image_url,
+            }
+            for variant in variants
+        ],
+    })
+
+
+@login_required
+def select_variant(request, diary_id, variant_id):
+    """이전 변형을 미리보기로 되돌림 (이미지 재생성 없이 즉시)"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    from .variants import select_variant as apply_variant
+
+    # ✅ 자신의 일기만 처리
+    diary = get_object_or_404(DiaryModel, pk=diary_id, author=request.user)
+    variant = get_object_or_404(diary.variants, pk=variant_id)
+    apply_variant(diary, variant)
+    return JsonResponse({
+        'status': 'ok',
+        'variant_id': variant.id,
+        'temp_image_url': diary.temp_image_url,
+        'panel_image_urls': diary.panel_image_urls,
+    })
+
+
+@login_required
+def generation_traces(request):
+    """단계별(outline/render/image/download/upload) 생성 지연 집계 - 관리자 전용"""
+    if not request.user.is_staff:
+        return JsonResponse({'status': 'error', 'message': '권한이 없습니다.'}, status=403)
+
+    from .Image_making.tracing import stage_latency_summary
+
+    try:
+        hours = float(request.GET.get('hours', 24))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'hours는 숫자여야 합니다.'}, status=400)
+
+    return JsonResponse({
+        'status': 'ok',
+        'hours': hours,
+        'style': request.GET.get('style') or None,
+        'unit': 'ms',
+        'stages': stage_latency_summary(hours=hours, style=request.GET.get('style') or None),
+    })
+
+
+@login_required
+def read_cache_stats(request):
+    """일기 조회 API 읽기 캐시 적중/미스 횟수 - 관리자 전용"""
+    if not request.user.is_staff:
+        return JsonResponse({'status': 'error', 'message': '권한이 없습니다.'}, status=403)
+
+    from .read_cache import read_cache_stats as stats
+    return JsonResponse({'status': 'ok', **stats()})
+
+
 @login_required
 def save_image(request, diary_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
 
     try:
-        from .Image_making.pipeline import save_temp_image_to_s3
+        from .Image_making.pipeline import SAVE_REQUEST_WAIT, save_temp_image_to_s3
+        from .singleflight import SingleFlightTimeout
 
         # ✅ 자신의 일기만 처리
         diary = get_object_or_404(DiaryModel, pk=diary_id, author=request.user)
-        
-        s3_url = save_temp_image_to_s3(diary_id)
+
+        try:
+            s3_url = save_temp_image_to_s3(diary_id, wait=SAVE_REQUEST_WAIT)
+        except SingleFlightTimeout:
+            # 다른 요청의 업로드가 아직 진행 중 → 워커를 붙잡지 않고 돌려보냄 (잠시 후 재시도하면 결과를 받는다)
+            return JsonResponse({'status': 'error', 'message': '이미지를 저장하는 중입니다. 잠시 후 다시 시도하세요.'}, status=409)
 
         if s3_url:
-            return JsonResponse({'status': 'ok', 'image_url': s3_url})
+            diary.refresh_from_db(fields=['image_url', 'image_renditions'])
+            return JsonResponse({
+                'status': 'ok',
+                'image_url': s3_url,
+                'image_srcset': diary.image_srcset(),
+                'image_webp_srcset': diary.image_webp_srcset(),
+                'thumbnail_url': diary.thumbnail_url(),
+            })
         else:
             return JsonResponse({'status': 'error', 'message': 'S3 upload failed'}, status=500)
     except Exception as e:
@@ -387,9 +576,12 @@ def settings_view(request):
 def diary_dates_api(request):
     """사용자의 모든 일기 작성 날짜를 반환"""
     try:
-        # ✅ 자신의 일기만 조회
-        diary_dates = DiaryModel.objects.filter(author=request.user).values_list('posted_date__date', flat=True).distinct()
-        date_list = [str(date) for date in diary_dates if date]
+        # ✅ 자신의 일기만 조회 (사용자별 읽기 캐시, 일기 저장·삭제 시 무효화)
+        date_list = cached_read(request.user.id, 'dates', build=lambda: [
+            str(date) for date in
+            DiaryModel.objects.filter(author=request.user, posted_day__isnull=False).values_list('posted_day', flat=True)
+            if date
+        ])
         
         return JsonResponse({
             'status': 'ok',
@@ -403,35 +595,94 @@ def diary_dates_api(request):
         }, status=500)
 
 
+@login_required
+def diary_month_api(request, year, month):
+    """
+    달력 한 달 치 일기 요약 (날짜별 id / 제목 / 생산성 / 썸네일)
+    (작성자, posted_day) 인덱스 범위 조회 1번. ETag / Last-Modified는 그 달 일기의
+    마지막 수정 시각과 개수로 만들고, 바뀐 게 없으면 304로 응답한다.
+    """
+    try:
+        first_day = date_cls(year, month, 1)
+        next_month = date_cls(year + month // 12, month % 12 + 1, 1)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '올바르지 않은 연/월입니다.'}, status=400)
+
+    diaries = list(
+        DiaryModel.objects
+        .filter(author=request.user, posted_day__gte=first_day, posted_day__lt=next_month)
+        .only('id', 'note', 'summary', 'productivity', 'posted_day', 'image_url', 'image_renditions', 'updated_at')
+        .order_by('posted_day')
+    )
+
+    last_modified = max((diary.updated_at for diary in diaries), default=None)
+    etag = '"{}"'.format(hashlib.sha256(
+        f'{request.user.id}:{first_day:%Y-%m}:{len(diaries)}:{last_modified.isoformat() if last_modified else ""}'.encode()
+    ).hexdigest()[:32])
+    last_modified_ts = last_modified.timestamp() if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        response = JsonResponse({
+            'status': 'ok',
+            'year': year,
+            'month': month,
+            'days': {
+                diary.posted_day.isoformat(): {
+                    'id': diary.id,
+                    'note': diary.note,
+                    'summary': diary.summary,
+                    'productivity': diary.productivity,
+                    'thumbnail_url': diary.thumbnail_url(128),
+                }
+                for diary in diaries
+            },
+        })
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    # 브라우저 캐시에 두되 매번 재검증 (바뀐 게 없으면 304)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _diary_by_date_data(user, target_date):
+    diary = DiaryModel.objects.filter(author=user, posted_day=target_date).first()
+    if not diary:
+        return None
+
+    print(f"[API] ✅ 일기 발견")
+    print(f"[API] ID: {diary.id}")
+    print(f"[API] 작성자: {user.username}")
+    print(f"[API] 제목: {diary.note}")
+    print(f"[API] S3 이미지 URL: {diary.image_url if diary.image_url else '없음'}")
+    return {
+        'id': diary.id,
+        'note': diary.note,
+        'content': diary.content,
+        'productivity': diary.productivity,
+        'image_url': diary.image_url if diary.image_url else None,
+        'image_srcset': diary.image_srcset(),
+        'image_webp_srcset': diary.image_webp_srcset(),
+        'thumbnail_url': diary.thumbnail_url(),
+        'panel_image_urls': diary.panel_image_urls,
+        'date': diary.posted_date.strftime('%Y-%m-%d')
+    }
+
+
 @login_required
 def diary_by_date_api(request, date):
     """특정 날짜의 일기 데이터를 반환"""
     try:
         target_date = datetime.strptime(date, '%Y-%m-%d').date()
         
-        # ✅ 자신의 일기만 조회
-        diary = DiaryModel.objects.filter(
-            author=request.user,
-            posted_date__date=target_date
-        ).order_by('-posted_date').first()
+        # ✅ 자신의 일기만 조회 (사용자별 읽기 캐시, 일기 저장·삭제 시 무효화)
+        data = cached_read(request.user.id, 'by_date', target_date, build=lambda: _diary_by_date_data(request.user, target_date))
         
-        if diary:
-            print(f"[API] ✅ 일기 발견")
-            print(f"[API] ID: {diary.id}")
-            print(f"[API] 작성자: {diary.author.username}")
-            print(f"[API] 제목: {diary.note}")
-            print(f"[API] S3 이미지 URL: {diary.image_url if diary.image_url else '없음'}")
-            
+        if data:
             return JsonResponse({
                 'status': 'ok',
-                'data': {
-                    'id': diary.id,
-                    'note': diary.note,
-                    'content': diary.content,
-                    'productivity': diary.productivity,
-                    'image_url': diary.image_url if diary.image_url else None,
-                    'date': diary.posted_date.strftime('%Y-%m-%d')
-                }
+                'data': data
             })
         else:
             return JsonResponse({